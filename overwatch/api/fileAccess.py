@@ -12,6 +12,7 @@ import logging
 # Configuration
 from overwatch.base import config
 from overwatch.base import storageWrapper
+from overwatch.base import utilities
 (apiParameters, filesRead) = config.readConfig(config.configurationType.api)
 
 # Setup logger
@@ -29,7 +30,7 @@ from werkzeug.utils import secure_filename
 app = Flask(__name__)
 api = flask_restful.Api(app)
 
-app.config["ZODB_STORAGE"] = apiParameters["databaseLocation"]
+app.config["ZODB_STORAGE"] = utilities.retrieveDatabaseLocation(apiParameters, utilities.uniqueClientName("api"), readOnly = apiParameters["zeoClient"]["readOnlyWebClients"])
 #app.config["ZODB_STORAGE"] = "file://../../data/overwatch.fs"
 db = flask_zodb.ZODB(app)
 #dirPrefix = "dirPrefixPlaceholder"
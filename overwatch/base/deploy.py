@@ -1435,6 +1435,15 @@ class nginx(executable):
         basePath (str): Path to the ``nginx`` settings and configuration directory. Default: "/etc/nginx".
         configPath (str): Path to the main ``nginx`` configuration directory. Default: "${basePath}/conf.d".
         sitesPath (str): Path to the ``nginx`` sites directory. Default: "${basePath}/sites-enabled".
+        protectedFolder (str): Path to the web app protected folder. If specified, an internal location is
+            configured, which serves the protected files after they are authorized by the web app (via
+            ``X-Accel-Redirect``). Default: None.
+        protectedLocation (str): Internal location of the protected files. It must match the ``accelRedirect``
+            location in the web app configuration. Default: "/protectedFiles/".
+        updatesWebAppName (str): Name of a separate web app (ie. its socket) which serves the update event
+            streams (``/updates``). Each stream occupies a uwsgi thread for its full duration, so they are served
+            by an instance with its own (larger) thread pool so that they don't exhaust the threads which serve
+            the pages. Default: None, in which case they are served by the main web app.
     """
     def __init__(self, config):
         name = "nginx"
@@ -1451,7 +1460,8 @@ class nginx(executable):
         """ Setup required for the ``nginx`` executable.
 
         In particular, we need to write out the main configuration (which directs to the socket to which traffic
-        should be passed), as well as the ``gzip`` configuration.
+        should be passed, as well as the internal location for protected files if requested), as well as the
+        ``gzip`` configuration.
         """
         mainNginxConfig = """
         server {
@@ -1461,10 +1471,41 @@ class nginx(executable):
             location / {
                 include uwsgi_params;
                 uwsgi_pass unix:///tmp/sockets/%(name)s.sock;
-            }
+            }%(protectedLocation)s%(updatesLocation)s
         }"""
+        protectedLocation = ""
+        if self.config.get("protectedFolder", None):
+            protectedLocation = """
+            # Protected files, which are only served after the request is authorized by the web app.
+            location %(location)s {
+                internal;
+                alias %(folder)s/;
+                sendfile on;
+                tcp_nopush on;
+                # Serve the precompressed variants written by the processing.
+                gzip_static on;
+                # Requires the ngx_brotli module.
+                #brotli_static on;
+            }"""
+            protectedLocation = protectedLocation % {"location": self.config.get("protectedLocation", "/protectedFiles/"),
+                                                     "folder": os.path.abspath(self.config["protectedFolder"])}
+        updatesLocation = ""
+        if self.config.get("updatesWebAppName", None):
+            updatesLocation = """
+            # Update event streams, which are served by a separate web app with its own thread pool.
+            location /updates {
+                include uwsgi_params;
+                uwsgi_pass unix:///tmp/sockets/%(name)s.sock;
+                # Send the events to the client as soon as they are available.
+                uwsgi_buffering off;
+                # The streams are long lived, so we don't want them to time out while waiting for events.
+                uwsgi_read_timeout 600s;
+            }"""
+            updatesLocation = updatesLocation % {"name": self.config["updatesWebAppName"]}
         # Use "%" formatting because the `nginx` config uses curly brackets.
-        mainNginxConfig = mainNginxConfig % {"name": self.config["webAppName"]}
+        mainNginxConfig = mainNginxConfig % {"name": self.config["webAppName"],
+                                             "protectedLocation": protectedLocation,
+                                             "updatesLocation": updatesLocation}
         mainNginxConfig = inspect.cleandoc(mainNginxConfig)
 
         # Determine the path to the main config file.
@@ -1555,6 +1596,24 @@ class overwatchFlaskExecutable(overwatchExecutable):
         # We call this last here because we are going to update variables if we use ``uwsgi`` for execution.
         super().setup()
 
+class overwatchWebAppUpdates(overwatchFlaskExecutable):
+    """ Start the separate instance of the web app which serves the update event streams.
+
+    The instance runs the same web app module, so it is identified to the web app via the
+    ``OVERWATCH_WEBAPP_COMPONENT`` environment variable (set in the ``uwsgi`` config). This way, it uses its
+    own database client names (and therefore persistent caches) rather than colliding with those of the web app.
+
+    Note:
+        All args are specified in the config. See ``overwatchFlaskExecutable``.
+    """
+    def setup(self):
+        """ Setup required for the update events instance of the web app. """
+        if "uwsgi" in self.config:
+            additionalOptions = self.config["uwsgi"].setdefault("additionalOptions", {})
+            additionalOptions["env"] = "OVERWATCH_WEBAPP_COMPONENT={name}".format(name = self.name)
+
+        super().setup()
+
 _available_executables = {
     "supervisor": supervisor,
     "zodb": zodb,
@@ -1585,12 +1644,24 @@ _available_executables = {
                                     args = [
                                         "overwatchProcessing",
                                     ]),
+    "timeSliceJobs": functools.partial(overwatchExecutable,
+                                       name = "timeSliceJobs",
+                                       description = "Overwatch time slice job worker",
+                                       args = [
+                                           "overwatchTimeSliceJobs",
+                                       ]),
     "webApp": functools.partial(overwatchFlaskExecutable,
                                 name = "webApp",
                                 description = "Overwatch web app",
                                 args = [
                                     "overwatchWebApp",
                                 ]),
+    "webAppUpdates": functools.partial(overwatchWebAppUpdates,
+                                       name = "webAppUpdates",
+                                       description = "Overwatch web app update events",
+                                       args = [
+                                           "overwatchWebApp",
+                                       ]),
     "dqmReceiver": functools.partial(overwatchFlaskExecutable,
                                      name = "dqmReceiver",
                                      description = "Overwatch DQM receiver",
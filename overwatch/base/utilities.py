@@ -19,6 +19,14 @@ import pendulum
 import ruamel.yaml as yaml
 import signal
 import threading
+import timeit
+import gzip
+import io
+# Brotli is optional. If it's not available, only gzip compressed variants are written.
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 # ZODB
 import ZODB
@@ -26,6 +34,11 @@ import transaction
 import persistent
 # For determining the storage type
 import zodburi
+# For creating ZEO client URIs
+try:
+    from urllib.parse import urlencode
+except ImportError:
+    from urllib import urlencode
 
 # Logging
 import logging
@@ -129,6 +142,47 @@ def createFileDictionary(currentDir, runDir, subsystem):
 
     return [mergeDict, maxTimeMinutes]
 
+def writeFileWithCompressedVariants(filename, data, compressionParameters):
+    """ Write a file, along with precompressed variants, such that the web app can serve them directly.
+
+    The compressed variants are stored next to the file with ``.gz`` and ``.br`` extensions. Each file is
+    first written to a temporary file and then moved into place, so a reader never sees a partially written
+    file. The variants are written before the file itself, so once the file has been updated, the variants
+    are as well. Variants which are disabled are removed, so that outdated variants aren't served.
+
+    Args:
+        filename (str): Path to the file.
+        data (bytes): Content of the file.
+        compressionParameters (dict): Compression options, with the keys ``gzip`` (bool) and ``brotli`` (bool).
+            Brotli is only used if the ``brotli`` package is available.
+    Returns:
+        None.
+    """
+    variants = []
+    gzipData = None
+    if compressionParameters.get("gzip", False):
+        buf = io.BytesIO()
+        # The modification time is fixed so that the same content always leads to the same compressed file.
+        with gzip.GzipFile(fileobj = buf, mode = "wb", compresslevel = 9, mtime = 0) as f:
+            f.write(data)
+        gzipData = buf.getvalue()
+    variants.append((filename + ".gz", gzipData))
+    brotliData = None
+    if compressionParameters.get("brotli", False) and brotli is not None:
+        brotliData = brotli.compress(data, quality = 9)
+    variants.append((filename + ".br", brotliData))
+    variants.append((filename, data))
+
+    for (variantFilename, variantData) in variants:
+        if variantData is None:
+            if os.path.exists(variantFilename):
+                os.remove(variantFilename)
+            continue
+        tempFilename = variantFilename + ".tmp"
+        with open(tempFilename, "wb") as f:
+            f.write(variantData)
+        os.rename(tempFilename, variantFilename)
+
 def findCurrentRunDirs(dirPrefix = ""):
     """ Finds all of the dirs in the specified directory dir with "Run" in the name.
 
@@ -478,6 +532,210 @@ def getDB(databaseLocation):
 
     return (dbRoot, connection)
 
+def uniqueClientName(componentName):
+    """ Create a database client name which is unique for each process of a component.
+
+    When running under ``uwsgi``, the worker id is stable across restarts, so the persistent client cache
+    can be reused by the worker which replaces it.
+
+    Args:
+        componentName (str): Name of the component (ex. "webApp").
+    Returns:
+        str: Client name for the current process.
+    """
+    try:
+        import uwsgi
+        return "{componentName}{workerID}".format(componentName = componentName, workerID = uwsgi.worker_id())
+    except ImportError:
+        return componentName
+
+def retrieveDatabaseLocation(parameters, clientName, readOnly = False):
+    """ Determine the database location (zodburi URI) to be used by a particular Overwatch component.
+
+    The object cache size of each connection is configured in ``databaseCache`` (via the ``connection_cache_size``
+    and ``connection_cache_size_bytes`` URI options). If the database is provided by a ZEO server (ie. the location
+    is a ``zeo://`` URI), each component connects as a ZEO client. In that case, the client options configured in
+    ``zeoClient`` are also added to the URI, such that each component uses its own (optionally persistent) client
+    cache, and the web tiers can connect read-only. Changes committed by other clients are propagated to the
+    client caches by the ZEO server (via invalidations).
+
+    Args:
+        parameters (dict): Overwatch configuration, which contains ``databaseLocation``, ``databaseCache``,
+            and ``zeoClient``.
+        clientName (str): Name of the client. It is used to name the persistent client cache, so it must be
+            unique for each process (see ``uniqueClientName()``).
+        readOnly (bool): True if the client should connect read-only. Only applies to ZEO. Default: False.
+    Returns:
+        str: Database location for the component.
+    """
+    databaseLocation = parameters["databaseLocation"]
+    options = []
+
+    # Object cache for each connection.
+    cacheParameters = parameters.get("databaseCache", {})
+    if cacheParameters.get("objects"):
+        options.append(("connection_cache_size", cacheParameters["objects"]))
+    if cacheParameters.get("bytes"):
+        options.append(("connection_cache_size_bytes", cacheParameters["bytes"]))
+
+    # ZEO client.
+    if databaseLocation.startswith("zeo://"):
+        zeoClientParameters = parameters.get("zeoClient", {})
+        if zeoClientParameters.get("cacheSize"):
+            options.append(("cache_size", zeoClientParameters["cacheSize"]))
+        if zeoClientParameters.get("cacheDirectory"):
+            if not os.path.exists(zeoClientParameters["cacheDirectory"]):
+                os.makedirs(zeoClientParameters["cacheDirectory"])
+            # Persistent caches are named by the client, so the name must be unique for each process.
+            options.append(("client", clientName))
+            options.append(("var", zeoClientParameters["cacheDirectory"]))
+        if readOnly:
+            options.append(("read_only", "true"))
+
+    if not options:
+        return databaseLocation
+    separator = "&" if "?" in databaseLocation else "?"
+    return databaseLocation + separator + urlencode(options)
+
+def warmDatabaseCache(dbRoot, nRuns):
+    """ Load the most recent runs and the trending into the object cache of a database connection.
+
+    After a restart, the object cache is empty, so the first requests would otherwise need to load all of
+    the objects which they access from the storage. The runs are determined via the run summary catalog.
+
+    Args:
+        dbRoot (PersistentMapping): Database root (or an equivalent mapping, such as ``flask_zodb.ZODB``).
+        nRuns (int): Number of the most recent runs to load.
+    Returns:
+        int: Number of objects which were loaded.
+    """
+    objects = []
+    if "runSummaries" in dbRoot and "runs" in dbRoot:
+        runs = dbRoot["runs"]
+        (summaries, _, _) = dbRoot["runSummaries"].page(numberOfRuns = nRuns)
+        for summary in summaries:
+            if summary.runDir not in runs:
+                continue
+            run = runs[summary.runDir]
+            objects.append(run)
+            for subsystem in run.subsystems.values():
+                objects.append(subsystem)
+                objects.extend(subsystem.histGroups)
+                objects.extend(subsystem.hists.values())
+    if "trending" in dbRoot:
+        for subsystemTrending in dbRoot["trending"].values():
+            objects.extend(subsystemTrending.values())
+
+    for obj in objects:
+        activate = getattr(obj, "_p_activate", None)
+        if activate:
+            activate()
+    logger.info("Warmed the database cache with {nObjects} objects.".format(nObjects = len(objects)))
+    return len(objects)
+
+def warmDatabaseConnections(database, nConnections, nRuns):
+    """ Warm the object cache of each connection in the connection pool of a database.
+
+    Each connection has its own object cache, and the pool hands out a different connection to each
+    concurrent request. Consequently, we open (and then close) the expected number of concurrent connections
+    at once, such that each of them is warmed and returned to the pool.
+
+    Args:
+        database (ZODB.DB): Database whose connections should be warmed.
+        nConnections (int): Number of connections to warm. Usually the number of threads of the process.
+        nRuns (int): Number of the most recent runs to load into each connection.
+    Returns:
+        int: Number of objects which were loaded.
+    """
+    connections = []
+    nObjects = 0
+    try:
+        for _ in range(nConnections):
+            transactionManager = transaction.TransactionManager()
+            connection = database.open(transactionManager)
+            connections.append((connection, transactionManager))
+            nObjects += warmDatabaseCache(connection.root(), nRuns = nRuns)
+    finally:
+        for (connection, transactionManager) in connections:
+            # We never write with these connections.
+            transactionManager.abort()
+            connection.close()
+    return nObjects
+
+def processThreads():
+    """ Determine the number of threads which handle requests in the current process.
+
+    Returns:
+        int: Number of threads configured in ``uwsgi``, or 1 if not running under ``uwsgi``.
+    """
+    try:
+        import uwsgi
+        return int(uwsgi.opt.get("threads", 1))
+    except ImportError:
+        return 1
+
+class databaseCacheStatistics(object):
+    """ Collects statistics on the object cache of database connections, which can be used to tune the cache size.
+
+    The object cache doesn't count accesses, so the statistics are based on the number of objects which
+    had to be loaded from the storage (ie. cache misses) by each request. A request which didn't need to load
+    any objects was served entirely from the cache.
+
+    Args:
+        logInterval (int): Number of requests after which the statistics are logged (and then reset).
+
+    Attributes:
+        logInterval (int): Number of requests after which the statistics are logged.
+        requests (int): Number of recorded requests.
+        cachedRequests (int): Number of requests which didn't load any objects from the storage.
+        loads (int): Number of objects loaded from the storage.
+    """
+    def __init__(self, logInterval):
+        self.logInterval = logInterval
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """ Reset the statistics.
+
+        Args:
+            None.
+        Returns:
+            None.
+        """
+        self.requests = 0
+        self.cachedRequests = 0
+        self.loads = 0
+
+    def record(self, connection):
+        """ Record the loads of a connection since the previous record, logging the statistics when due.
+
+        Args:
+            connection (ZODB.Connection.Connection): Connection used for the request.
+        Returns:
+            None.
+        """
+        (loads, _) = connection.getTransferCounts(clear = True)
+        with self.lock:
+            self.requests += 1
+            self.loads += loads
+            if loads == 0:
+                self.cachedRequests += 1
+            if self.requests < self.logInterval:
+                return
+            db = connection.db()
+            logger.info("Database cache: {hitRate:.1%} of {requests} requests served from the cache, {loads} objects"
+                        " loaded ({loadsPerRequest:.1f} per request). {cachedObjects} objects cached in {nConnections}"
+                        " connections (size per connection: {cacheSize} objects).".format(
+                            hitRate = self.cachedRequests / float(self.requests),
+                            requests = self.requests,
+                            loads = self.loads,
+                            loadsPerRequest = self.loads / float(self.requests),
+                            cachedObjects = db.cacheSize(),
+                            nConnections = len(db.cacheDetailSize()),
+                            cacheSize = db.getCacheSize()))
+            self.reset()
+
 def updateDBSensitiveParameters(db, overwriteSecretKey = True):
     """ Update sensitive parameters which are stored in the database. Those parameters include the users
     dictionary, as well as the secret key used for cookie signing.
@@ -524,6 +782,89 @@ def updateDBSensitiveParameters(db, overwriteSecretKey = True):
     # Ensure that any additional changes are committed
     transaction.commit()
 
+class commitBatcher(object):
+    """ Batches transaction commits to reduce the commit overhead when making many changes.
+
+    Each commit requires (at least) one sync of the storage to disk, so committing after every change
+    is expensive when there are many changes (for example, when catching up on many runs). Instead, the
+    changes are committed once ``maxChanges`` changes are pending or ``maxSeconds`` have passed since the
+    last commit. Changes which must be stored immediately can force a commit.
+
+    In the case of failure, the changes of the failed unit of work can be discarded via a savepoint
+    (see ``savepoint()``), without losing the other changes pending in the batch.
+
+    Args:
+        maxChanges (int): Maximum number of changes before committing. Values <= 1 commit every change.
+            Default: 1.
+        maxSeconds (float): Maximum time since the last commit in seconds before committing. Values <= 0
+            disable the time limit. Default: 0.
+        transactionManager (transaction.TransactionManager): Transaction manager. Default: None, which
+            corresponds to the default (thread local) transaction manager.
+
+    Attributes:
+        maxChanges (int): Maximum number of changes before committing.
+        maxSeconds (float): Maximum time since the last commit in seconds before committing.
+        transactionManager (transaction.TransactionManager): Transaction manager.
+        pendingChanges (int): Number of changes which haven't yet been committed.
+        lastCommitTime (float): Time of the last commit (as determined by ``timeit.default_timer()``).
+    """
+    def __init__(self, maxChanges = 1, maxSeconds = 0, transactionManager = None):
+        self.maxChanges = maxChanges
+        self.maxSeconds = maxSeconds
+        self.transactionManager = transactionManager if transactionManager else transaction.manager
+        self.pendingChanges = 0
+        self.lastCommitTime = timeit.default_timer()
+
+    def savepoint(self):
+        """ Create a savepoint, which allows the changes made after it to be rolled back.
+
+        Args:
+            None.
+        Returns:
+            transaction.Savepoint: Savepoint. Call ``rollback()`` to discard the changes made after it.
+        """
+        return self.transactionManager.savepoint()
+
+    def isCommitDue(self):
+        """ Check whether the pending changes should be committed.
+
+        Args:
+            None.
+        Returns:
+            bool: True if the pending changes should be committed.
+        """
+        if self.pendingChanges >= self.maxChanges:
+            return True
+        return self.maxSeconds > 0 and timeit.default_timer() - self.lastCommitTime >= self.maxSeconds
+
+    def recordChange(self, force = False):
+        """ Record a change, and commit the pending changes if it is due.
+
+        Args:
+            force (bool): If True, commit immediately. Default: False.
+        Returns:
+            bool: True if the pending changes were committed.
+        """
+        self.pendingChanges += 1
+        if force or self.isCommitDue():
+            self.commit()
+            return True
+        return False
+
+    def commit(self):
+        """ Commit the pending changes.
+
+        Args:
+            None.
+        Returns:
+            None.
+        """
+        if self.pendingChanges > 0:
+            logger.debug("Committing {pendingChanges} changes.".format(pendingChanges = self.pendingChanges))
+        self.transactionManager.commit()
+        self.pendingChanges = 0
+        self.lastCommitTime = timeit.default_timer()
+
 ####################
 # Histogram array functions
 ####################
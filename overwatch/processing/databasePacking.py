@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+
+""" Scheduled packing of the Overwatch database.
+
+Each processing cycle commits new revisions of the run, subsystem, trending and time slice objects. The
+previous revisions are kept by the storage until it is packed, so the database grows without bound unless
+it is packed regularly. The packer schedules a pack in the idle window after a processing cycle (ie. while
+the processing is sleeping), removing the history which is older than the configured retention.
+
+The pack is performed in a background thread. Both ``FileStorage`` and ZEO only hold the commit lock
+briefly at the end of a pack, so a processing cycle which starts while the pack is still running can
+continue to commit.
+"""
+
+import logging
+import threading
+import time
+import timeit
+
+logger = logging.getLogger(__name__)
+
+class databasePacker(object):
+    """ Schedules and performs packing of the database.
+
+    Args:
+        db (ZODB.DB): Database to be packed.
+        parameters (dict): Processing parameters, which contain the ``databasePacking`` options.
+    Attributes:
+        db (ZODB.DB): Database to be packed.
+        enabled (bool): True if the database should be packed.
+        retentionDays (float): History newer than this number of days is kept when packing.
+        interval (float): Minimum time between packs in seconds.
+        lastPackTime (float): Unix time when the most recent pack was started. 0 if it hasn't been packed
+            since the packer was created.
+        packThread (threading.Thread): Thread which performs the pack. None if a pack hasn't been started.
+    """
+    def __init__(self, db, parameters):
+        self.db = db
+        packingParameters = parameters.get("databasePacking", {})
+        self.enabled = packingParameters.get("enabled", False)
+        self.retentionDays = packingParameters.get("retentionDays", 1)
+        self.interval = packingParameters.get("intervalHours", 24) * 60 * 60
+        self.lastPackTime = 0
+        self.packThread = None
+
+    def isPacking(self):
+        """ Check whether a pack is in progress.
+
+        Args:
+            None.
+        Returns:
+            bool: True if a pack is in progress.
+        """
+        return self.packThread is not None and self.packThread.is_alive()
+
+    def isPackDue(self, currentTime = None):
+        """ Check whether the database should be packed.
+
+        Args:
+            currentTime (float): Current unix time. Default: None, which corresponds to now.
+        Returns:
+            bool: True if the database should be packed.
+        """
+        if not self.enabled or self.isPacking():
+            return False
+        if currentTime is None:
+            currentTime = time.time()
+        return currentTime - self.lastPackTime >= self.interval
+
+    def schedulePack(self, currentTime = None):
+        """ Start packing the database in the background if a pack is due.
+
+        This should be called when the processing becomes idle (ie. after a processing cycle completes).
+
+        Args:
+            currentTime (float): Current unix time. Default: None, which corresponds to now.
+        Returns:
+            bool: True if a pack was started.
+        """
+        if currentTime is None:
+            currentTime = time.time()
+        if not self.isPackDue(currentTime):
+            return False
+
+        self.lastPackTime = currentTime
+        packTime = currentTime - self.retentionDays * 24 * 60 * 60
+        self.packThread = threading.Thread(target = self.pack, kwargs = {"packTime": packTime}, name = "databasePacker")
+        self.packThread.daemon = True
+        self.packThread.start()
+        return True
+
+    def pack(self, packTime):
+        """ Pack the database, removing the history before the given time.
+
+        Args:
+            packTime (float): Unix time before which the history is removed.
+        Returns:
+            tuple: (reclaimed bytes, pack duration in seconds). None if the pack failed.
+        """
+        logger.info("Packing database, keeping history since {packTime}.".format(packTime = time.ctime(packTime)))
+        sizeBefore = self.db.getSize()
+        start = timeit.default_timer()
+        try:
+            self.db.pack(t = packTime)
+        except Exception as e:
+            # We don't want a failed pack to stop the processing. It will be attempted again next interval.
+            logger.warning("Packing the database failed with {e}".format(e = e))
+            return None
+        duration = timeit.default_timer() - start
+        reclaimed = sizeBefore - self.db.getSize()
+        logger.info("Packed database in {duration:.1f} seconds, reclaiming {reclaimed} bytes.".format(duration = duration, reclaimed = reclaimed))
+        return (reclaimed, duration)
+
+    def wait(self):
+        """ Wait for an in progress pack to finish.
+
+        Args:
+            None.
+        Returns:
+            None.
+        """
+        if self.packThread is not None:
+            self.packThread.join()
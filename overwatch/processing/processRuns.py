@@ -34,8 +34,12 @@ ROOT.gROOT.ProcessLine("gErrorIgnoreLevel = kWarning;")
 # General includes
 import copy
 import hashlib
+import io
+import json
+import math
 import os
 import uuid
+import numpy as np
 import logging
 logger = logging.getLogger(__name__)
 
@@ -57,7 +61,8 @@ from .trending.manager import TrendingManager
 
 
 def processRootFile(filename, outputFormatting, subsystem, processingOptions = None,
-                    forceRecreateSubsystem = False, trendingManager = None):
+                    forceRecreateSubsystem = False, trendingManager = None, definitionCatalog = None,
+                    progressCallback = None, histsToProcess = None, updateGeneration = True):
     """ Given a root file, process all histograms for a given subsystem.
 
     Processing includes assigning the contained histograms to a subsystem, allowing for customization via
@@ -92,6 +97,15 @@ def processRootFile(filename, outputFormatting, subsystem, processingOptions = N
             it will use the default subsystem processing options.
         forceRecreateSubsystem (bool): True if subsystems will be recreated, even if they already exist.
         trendingManager (TrendingManager): Manages the trending subsystem.
+        definitionCatalog (histogramDefinitionCatalog): Catalog of the shared histogram definitions. If provided,
+            the definitions of newly classified histograms are shared via the catalog. Default: None.
+        progressCallback (callable): Called with the number of processed histograms and the total number of
+            histograms after each histogram is processed. Default: None.
+        histsToProcess (set): Names of the histograms to process. Other histograms are skipped. Default: None,
+            which corresponds to processing all histograms.
+        updateGeneration (bool): True if the subsystem generation should be incremented to note that the
+            standard output has changed. Time slices write their own output, so they shouldn't update it.
+            Default: True.
     Returns:
         None. However, the underlying subsystems, histograms, etc, are modified.
     """
@@ -181,6 +195,9 @@ def processRootFile(filename, outputFormatting, subsystem, processingOptions = N
             if classifiedHist:
                 # Determine the processing functions to apply
                 pluginManager.findFunctionsForHist(subsystem, hist)
+                # Share the definition with the equivalent histograms in other runs.
+                if definitionCatalog is not None:
+                    hist.compact(definitionCatalog)
                 # Add it to the subsystem
                 subsystem.hists[hist.histName] = hist
             else:
@@ -198,8 +215,17 @@ def processRootFile(filename, outputFormatting, subsystem, processingOptions = N
     canvas = ROOT.TCanvas("processRunsCanvas{}{}".format(subsystem.subsystem, subsystem.startOfRun),
                           "processRunsCanvas{}{}".format(subsystem.subsystem, subsystem.startOfRun))
     # Loop over histograms and draw
+    histogramsTotal = sum(len(histGroup.histList) for histGroup in subsystem.histGroups)
+    if histsToProcess is not None:
+        histogramsTotal = len([histName for histGroup in subsystem.histGroups for histName in histGroup.histList if histName in histsToProcess])
+    histogramsProcessed = 0
     for histGroup in subsystem.histGroups:
         for histName in histGroup.histList:
+            if histsToProcess is not None and histName not in histsToProcess:
+                continue
+            if progressCallback is not None:
+                progressCallback(histogramsProcessed, histogramsTotal)
+            histogramsProcessed += 1
             # Retrieve histogram container and underlying histogram
             hist = subsystem.hists[histName]
             retrievedHist = hist.retrieveHistogram(fIn = fIn, ROOT = ROOT)
@@ -216,6 +242,20 @@ def processRootFile(filename, outputFormatting, subsystem, processingOptions = N
             processHist(subsystem = subsystem, hist = hist, canvas = canvas, outputFormatting = outputFormatting,
                         processingOptions = processingOptions, trendingManager = trendingManager)
 
+    if progressCallback is not None:
+        progressCallback(histogramsProcessed, histogramsTotal)
+
+    # Write the thumbnails and sprite sheets for the groups which are plotted in a grid, so the grid can be
+    # displayed with a single request.
+    if processingParameters["thumbnails"]["enabled"]:
+        for histGroupIndex, histGroup in enumerate(subsystem.histGroups):
+            if not histGroup.plotInGrid or not histGroup.histList:
+                continue
+            if histsToProcess is not None and not any(histName in histsToProcess for histName in histGroup.histList):
+                continue
+            writeSpriteSheet(subsystem = subsystem, histGroup = histGroup, histGroupIndex = histGroupIndex,
+                             outputFormatting = outputFormatting)
+
     # Delete the canvas. Although ROOT will mostly likely handle this eventually, the
     # garbage collection doesn't have to happen immediately. So we help it out by explictly
     # calling delete (which appears to delete object in some basic tests, even as far as ROOT
@@ -225,6 +265,10 @@ def processRootFile(filename, outputFormatting, subsystem, processingOptions = N
     # Since we are done, we can cleanup by closing the file.
     fIn.Close()
 
+    # Note that the output of the subsystem has changed, so cached representations are invalidated.
+    if updateGeneration:
+        subsystem.generation += 1
+
 def processHist(subsystem, hist, canvas, outputFormatting, processingOptions,
                 subsystemName = None, trendingManager = None):
     """ Main histogram processing function.
@@ -241,6 +285,7 @@ def processHist(subsystem, hist, canvas, outputFormatting, processingOptions,
     - Draw the histogram.
     - Apply the processing functions (if applicable).
     - Write the output to image and ``json``.
+    - Write the histogram data (bin contents, errors, and edges) as arrays for programmatic access.
     - Cleanup the hist and canvas by removing reference to them.
 
     Note:
@@ -318,7 +363,7 @@ def processHist(subsystem, hist, canvas, outputFormatting, processingOptions,
     logger.debug("histName: {}, hist: {}".format(hist.histName, hist.hist))
 
     if trendingManager:
-        trendingManager.notifyAboutNewHistogramValue(hist)
+        trendingManager.notifyAboutNewHistogramValue(hist, timeStamp = subsystem.endOfRun)
 
     # Save
     outputName = hist.histName
@@ -337,14 +382,105 @@ def processHist(subsystem, hist, canvas, outputFormatting, processingOptions,
                                              name = outputName,
                                              ext = "json")
     #logger.debug("jsonBufferFile: {jsonBufferFile}".format(jsonBufferFile = jsonBufferFile))
-    # GZip is performed by the web server, not here!
-    with open(jsonBufferFile, "wb") as f:
-        f.write(ROOT.TBufferJSON.ConvertToJSON(canvas).Data().encode())
+    # Precompressed variants are written alongside, so the web app can serve them without compressing on each request.
+    utilities.writeFileWithCompressedVariants(jsonBufferFile, ROOT.TBufferJSON.ConvertToJSON(canvas).Data().encode(),
+                                              processingParameters["jsonCompression"])
+
+    # Write the histogram data, which is served by the web app to programmatic clients.
+    # Stacks and other objects don't have a single set of bin contents, so they are skipped.
+    if processingParameters["writeHistogramData"] and hist.hist.InheritsFrom("TH1"):
+        histogramDataFile = outputFormatting.format(base = os.path.join(processingParameters["dirPrefix"], subsystem.jsonDir % {"subsystem": subsystemName}),
+                                                    name = outputName,
+                                                    ext = "npz")
+        output = io.BytesIO()
+        np.savez_compressed(output, **extractHistogramData(hist.hist))
+        # No compressed variants, since the arrays are already compressed.
+        utilities.writeFileWithCompressedVariants(histogramDataFile, output.getvalue(), {})
 
     # Clear hist and canvas so that we can successfully save
     hist.hist = None
     hist.canvas = None
 
+def writeSpriteSheet(subsystem, histGroup, histGroupIndex, outputFormatting):
+    """ Write thumbnails of the histograms in a group, along with a sprite sheet which contains all of them.
+
+    The thumbnails are downscaled from the histogram images, and are placed in the sprite sheet in the order
+    of the histograms in the group, in rows of ``thumbnails.columns`` thumbnails. Histograms without an image
+    leave an empty slot. The layout (an index of the offset of each histogram) is stored in the hist group
+    (as ``spriteSheet``) for the web app, and it is also written alongside the sprite sheet as ``json``.
+
+    Args:
+        subsystem (subsystemContainer): Subsystem which contains the hist group.
+        histGroup (histogramGroupContainer): Hist group for which the sprite sheet is written.
+        histGroupIndex (int): Index of the hist group in the subsystem. It is used to name the sprite sheet.
+        outputFormatting (str): Specially formatted string which contains a generic path to be used when printing
+            histograms.  It must contain ``base``, ``name``, and ``ext``, where ``base`` is the base path, ``name``
+            is the filename and ``ext`` is the extension. Ex: ``{base}/{name}.{ext}``.
+    Returns:
+        None. However, the sprite sheet layout is stored in the hist group.
+    """
+    thumbnailParameters = processingParameters["thumbnails"]
+    (width, height, columns) = (thumbnailParameters["width"], thumbnailParameters["height"], thumbnailParameters["columns"])
+    imgDir = os.path.join(processingParameters["dirPrefix"], subsystem.imgDir % {"subsystem": subsystem.subsystem})
+    spriteSheetName = "histGroup{histGroupIndex}.sprite".format(histGroupIndex = histGroupIndex)
+
+    rows = int(math.ceil(len(histGroup.histList) / float(columns)))
+    spriteSheet = ROOT.TASImage(columns * width, rows * height)
+    spriteSheet.FillRectangle("#ffffff", 0, 0, columns * width, rows * height)
+    offsets = {}
+    for i, histName in enumerate(histGroup.histList):
+        offsets[histName] = ((i % columns) * width, (i // columns) * height)
+        outputName = histName.replace("/", "_")
+        imageFilename = outputFormatting.format(base = imgDir, name = outputName, ext = processingParameters["fileExtension"])
+        if not os.path.exists(imageFilename):
+            continue
+        # The images are created by ROOT, so they need to be explicitly deleted.
+        thumbnail = ROOT.TImage.Open(imageFilename)
+        ROOT.SetOwnership(thumbnail, True)
+        thumbnail.Scale(width, height)
+        thumbnail.WriteImage(outputFormatting.format(base = imgDir, name = outputName,
+                                                     ext = "thumbnail." + processingParameters["fileExtension"]))
+        spriteSheet.Merge(thumbnail, "alphablend", *offsets[histName])
+        del thumbnail
+
+    spriteSheetFilename = outputFormatting.format(base = imgDir, name = spriteSheetName, ext = processingParameters["fileExtension"])
+    logger.debug("Saving sprite sheet to {spriteSheetFilename}".format(spriteSheetFilename = spriteSheetFilename))
+    spriteSheet.WriteImage(spriteSheetFilename)
+
+    layout = {"name": spriteSheetName, "width": width, "height": height, "columns": columns, "offsets": offsets}
+    utilities.writeFileWithCompressedVariants(outputFormatting.format(base = imgDir, name = spriteSheetName, ext = "json"),
+                                              json.dumps(layout).encode(), {})
+    # Only store the layout if it changed to avoid unnecessarily modifying the group.
+    if histGroup.spriteSheet != layout:
+        histGroup.spriteSheet = layout
+
+def extractHistogramData(hist):
+    """ Extract the bin contents, bin errors, and bin edges of a histogram as arrays.
+
+    The contents and errors have one dimension per histogram dimension (indexed as ``[x, y, z]``), and include
+    the underflow and overflow bins (ie. index 0 is the underflow, and index -1 is the overflow). The edges only
+    cover the regular bins, such that there are ``nBins + 1`` edges for each axis.
+
+    Args:
+        hist (TH1): Histogram (of any dimension) from which the data is extracted.
+    Returns:
+        dict: Arrays of the ``contents``, ``errors``, and ``xEdges`` (as well as ``yEdges`` and ``zEdges`` for
+            two and three dimensional histograms).
+    """
+    dimension = hist.GetDimension()
+    axes = [hist.GetXaxis(), hist.GetYaxis(), hist.GetZaxis()][:dimension]
+    # Includes the underflow and overflow bins.
+    shape = [axis.GetNbins() + 2 for axis in axes]
+    nCells = int(np.prod(shape))
+    # ROOT global bins are ordered with x varying the fastest, so we reverse the shape and then transpose.
+    contents = np.array([hist.GetBinContent(i) for i in range(nCells)]).reshape(shape[::-1]).T
+    errors = np.array([hist.GetBinError(i) for i in range(nCells)]).reshape(shape[::-1]).T
+
+    data = {"contents": contents, "errors": errors}
+    for axisName, axis in zip(["x", "y", "z"], axes):
+        data[axisName + "Edges"] = np.array([axis.GetBinLowEdge(i) for i in range(1, axis.GetNbins() + 2)])
+    return data
+
 def compareProcessingOptionsDicts(inputProcessingOptions, processingOptions, errors):
     """ Compare an input and existing processing options dictionaries.
 
@@ -497,7 +633,8 @@ def validateAndCreateNewTimeSlice(run, subsystem, minTimeMinutes, maxTimeMinutes
 
     return (uuidDictKey, True, None)
 
-def processTimeSlices(runs, runDir, minTimeRequested, maxTimeRequested, subsystemName, inputProcessingOptions):
+def processTimeSlices(runs, runDir, minTimeRequested, maxTimeRequested, subsystemName, inputProcessingOptions,
+                      histGroup = None, histName = None, progressCallback = None):
     """ Creates a time slice or performs user directed reprocessing.
 
     Time slices are created by processing a given run using only data in a given time range (and potentially modifying the
@@ -505,7 +642,12 @@ def processTimeSlices(runs, runDir, minTimeRequested, maxTimeRequested, subsyste
     selecting the full time range available for a given run. While the external interface is different, this capabilities
     are performed using the same underlying infrastructure as in the standard processing.
 
-    This function is usually invoked via the web app on a particular run page.
+    Only the histograms which are displayed for the requested hist group and histogram are processed, since
+    processing all of the histograms of a subsystem can be slow. The other histograms are processed when they
+    are requested for an existing time slice.
+
+    This function is usually invoked by the time slice job worker (see ``timeSliceJobs``), which handle the
+    requests submitted via the web app on a particular run page.
 
     Note:
         For the format of the errors that are returned, see the :doc:`web app README </webAppReadme>`.
@@ -520,6 +662,12 @@ def processTimeSlices(runs, runDir, minTimeRequested, maxTimeRequested, subsyste
         subsystemName (str): The subsystem of the time slice request by three letter, all capital name (ex. ``EMC``).
         inputProcessingOptions (dict): Processing options requested for the time slice. Keys are the names of
         the options, while values are the actual values of the processing options.
+        histGroup (str): Selection pattern of the requested hist group. Default: None, which corresponds to the
+            first hist group (as on the run page).
+        histName (str): Name of the requested histogram. Default: None, which corresponds to all of the histograms
+            in the hist group.
+        progressCallback (callable): Called with the number of processed histograms and the total number of
+            histograms as the histograms are processed. See ``processRootFile(...)``. Default: None.
     Returns:
         str or dict: If successful, we return the time slice key (str) under which the requested time slice is stored
             in the ``subsystemContainer.timeSlices`` dictionary. If an error was encountered, we return an error
@@ -539,27 +687,42 @@ def processTimeSlices(runs, runDir, minTimeRequested, maxTimeRequested, subsyste
     # the time slice - particularly in the case of an ongoing run.
     runDict = utilities.moveRootFiles(processingParameters["dirPrefix"], processingParameters["subsystemList"])
     processMovedFilesIntoRuns(runs, runDict)
+    # Keep the run list up to date. The run summaries are stored alongside the runs in the database root.
+    updateRunSummaries(runs._p_jar.root(), runDirs = list(runDict.keys()))
 
     # Validate and create (or retrieve) the ``timeSliceContainer``.
     (timeSliceKey, newlyCreated, errors) = validateAndCreateNewTimeSlice(run, subsystem, minTimeRequested, maxTimeRequested, inputProcessingOptions)
     # Handle any errors immediately.
     if errors:
         return errors
-    # It if already exists, we want to skip the processing and return immediately.
-    if not newlyCreated:
+    # The full processing is already available, so we can return immediately.
+    if timeSliceKey not in subsystem.timeSlices:
         return timeSliceKey
     timeSlice = subsystem.timeSlices[timeSliceKey]
 
-    # Merge the files that are included in the time slice.
+    # Determine the requested histograms which haven't yet been processed for this time slice.
+    # If the selection doesn't match any histograms, we fall back to processing all of them.
+    histNames = subsystem.selectedHistNames(histGroup = histGroup, histName = histName)
+    if not histNames:
+        histNames = [name for group in subsystem.histGroups for name in group.histList]
+    histsToProcess = timeSlice.unprocessedHists(histNames)
+    # It if already exists and the requested histograms are available, we want to skip the processing
+    # and return immediately.
+    if not histsToProcess:
+        return timeSliceKey
+
+    # Merge the files that are included in the time slice. For an existing time slice, they have already
+    # been merged.
     # Return if there were errors in merging
-    try:
-        mergeFiles.merge(processingParameters["dirPrefix"], run, subsystem,
-                         cumulativeMode = processingParameters["cumulativeMode"],
-                         timeSlice = timeSlice)
-    except ValueError as e:
-        # Return the merge error to the user.
-        # We want to return a list, so we just return all of the args.
-        return {"Merge Error": e.args}
+    if newlyCreated:
+        try:
+            mergeFiles.merge(processingParameters["dirPrefix"], run, subsystem,
+                             cumulativeMode = processingParameters["cumulativeMode"],
+                             timeSlice = timeSlice)
+        except ValueError as e:
+            # Return the merge error to the user.
+            # We want to return a list, so we just return all of the args.
+            return {"Merge Error": e.args}
 
     # Print time slice request variables for log
     logger.debug("Time slice request values:")
@@ -576,7 +739,11 @@ def processTimeSlices(runs, runDir, minTimeRequested, maxTimeRequested, subsyste
                                  subsystem.baseDir,
                                  timeSlice.filename.filename),
                     outputFormattingSave, subsystem,
-                    processingOptions = timeSlice.processingOptions)
+                    processingOptions = timeSlice.processingOptions,
+                    progressCallback = progressCallback,
+                    histsToProcess = set(histsToProcess),
+                    updateGeneration = False)
+    timeSlice.processedHists.update(histsToProcess)
 
     logger.info("Finished processing {prettyName}!".format(prettyName = run.prettyName))
 
@@ -656,6 +823,7 @@ def createNewSubsystemFromMovedFilesInformation(runs, subsystem, runDict, runDir
 
     # Flag that there are new files
     runs[runDir].subsystems[subsystem].newFile = True
+    runs[runDir].recordNewFiles(endOfRun)
 
 def processMovedFilesIntoRuns(runs, runDict):
     """ Convert the list of moved files into run and subsystem containers stored in the database.
@@ -771,6 +939,8 @@ def processMovedFilesIntoRuns(runs, runDict):
                         subsystem.endOfRun = fileKeys[-1]
                         # Also need to update the run length based on the new timestamps
                         subsystem.runLength = subsystem.calculateRunLength()
+                        # Keep track of the most recent file in the run.
+                        run.recordNewFiles(subsystem.endOfRun)
                     else:
                         # Scenario 2
                         # Create a new subsystem in an existing run.
@@ -804,6 +974,32 @@ def processMovedFilesIntoRuns(runs, runDict):
                     # to such a case, see ``createNewSubsystemFromMovedFilesInformation(...)``.
                     logger.warning(e.args[0])
 
+def updateRunSummaries(dbRoot, runDirs = None):
+    """ Update the run summary catalog, which is used by the web app to display the run list.
+
+    The catalog is created (from all runs) if it doesn't yet exist.
+
+    Args:
+        dbRoot (PersistentMapping): Database root, which contains the runs and the run summary catalog.
+        runDirs (list): Run directories (ex. ``Run123456``) of the runs which should be updated. Default: None,
+            which corresponds to all runs.
+    Returns:
+        None. The run summary catalog in the database is updated.
+    """
+    if "runSummaries" not in dbRoot:
+        logger.info("Creating run summary catalog.")
+        dbRoot["runSummaries"] = processingClasses.runSummaryCatalog()
+        runDirs = None
+    catalog = dbRoot["runSummaries"]
+    runs = dbRoot["runs"]
+
+    if runDirs is None:
+        runDirs = runs.keys()
+    for runDir in runDirs:
+        # Runs may not have been created (for example, for replayed data).
+        if runDir in runs:
+            catalog.updateRun(runs[runDir])
+
 def processAllRuns(dbRoot = None, connection = None):
     """ Driver function for processing all available data, storing the results in a database and on disk.
 
@@ -844,7 +1040,7 @@ def processAllRuns(dbRoot = None, connection = None):
     # Get the database. Create the connection if necessary.
     created_connection_in_this_function = False
     if dbRoot is None or connection is None:
-        (dbRoot, connection) = utilities.getDB(processingParameters["databaseLocation"])
+        (dbRoot, connection) = utilities.getDB(utilities.retrieveDatabaseLocation(processingParameters, "processing"))
         created_connection_in_this_function = True
 
     # Setup the runs dict by either retrieving it or recreating it.
@@ -857,13 +1053,31 @@ def processAllRuns(dbRoot = None, connection = None):
         # At the end of the previous processing run, this flag wasn't clear so we can know
         # which files were just processed. Since we are now starting a new processing run,
         # we now must be clear this flag so we don't reprocess those runs again.
+        updatedRunDirs = []
         for run in itervalues(runs):
             for subsystem in itervalues(run.subsystems):
                 if subsystem.newFile:
                     subsystem.newFile = False
+            updated = False
+            if run.newFile:
+                run.newFile = False
+                updated = True
+            # Runs which were stored before the last file time was available need to be initialized.
+            # The end of run corresponds to the time of the most recent file in each subsystem.
+            if run.lastFileTime < 0 and len(run.subsystems):
+                for subsystem in itervalues(run.subsystems):
+                    run.updateLastFileTime(subsystem.endOfRun)
+                updated = True
+            if updated:
+                updatedRunDirs.append(run.runDir)
+        # Ensure that the run list reflects that the runs no longer have new files.
+        updateRunSummaries(dbRoot, runDirs = updatedRunDirs)
     else:
         # Create the runs tree to store the information
         dbRoot["runs"] = BTrees.OOBTree.BTree()
+        # The run summaries will be recreated from the new runs.
+        if "runSummaries" in dbRoot:
+            del dbRoot["runSummaries"]
         runs = dbRoot["runs"]
 
         # The objects don't exist, so we need to create them.
@@ -918,6 +1132,7 @@ def processAllRuns(dbRoot = None, connection = None):
                                                                                  endOfRun = endOfRun,
                                                                                  showRootFiles = showRootFiles,
                                                                                  fileLocationSubsystem = fileLocationSubsystem)
+                run.updateLastFileTime(endOfRun)
 
                 # Store the file(s) information.
                 # `subsystemFiles` is a reference, so it will be updated when we add the files to the dictionary.
@@ -948,6 +1163,10 @@ def processAllRuns(dbRoot = None, connection = None):
     if "config" not in dbRoot:
         dbRoot["config"] = persistent.mapping.PersistentMapping()
 
+    # Create the catalog of the shared histogram definitions if necessary.
+    if "histogramDefinitions" not in dbRoot:
+        dbRoot["histogramDefinitions"] = processingClasses.histogramDefinitionCatalog()
+
     # Set up the trending.
     if processingParameters["trending"]:
         trendingManager = TrendingManager(dbRoot, processingParameters)
@@ -963,6 +1182,8 @@ def processAllRuns(dbRoot = None, connection = None):
     runDict = utilities.moveRootFiles(processingParameters["dirPrefix"], processingParameters["subsystemList"])
     logger.info("Files moved: {runDict}".format(runDict = runDict))
     processMovedFilesIntoRuns(runs, runDict)
+    # Keep the run list up to date.
+    updateRunSummaries(dbRoot, runDirs = list(runDict.keys()))
 
     # Potentially helpful debug information
     if processingParameters["debug"]:
@@ -981,41 +1202,63 @@ def processAllRuns(dbRoot = None, connection = None):
                               processingParameters["cumulativeMode"])
 
     # Perform the actual histogram processing
+    # The changes are committed in batches, which avoids most of the commit overhead when catching up on many runs.
+    batcher = utilities.commitBatcher(maxChanges = processingParameters["commitBatching"]["maxRuns"],
+                                      maxSeconds = processingParameters["commitBatching"]["maxSeconds"])
     outputFormattingSave = os.path.join("{base}", "{name}.{ext}")
+    # Every processed run has a new file (and therefore appears to be ongoing), so only the most recent run is
+    # committed immediately. The run numbers have the same number of digits, so the most recent run is the max key.
+    mostRecentRunDir = runs.maxKey() if runs else None
     for runDir, run in iteritems(runs):
-        for subsystem in run.subsystems.values():
-            # Process the subsystem if there is a new file or we explicitly ask for
-            # processing by forcing it.
-            # We can force either generally (`forceReprocess`), or for particular runs (`forceReprocessRuns`)
-            if subsystem.newFile or processingParameters["forceReprocessing"] or int(runDir.replace("Run", "")) in processingParameters["forceReprocessRuns"]:
-                # Process combined root file: plot histograms and save the results of the processing
-                # in both image and `json` on the disk.
-                logger.info("About to process {prettyName}, {subsystem}".format(prettyName = run.prettyName, subsystem = subsystem.subsystem))
-                processRootFile(
-                    filename = os.path.join(processingParameters["dirPrefix"], subsystem.combinedFile.filename),
-                    outputFormatting = outputFormattingSave,
-                    subsystem = subsystem,
-                    forceRecreateSubsystem = processingParameters["forceRecreateSubsystem"],
-                    trendingManager = trendingManager,
-                )
-                # TODO need additional info
-                # As of August 2018, this is where the trending container should step in to
-                # update the trending objects if they are not entirely up to date (say, if they're
-                # missing entries because the trending objects were recreated).
-                # TODO: Loop over process root file with various until it is up to date
-                pass
-            else:
-                # We often want to skip processing since most runs won't have new files and will not need to be processed most times.
-                logger.debug("Don't need to process {prettyName} for subsystem {subsystem}. It has already been processed".format(prettyName = run.prettyName, subsystem = subsystem.subsystem))
+        # The savepoint allows us to discard the changes from a run which fails without discarding
+        # the other runs in the batch.
+        savepoint = batcher.savepoint()
+        processedRun = False
+        try:
+            for subsystem in run.subsystems.values():
+                # Process the subsystem if there is a new file or we explicitly ask for
+                # processing by forcing it.
+                # We can force either generally (`forceReprocess`), or for particular runs (`forceReprocessRuns`)
+                if subsystem.newFile or processingParameters["forceReprocessing"] or int(runDir.replace("Run", "")) in processingParameters["forceReprocessRuns"]:
+                    # Process combined root file: plot histograms and save the results of the processing
+                    # in both image and `json` on the disk.
+                    logger.info("About to process {prettyName}, {subsystem}".format(prettyName = run.prettyName, subsystem = subsystem.subsystem))
+                    processRootFile(
+                        filename = os.path.join(processingParameters["dirPrefix"], subsystem.combinedFile.filename),
+                        outputFormatting = outputFormattingSave,
+                        subsystem = subsystem,
+                        forceRecreateSubsystem = processingParameters["forceRecreateSubsystem"],
+                        trendingManager = trendingManager,
+                        definitionCatalog = dbRoot["histogramDefinitions"],
+                    )
+                    processedRun = True
+                    # NOTE: Trending objects which are new or were recreated are only filled from here
+                    #       onwards. Values from previously processed runs can be filled in with the
+                    #       trending backfill (see ``overwatch.processing.trending.backfill``).
+                else:
+                    # We often want to skip processing since most runs won't have new files and will not need to be processed most times.
+                    logger.debug("Don't need to process {prettyName} for subsystem {subsystem}. It has already been processed".format(prettyName = run.prettyName, subsystem = subsystem.subsystem))
+        except Exception as e:
+            # Discard the changes to this run so that the rest of the batch can still be committed.
+            savepoint.rollback()
+            logger.warning("Processing {prettyName} failed with {e}. Skipping it!".format(prettyName = run.prettyName, e = e))
+            continue
 
-        # Commit after we have successfully processed each run
-        transaction.commit()
+        # Commit once the batch is full. The most recent run is always committed immediately, so the most recent
+        # data is both available to the web app and safe in case of a crash.
+        if processedRun:
+            batcher.recordChange(force = runDir == mostRecentRunDir)
+
+    # Commit the rest of the batch.
+    batcher.commit()
 
     logger.info("Finished standard processing!")
 
     # Run trending now that we have gotten to the most recent run
     if trendingManager:
         trendingManager.processTrending()
+        # Let readers of the trending (such as the web app) know that it has changed.
+        trendingManager.updateVersion()
         # Commit after we have successfully processed the trending
         transaction.commit()
         logger.info("Finished trending processing!")
@@ -17,14 +17,16 @@ Note:
 
 from __future__ import print_function
 from __future__ import absolute_import
-from future.utils import iteritems
-from future.utils import itervalues
 
 # Database
+import BTrees.IOBTree
+import BTrees.Length
 import BTrees.OOBTree
 import persistent
 
 import os
+import time
+import uuid
 import pendulum
 import logging
 # Setup logger
@@ -35,6 +37,46 @@ from ..base import config
 #from config.processingParams import processingParameters
 (processingParameters, filesRead) = config.readConfig(config.configurationType.processing)
 
+def minutesSinceTimestamp(unixTime):
+    """ Determine the time since the given file timestamp in minutes.
+
+    Args:
+        unixTime (int): Unix time of a file. -1 if it is unknown.
+    Returns:
+        float: Minutes since the timestamp. -1 if the timestamp is unknown.
+    """
+    if unixTime < 0:
+        return -1
+    # The timestamps of the files are set in Geneva, so we need to construct the timestamp in Geneva
+    # to compare against. The proper timezone for this is "Europe/Zurich".
+    geneva = pendulum.from_timestamp(unixTime, tz = "Europe/Zurich")
+    now = pendulum.now()
+    # Return in minutes
+    return now.diff(geneva).in_minutes()
+
+def isRunOngoing(newFile, lastFileTime):
+    """ Determine whether a run is ongoing based on whether it received a new file and its most recent file time.
+
+    Args:
+        newFile (bool): True if the run received a new file in the most recent processing.
+        lastFileTime (int): Unix time of the most recent file in the run. -1 if it is unknown.
+    Returns:
+        bool: True if the run is ongoing.
+    """
+    if newFile is True:
+        # We know we have a new file, so nothing else needs to be done.
+        return True
+
+    # If we haven't found a new file, we'll check the time stamps.
+    logger.debug("Checking timestamps for whether the run in ongoing.")
+    minutesSinceLastTimestamp = minutesSinceTimestamp(lastFileTime)
+    logger.debug("{minutesSinceLastTimestamp} minutes since the last timestamp.".format(minutesSinceLastTimestamp = minutesSinceLastTimestamp))
+    # Compare the unix timestamps with a five minute buffer period.
+    # This buffer time is arbitrarily selected, but the value is motivated by a balance to ensure
+    # that a missed file doesn't cause the run to appear over, while also not claiming that the
+    # run continues much longer than it actually does. If the time is unknown, the run can't be ongoing.
+    return 0 <= minutesSinceLastTimestamp < 5
+
 class runContainer(persistent.Persistent):
     """ Object to represent a particular run.
 
@@ -73,7 +115,14 @@ class runContainer(persistent.Persistent):
         hltMode (str): Mode the HLT operated in for this run. Valid HLT modes are "B", "C", "E", and "U".
             Further information on the various modes is in the :doc:`processing README </processingReadme>`.
             Default: ``None`` (which will be converted to "U", for "unknown").
+        lastFileTime (int): Unix time of the most recent file in any subsystem of the run. -1 if it is unknown.
+            It is updated as files are added, so it doesn't need to be determined from the subsystem files.
+        newFile (bool): True if any subsystem received a new file in the most recent processing.
     """
+    # Defaults for runs which were stored before these values were available.
+    lastFileTime = -1
+    newFile = False
+
     def __init__(self, runDir, fileMode, hltMode = None):
         self.runDir = runDir
         self.runNumber = int(runDir.replace("Run", ""))
@@ -81,6 +130,8 @@ class runContainer(persistent.Persistent):
         self.mode = fileMode
         self.subsystems = BTrees.OOBTree.BTree()
         self.hltMode = hltMode
+        self.lastFileTime = -1
+        self.newFile = False
 
         # Try to retrieve the HLT mode if it was not passed
         runDirectory = os.path.join(processingParameters["dirPrefix"], self.runDir)
@@ -107,6 +158,28 @@ class runContainer(persistent.Persistent):
                                                                       subsystems = list(self.subsystems.keys()),
                                                                       hltMode = self.hltMode)
 
+    def updateLastFileTime(self, fileTime):
+        """ Update the time of the most recent file in the run.
+
+        Args:
+            fileTime (int): Unix time of a file in the run.
+        Returns:
+            None.
+        """
+        if fileTime > self.lastFileTime:
+            self.lastFileTime = fileTime
+
+    def recordNewFiles(self, fileTime):
+        """ Note that new files were added to the run.
+
+        Args:
+            fileTime (int): Unix time of the most recent new file.
+        Returns:
+            None.
+        """
+        self.newFile = True
+        self.updateLastFileTime(fileTime)
+
     def isRunOngoing(self):
         """ Checks if a run is ongoing.
 
@@ -115,7 +188,7 @@ class runContainer(persistent.Persistent):
         is ongoing.
 
         Note:
-            If ``subsystem.newFile`` is false, this is not a sufficient condition to say that
+            If ``newFile`` is false, this is not a sufficient condition to say that
             the run has ended. This is because ``newFile`` will be set to false if the subsystem
             didn't have a file in the most recent processing run, even if the run is still
             ongoing. This can happen for many reasons, including if the processing is executed
@@ -127,29 +200,7 @@ class runContainer(persistent.Persistent):
         Returns:
             bool: True if the run is ongoing.
         """
-        returnValue = False
-        try:
-            for subsystem in itervalues(self.subsystems):
-                if subsystem.newFile is True:
-                    # We know we have a new file, so nothing else needs to be done. Just return it.
-                    returnValue = True
-                    break
-
-            # If we haven't found a new file yet, we'll check the time stamps.
-            if returnValue is False:
-                logger.debug("Checking timestamps for whether the run in ongoing.")
-                minutesSinceLastTimestamp = self.minutesSinceLastTimestamp()
-                logger.debug("{minutesSinceLastTimestamp} minutes since the last timestamp.".format(minutesSinceLastTimestamp = minutesSinceLastTimestamp))
-                # Compare the unix timestamps with a five minute buffer period.
-                # This buffer time is arbitrarily selected, but the value is motivated by a balance to ensure
-                # that a missed file doesn't cause the run to appear over, while also not claiming that the
-                # run continues much longer than it actually does.
-                if minutesSinceLastTimestamp < 5:
-                    returnValue = True
-        except KeyError:
-            returnValue = False
-
-        return returnValue
+        return isRunOngoing(self.newFile, self.lastFileTime)
 
     def minutesSinceLastTimestamp(self):
         """ Determine the time since the last file timestamp in minutes.
@@ -159,25 +210,7 @@ class runContainer(persistent.Persistent):
         Returns:
             float: Minutes since the timestamp of the most recent file. Default: -1.
         """
-        timeSinceLastTimestamp = -1
-        try:
-            mostRecentTimestamp = -1
-            for subsystem in itervalues(self.subsystems):
-                newestFile = subsystem.files[subsystem.files.keys()[-1]]
-                if newestFile.fileTime > mostRecentTimestamp:
-                    mostRecentTimestamp = newestFile.fileTime
-
-            # The timestamps of the files are set in Geneva, so we need to construct the timestamp in Geneva
-            # to compare against. The proper timezone for this is "Europe/Zurich".
-            geneva = pendulum.from_timestamp(mostRecentTimestamp, tz = "Europe/Zurich")
-            now = pendulum.now()
-            # Return in minutes
-            timeSinceLastTimestamp = now.diff(geneva).in_minutes()
-        except KeyError:
-            # If there is a KeyError somewhere, we just ignore it and pass back the default value.
-            pass
-
-        return timeSinceLastTimestamp
+        return minutesSinceTimestamp(self.lastFileTime)
 
     def startOfRunTimeStamp(self):
         """ Provides the start of the run time stamp in a format suitable for display.
@@ -202,6 +235,188 @@ class runContainer(persistent.Persistent):
 
         return returnValue
 
+class runSummaryContainer(persistent.Persistent):
+    """ Compact summary of a run, which contains the information needed for the run list.
+
+    The summary is stored separately from the ``runContainer`` so that the run list doesn't need to load
+    the run containers (and their subsystems) from the database.
+
+    Args:
+        run (runContainer): Run to be summarized.
+
+    Attributes:
+        runDir (str): String containing the run number. For an example run 123456, it should be
+            formatted as ``Run123456``.
+        runNumber (int): Run number extracted from the ``runDir``.
+        prettyName (str): Reformatting of the ``runDir`` for improved readability.
+        hltMode (str): Mode the HLT operated in for this run.
+        subsystems (tuple): Names of the subsystems which are available in the run.
+        startOfRun (int): Unix time of the start of the run. -1 if the run doesn't contain any subsystems.
+        lastFileTime (int): Unix time of the most recent file in the run. -1 if it is unknown.
+        newFile (bool): True if the run received a new file in the most recent processing.
+    """
+    # Defaults for summaries which were stored before these values were available.
+    lastFileTime = -1
+    newFile = False
+
+    def __init__(self, run):
+        self.runDir = run.runDir
+        self.runNumber = run.runNumber
+        self.prettyName = run.prettyName
+        self.update(run)
+
+    def update(self, run):
+        """ Update the summary from the given run.
+
+        Only values which have changed are assigned so that unchanged summaries aren't written again.
+
+        Args:
+            run (runContainer): Run which is summarized.
+        Returns:
+            None.
+        """
+        subsystems = tuple(run.subsystems.keys())
+        # Any subsystem will do to determine the start of the run. See ``runContainer.startOfRunTimeStamp()``.
+        startOfRun = run.subsystems[subsystems[-1]].startOfRun if subsystems else -1
+        values = [("hltMode", run.hltMode), ("subsystems", subsystems), ("startOfRun", startOfRun),
+                  ("lastFileTime", run.lastFileTime), ("newFile", run.newFile)]
+        for attributeName, value in values:
+            if getattr(self, attributeName, None) != value:
+                setattr(self, attributeName, value)
+
+    def startOfRunTimeStamp(self):
+        """ Provides the start of the run time stamp in a format suitable for display.
+
+        Args:
+            None
+        Returns:
+            str or bool: Start of run time stamp formatted in an appropriate manner for display, or False
+                if the run doesn't contain any subsystems.
+        """
+        if self.startOfRun < 0:
+            return False
+        return subsystemContainer.prettyPrintUnixTime(self.startOfRun)
+
+    def isRunOngoing(self):
+        """ Checks if the run is ongoing. See ``runContainer.isRunOngoing()``.
+
+        Args:
+            None
+        Returns:
+            bool: True if the run is ongoing.
+        """
+        return isRunOngoing(self.newFile, self.lastFileTime)
+
+    def minutesSinceLastTimestamp(self):
+        """ Determine the time since the last file timestamp in minutes.
+
+        Args:
+            None.
+        Returns:
+            float: Minutes since the timestamp of the most recent file. Default: -1.
+        """
+        return minutesSinceTimestamp(self.lastFileTime)
+
+class runSummaryCatalog(persistent.Persistent):
+    """ Catalog of the run summaries, which is used to display the run list.
+
+    The summaries are stored in a tree keyed by the negative run number, so iterating over the tree starts
+    from the most recent run. A page of runs can then be retrieved via the key range, such that the cost
+    only depends on the number of runs on the page (rather than on the total number of runs).
+
+    Args:
+        None.
+
+    Attributes:
+        summaries (IOBTree): Run summaries keyed by the negative run number.
+        numberOfRuns (Length): Number of runs in the catalog.
+        lastFileTime (int): Unix time of the most recent file in any run. -1 if it is unknown.
+    """
+    # Default for catalogs which were stored before this value was available.
+    lastFileTime = -1
+
+    def __init__(self):
+        self.summaries = BTrees.IOBTree.BTree()
+        self.numberOfRuns = BTrees.Length.Length()
+        self.lastFileTime = -1
+
+    def __len__(self):
+        return self.numberOfRuns()
+
+    def updateRun(self, run):
+        """ Add or update the summary of the given run.
+
+        Args:
+            run (runContainer): Run to be added or updated.
+        Returns:
+            None.
+        """
+        summary = self.summaries.get(-run.runNumber)
+        if summary is None:
+            self.summaries[-run.runNumber] = runSummaryContainer(run)
+            self.numberOfRuns.change(1)
+        else:
+            summary.update(run)
+
+        if run.lastFileTime > self.lastFileTime:
+            self.lastFileTime = run.lastFileTime
+
+    def minutesSinceLastTimestamp(self):
+        """ Determine the time since the most recent file of any run in minutes.
+
+        Args:
+            None.
+        Returns:
+            float: Minutes since the timestamp of the most recent file. Default: -1.
+        """
+        return minutesSinceTimestamp(self.lastFileTime)
+
+    def mostRecentRun(self):
+        """ Retrieve the summary of the most recent run.
+
+        Args:
+            None.
+        Returns:
+            runSummaryContainer: Summary of the most recent run, or None if the catalog is empty.
+        """
+        if not self.summaries:
+            return None
+        return self.summaries[self.summaries.minKey()]
+
+    def page(self, startRunNumber = 0, numberOfRuns = 50):
+        """ Retrieve a page of runs, ordered from the most recent to the oldest run.
+
+        Args:
+            startRunNumber (int): Run number of the first (most recent) run on the page. Runs which are more
+                recent are not included. Default: 0, which starts from the most recent run.
+            numberOfRuns (int): Maximum number of runs on the page. Default: 50.
+        Returns:
+            tuple: (summaries, nextRunNumber, previousRunNumber), where summaries (list) are the summaries on the
+                page, nextRunNumber (int) is the first run number of the next (older) page, and previousRunNumber
+                (int) is the first run number of the previous (more recent) page. They are ``None`` if there is
+                no such page.
+        """
+        startKey = -startRunNumber if startRunNumber else None
+        summaries = []
+        nextRunNumber = None
+        for key, summary in self.summaries.iteritems(min = startKey):
+            if len(summaries) == numberOfRuns:
+                nextRunNumber = -key
+                break
+            summaries.append(summary)
+
+        # Walk towards more recent runs to find the start of the previous page.
+        previousRunNumber = None
+        key = startKey
+        for _ in range(numberOfRuns if startKey is not None else 0):
+            try:
+                key = self.summaries.maxKey(key - 1)
+            except ValueError:
+                break
+            previousRunNumber = -key
+
+        return (summaries, nextRunNumber, previousRunNumber)
+
 class subsystemContainer(persistent.Persistent):
     """ Object to represent a particular subsystem (detector).
 
@@ -268,7 +483,12 @@ class subsystemContainer(persistent.Persistent):
             standard processing. The subsystem processing options can vary when processing a time slice,
             so storing the options allow us to return to the standard options when performing a full processing.
             Keys are the option names as string, while values are their corresponding values.
+        generation (int): Counter which is incremented each time that the output of the subsystem is written
+            (ie. each time that it is processed). It can be used to invalidate caches of the subsystem output.
     """
+    # Default for subsystems which were stored before this value was available.
+    generation = 0
+
     def __init__(self, subsystem, runDir, startOfRun, endOfRun, showRootFiles = False, fileLocationSubsystem = None):
         self.subsystem = subsystem
         self.showRootFiles = showRootFiles
@@ -325,6 +545,9 @@ class subsystemContainer(persistent.Persistent):
         # Processing options
         self.processingOptions = persistent.mapping.PersistentMapping()
 
+        # Incremented when the output changes
+        self.generation = 0
+
     def calculateRunLength(self, startOfRun = None, endOfRun = None):
         """ Helper function to update the run length.
 
@@ -427,6 +650,25 @@ class subsystemContainer(persistent.Persistent):
         self.histsAvailable.clear()
         self.hists.clear()
 
+    def selectedHistNames(self, histGroup = None, histName = None):
+        """ Determine the names of the histograms which are displayed for a hist group and hist selection.
+
+        The selection follows the run page. If no hist group is selected, the first hist group which contains
+        histograms is selected. If no histogram is selected, all of the histograms in the group are selected.
+
+        Args:
+            histGroup (str): Selection pattern of the selected hist group. Default: None.
+            histName (str): Name of the selected histogram. Default: None.
+        Returns:
+            list: Names of the selected histograms. Empty if nothing matches the selection.
+        """
+        for group in self.histGroups:
+            if histGroup is None and not group.histList:
+                continue
+            if histGroup is None or group.selectionPattern == histGroup:
+                return [name for name in group.histList if histName is None or name == histName]
+        return []
+
 class timeSliceContainer(persistent.Persistent):
     """ Time slice information container.
 
@@ -461,7 +703,13 @@ class timeSliceContainer(persistent.Persistent):
         processingOptions (PersistentMapping): Implemented by the time slice container to note options used
             during standard processing. The time slice processing options can vary when compared to standard
             subsystem processing, so storing the options allow us to apply the custom time slice options.
+        processedHists (OOTreeSet): Names of the histograms which have been processed for the time slice. Time
+            slices only process the requested histograms, with the rest processed when they are requested. None
+            for time slices which were created before this was available, for which all histograms were processed.
     """
+    # Default for time slices stored before the processed histograms were recorded.
+    processedHists = None
+
     def __init__(self, minUnixTimeRequested, maxUnixTimeRequested, minUnixTimeAvailable, maxUnixTimeAvailable, startOfRun, filesToMerge, optionsHash):
         # Requested times
         self.minUnixTimeRequested = minUnixTimeRequested
@@ -488,6 +736,9 @@ class timeSliceContainer(persistent.Persistent):
         # Same as the type of options implemented in the subsystemContainer!
         self.processingOptions = persistent.mapping.PersistentMapping()
 
+        # Histograms which have been processed for this time slice.
+        self.processedHists = BTrees.OOBTree.TreeSet()
+
     def __repr__(self):
         """ Representation of the object. """
         # Dummy call. See note at the top of the module.
@@ -539,6 +790,240 @@ class timeSliceContainer(persistent.Persistent):
         """
         return round(self.timeInMinutes(inputTime))
 
+    def unprocessedHists(self, histNames):
+        """ Determine which of the given histograms haven't yet been processed for the time slice.
+
+        Args:
+            histNames (list): Names of the histograms of interest.
+        Returns:
+            list: Names of the histograms which still need to be processed.
+        """
+        if self.processedHists is None:
+            return []
+        return [histName for histName in histNames if histName not in self.processedHists]
+
+class timeSliceJob(persistent.Persistent):
+    """ Time slice (or user reprocessing) request which is processed asynchronously.
+
+    Args:
+        jobId (str): Unique identifier of the job.
+        runDir (str): String containing the requested run number. For an example run 123456, it should be
+            formatted as ``Run123456``.
+        subsystem (str): The subsystem of the request by three letter, all capital name (ex. ``EMC``).
+        minTime (float): Requested start time of the time slice in minutes.
+        maxTime (float): Requested end time of the time slice in minutes.
+        processingOptions (dict): Processing options requested for the time slice.
+        histGroup (str): Selection pattern of the requested hist group. None corresponds to the first hist group.
+        histName (str): Name of the requested histogram. None corresponds to all histograms in the hist group.
+        submitTime (float): Unix time when the job was submitted.
+
+    Attributes:
+        jobId (str): Unique identifier of the job.
+        runDir (str): String containing the requested run number.
+        subsystem (str): The subsystem of the request by three letter, all capital name (ex. ``EMC``).
+        minTime (float): Requested start time of the time slice in minutes.
+        maxTime (float): Requested end time of the time slice in minutes.
+        processingOptions (dict): Processing options requested for the time slice.
+        histGroup (str): Selection pattern of the requested hist group.
+        histName (str): Name of the requested histogram.
+        submitTime (float): Unix time when the job was submitted.
+        finishTime (float): Unix time when the job finished. None if it hasn't yet finished.
+        state (str): State of the job. One of ``queued``, ``running``, ``done``, or ``failed``.
+        claimTime (float): Unix time when a worker most recently claimed the job. None if it hasn't been claimed.
+        heartbeatTime (float): Unix time when the worker processing the job most recently renewed its lease (ie.
+            when it claimed the job or recorded its progress). None if the job isn't running.
+        expiredLeases (int): Number of times that the lease of the job expired (ie. the worker processing it
+            stopped unexpectedly).
+        histogramsProcessed (int): Number of histograms which have been processed.
+        histogramsTotal (int): Total number of histograms to be processed. 0 if it isn't yet known.
+        result (str or dict): Time slice key if the job is done, or the error dictionary if the job failed.
+            None if the job hasn't finished.
+    """
+    finishedStates = ("done", "failed")
+    # Jobs which were created before the leases were introduced.
+    claimTime = None
+    heartbeatTime = None
+    expiredLeases = 0
+
+    def __init__(self, jobId, runDir, subsystem, minTime, maxTime, processingOptions, histGroup, histName, submitTime):
+        self.jobId = jobId
+        self.runDir = runDir
+        self.subsystem = subsystem
+        self.minTime = minTime
+        self.maxTime = maxTime
+        self.processingOptions = dict(processingOptions)
+        self.histGroup = histGroup
+        self.histName = histName
+        self.submitTime = submitTime
+        self.finishTime = None
+
+        self.state = "queued"
+        self.claimTime = None
+        self.heartbeatTime = None
+        self.expiredLeases = 0
+        self.histogramsProcessed = 0
+        self.histogramsTotal = 0
+        self.result = None
+
+    @staticmethod
+    def createRequestKey(runDir, subsystem, minTime, maxTime, processingOptions, histGroup, histName):
+        """ Create a key which identifies equivalent requests.
+
+        Args:
+            runDir (str): String containing the requested run number.
+            subsystem (str): The subsystem of the request.
+            minTime (float): Requested start time of the time slice in minutes.
+            maxTime (float): Requested end time of the time slice in minutes.
+            processingOptions (dict): Processing options requested for the time slice.
+            histGroup (str): Selection pattern of the requested hist group.
+            histName (str): Name of the requested histogram.
+        Returns:
+            tuple: Key of the request.
+        """
+        return (runDir, subsystem, minTime, maxTime, tuple(sorted(processingOptions.items())), histGroup, histName)
+
+    def requestKey(self):
+        """ Key which identifies equivalent requests. See ``createRequestKey(...)``. """
+        return self.createRequestKey(self.runDir, self.subsystem, self.minTime, self.maxTime, self.processingOptions,
+                                     self.histGroup, self.histName)
+
+    def isFinished(self):
+        """ Check whether the job has finished (successfully or not).
+
+        Args:
+            None.
+        Returns:
+            bool: True if the job has finished.
+        """
+        return self.state in self.finishedStates
+
+    def isStale(self, now, leaseTimeout):
+        """ Check whether the lease of a running job has expired.
+
+        The worker processing a job renews its lease each time that it records progress. If it doesn't renew
+        the lease within the timeout, the worker presumably stopped (for example, because it was restarted).
+
+        Args:
+            now (float): Current unix time.
+            leaseTimeout (float): Time after which the lease expires in seconds.
+        Returns:
+            bool: True if the job is running, but its lease has expired.
+        """
+        if self.state != "running":
+            return False
+        # Running jobs without a heartbeat were claimed before leases were introduced, so they are always stale.
+        return self.heartbeatTime is None or now - self.heartbeatTime > leaseTimeout
+
+class timeSliceJobQueue(persistent.Persistent):
+    """ Queue of the time slice jobs, which is shared by all of the web app processes.
+
+    Equivalent requests which are submitted while a job is still queued or running are coalesced into that job,
+    unless the lease of the running job has expired.
+
+    Args:
+        None.
+
+    Attributes:
+        jobs (OOBTree): Time slice jobs keyed by their job id.
+    """
+    def __init__(self):
+        self.jobs = BTrees.OOBTree.BTree()
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def submit(self, runDir, subsystem, minTime, maxTime, processingOptions, histGroup = None, histName = None,
+               submitTime = None, leaseTimeout = None):
+        """ Submit a time slice job, or retrieve an equivalent job which hasn't yet finished.
+
+        Args:
+            runDir (str): String containing the requested run number.
+            subsystem (str): The subsystem of the request.
+            minTime (float): Requested start time of the time slice in minutes.
+            maxTime (float): Requested end time of the time slice in minutes.
+            processingOptions (dict): Processing options requested for the time slice.
+            histGroup (str): Selection pattern of the requested hist group. Default: None.
+            histName (str): Name of the requested histogram. Default: None.
+            submitTime (float): Unix time of the submission. Default: None, which corresponds to now.
+            leaseTimeout (float): Time after which the lease of a running job expires in seconds. Requests aren't
+                coalesced into running jobs whose lease has expired. Default: None, which coalesces into any
+                unfinished job.
+        Returns:
+            tuple: (timeSliceJob, bool): The job which handles the request, and True if it was newly submitted.
+        """
+        if submitTime is None:
+            submitTime = time.time()
+        requestKey = timeSliceJob.createRequestKey(runDir, subsystem, minTime, maxTime, processingOptions, histGroup, histName)
+        for job in self.jobs.values():
+            if job.isFinished() or job.requestKey() != requestKey:
+                continue
+            if leaseTimeout is not None and job.isStale(submitTime, leaseTimeout):
+                continue
+            return (job, False)
+
+        job = timeSliceJob(jobId = uuid.uuid4().hex,
+                           runDir = runDir,
+                           subsystem = subsystem,
+                           minTime = minTime,
+                           maxTime = maxTime,
+                           processingOptions = processingOptions,
+                           histGroup = histGroup,
+                           histName = histName,
+                           submitTime = submitTime)
+        self.jobs[job.jobId] = job
+        return (job, True)
+
+    def nextQueuedJob(self):
+        """ Retrieve the queued job which was submitted first.
+
+        Args:
+            None.
+        Returns:
+            timeSliceJob: The next job to be processed. None if there are no queued jobs.
+        """
+        queuedJobs = [job for job in self.jobs.values() if job.state == "queued"]
+        if not queuedJobs:
+            return None
+        return min(queuedJobs, key = lambda job: job.submitTime)
+
+    def handleStaleJobs(self, now, leaseTimeout, maxExpiredLeases):
+        """ Requeue (or fail) the running jobs whose lease has expired.
+
+        A job whose lease has expired ``maxExpiredLeases`` times is failed rather than requeued, so that a job
+        which repeatedly causes the worker to stop doesn't block the queue.
+
+        Args:
+            now (float): Current unix time.
+            leaseTimeout (float): Time after which the lease of a running job expires in seconds.
+            maxExpiredLeases (int): Number of expired leases after which a job fails.
+        Returns:
+            int: Number of stale jobs which were handled.
+        """
+        staleJobs = [job for job in self.jobs.values() if job.isStale(now, leaseTimeout)]
+        for job in staleJobs:
+            job.expiredLeases += 1
+            job.heartbeatTime = None
+            if job.expiredLeases >= maxExpiredLeases:
+                job.state = "failed"
+                job.result = {"Processing Error": ["The time slice processing stopped unexpectedly. Please try again or contact the admin!"]}
+                job.finishTime = now
+            else:
+                job.state = "queued"
+        return len(staleJobs)
+
+    def removeFinishedJobs(self, finishedBefore):
+        """ Remove the jobs which finished before the given time.
+
+        Args:
+            finishedBefore (float): Unix time before which finished jobs are removed.
+        Returns:
+            int: Number of jobs which were removed.
+        """
+        jobIds = [jobId for jobId, job in self.jobs.items() if job.isFinished() and job.finishTime < finishedBefore]
+        for jobId in jobIds:
+            del self.jobs[jobId]
+        return len(jobIds)
+
 class fileContainer(persistent.Persistent):
     """ File information container.
 
@@ -623,12 +1108,19 @@ class histogramGroupContainer(persistent.Persistent):
             plotted in a grid.
         plotInGrid (bool): True when the histograms should be plotted in a grid.
         histList (PersistentList): List of histogram names that should be filled when the ``selectionPattern`` is matched.
+        spriteSheet (dict): Layout of the sprite sheet of the histogram thumbnails, containing the ``name`` of the
+            sprite sheet, the ``width`` and ``height`` of the thumbnails, the number of ``columns``, and the
+            ``offsets`` (x, y) of each histogram. None if no sprite sheet has been written for the group.
     """
+    # Groups which were created before the sprite sheets were introduced don't have one until they are processed again.
+    spriteSheet = None
+
     def __init__(self, prettyName, groupSelectionPattern, plotInGridSelectionPattern = "DO NOT PLOT IN GRID"):
         self.prettyName = prettyName
         self.selectionPattern = groupSelectionPattern
         self.plotInGridSelectionPattern = plotInGridSelectionPattern
         self.histList = persistent.list.PersistentList()
+        self.spriteSheet = None
 
         # So that it is not necessary to check the list every time
         if self.plotInGridSelectionPattern in self.selectionPattern:
@@ -651,6 +1143,140 @@ class histogramGroupContainer(persistent.Persistent):
                " plotInGridSelectionPattern = {plotInGridSelectionPattern}, histList: {histList}," \
                " plotInGrid: {plotInGrid}".format(self.__class__.__name__, **self.__dict__)
 
+def functionSignature(func):
+    """ Create a string which identifies a processing function.
+
+    Args:
+        func (function): Processing function.
+    Returns:
+        str: Fully qualified name of the function.
+    """
+    return "{module}.{name}".format(module = getattr(func, "__module__", ""), name = getattr(func, "__name__", repr(func)))
+
+class histogramDefinition(persistent.Persistent):
+    """ Definition of how a histogram is processed and displayed.
+
+    The definition of a histogram (which hists contribute to it, how it's drawn, and which functions are applied)
+    is almost always identical for every run. So once a histogram has been classified, its definition is frozen
+    and shared via the ``histogramDefinitionCatalog``, such that it is only stored once in the database (instead
+    of once per run). A frozen definition must not be modified - modifying the definition of a particular
+    histogram replaces it with a (private) copy. See ``histogramContainer``.
+
+    Args:
+        histList (list): List of histogram names that should contribute to the histogram. Default: None.
+        drawOptions (str): Draw options to be passed to ``TH1.Draw()`` when drawing the histogram. Default: "".
+
+    Attributes:
+        histList (list or tuple): List of histogram names that should contribute to the histogram.
+        drawOptions (str): Draw options to be passed to ``TH1.Draw()`` when drawing the histogram.
+        projectionFunctionsToApply (list or tuple): Functions that project to the histogram.
+        functionsToApply (list or tuple): Functions that are applied to the histogram during processing.
+        trendingObjects (list or tuple): Trending objects which operate on the histogram.
+        frozen (bool): True if the definition is frozen (ie. the lists are stored as tuples), so it can be shared.
+    """
+    __slots__ = ("histList", "drawOptions", "projectionFunctionsToApply", "functionsToApply", "trendingObjects", "frozen")
+
+    def __init__(self, histList = None, drawOptions = ""):
+        self.histList = histList
+        self.drawOptions = drawOptions
+        self.projectionFunctionsToApply = []
+        self.functionsToApply = []
+        self.trendingObjects = []
+        self.frozen = False
+
+    def __repr__(self):
+        """ Representation of the object. """
+        return "{}(histList = {histList}, drawOptions = {drawOptions})".format(self.__class__.__name__,
+                                                                               histList = self.histList,
+                                                                               drawOptions = self.drawOptions)
+
+    def copy(self):
+        """ Create a modifiable copy of the definition.
+
+        Args:
+            None.
+        Returns:
+            histogramDefinition: Copy of the definition, which isn't frozen.
+        """
+        definition = histogramDefinition(histList = list(self.histList) if self.histList is not None else None,
+                                         drawOptions = self.drawOptions)
+        definition.projectionFunctionsToApply.extend(self.projectionFunctionsToApply)
+        definition.functionsToApply.extend(self.functionsToApply)
+        definition.trendingObjects.extend(self.trendingObjects)
+        return definition
+
+    def freeze(self):
+        """ Freeze the definition so that it can be shared.
+
+        Args:
+            None.
+        Returns:
+            None. The lists are converted into tuples.
+        """
+        if self.histList is not None:
+            self.histList = tuple(self.histList)
+        self.projectionFunctionsToApply = tuple(self.projectionFunctionsToApply)
+        self.functionsToApply = tuple(self.functionsToApply)
+        self.trendingObjects = tuple(self.trendingObjects)
+        self.frozen = True
+
+    def signature(self):
+        """ Create a string which identifies the definition.
+
+        Two definitions with the same signature are equivalent, so they can be shared.
+
+        Args:
+            None.
+        Returns:
+            str: Signature of the definition.
+        """
+        return "{histList}|{drawOptions}|{projectionFunctions}|{functions}|{trendingObjects}".format(
+            histList = ",".join(self.histList) if self.histList is not None else "",
+            drawOptions = self.drawOptions,
+            projectionFunctions = ",".join(functionSignature(func) for func in self.projectionFunctionsToApply),
+            functions = ",".join(functionSignature(func) for func in self.functionsToApply),
+            trendingObjects = ",".join(repr(obj) for obj in self.trendingObjects))
+
+class histogramDefinitionCatalog(persistent.Persistent):
+    """ Catalog of the shared histogram definitions.
+
+    Each distinct definition is stored once, keyed by its signature, and is then referenced by the histogram
+    containers of every run which use it. This keeps the per run histogram containers compact, which reduces
+    the database size, as well as the load time and object cache pressure when accessing runs.
+
+    Args:
+        None.
+
+    Attributes:
+        definitions (OOBTree): Frozen histogram definitions keyed by their signature.
+    """
+    def __init__(self):
+        self.definitions = BTrees.OOBTree.BTree()
+
+    def __len__(self):
+        return len(self.definitions)
+
+    def intern(self, definition):
+        """ Retrieve the shared definition which is equivalent to the given definition.
+
+        If there isn't yet an equivalent definition, the given definition is frozen and stored.
+
+        Args:
+            definition (histogramDefinition): Histogram definition.
+        Returns:
+            histogramDefinition: Shared, frozen histogram definition.
+        """
+        signature = definition.signature()
+        sharedDefinition = self.definitions.get(signature)
+        if sharedDefinition is None:
+            if definition.frozen:
+                # Don't modify a definition that may be shared elsewhere.
+                definition = definition.copy()
+            definition.freeze()
+            self.definitions[signature] = definition
+            sharedDefinition = definition
+        return sharedDefinition
+
 class histogramContainer(persistent.Persistent):
     """ Histogram information container.
 
@@ -665,6 +1291,13 @@ class histogramContainer(persistent.Persistent):
         When this final step is reached, the histogram can be retrieved by ``retrieveHistogram()`` helper
         function.
 
+    Note:
+        There is a container for every histogram in every run, so it is kept compact: it uses ``__slots__``,
+        and the processing and display options are stored in a ``histogramDefinition``. Once the histogram
+        is classified, the definition is shared with the equivalent histograms of other runs via
+        ``compact()``. The definition fields (``histList``, ``drawOptions``, ``projectionFunctionsToApply``,
+        ``functionsToApply``, and ``trendingObjects``) are available directly through the container.
+
     Args:
         histName (str): Name of the histogram. Doesn't necessarily need to be the same as ``TH1.GetName()``.
         histList (list): List of histogram names that should contribute to this container. Used for stacking
@@ -678,9 +1311,10 @@ class histogramContainer(persistent.Persistent):
         histList (list): List of histogram names that should contribute to this container. Used for stacking
             multiple histograms on onto one canvas. Default: None. See ``retrieveHistogram()`` for more
             information on how this functionality is utilized.
-        information (PersistentMapping): Information that is extracted from the histogram that should be
+        information (dict): Information that is extracted from the histogram that should be
             stored persistently and displayed. This information will be displayed with the web app, with
-            the key shown as a clickable button, and the value information stored behind it.
+            the key shown as a clickable button, and the value information stored behind it. It is stored
+            as part of the container, which is always updated when the histogram is processed.
         hist (ROOT.TH1): The histogram which this container wraps.
         histType (ROOT.TClass): Class of the histogram. For example, ``ROOT.TH1F``. Can be used for functions
             that only apply to 2D hists, etc. It is stored separately from the histogram to allow for it to
@@ -689,16 +1323,19 @@ class histogramContainer(persistent.Persistent):
         drawOptions (str): Draw options to be passed to ``TH1.Draw()`` when drawing the histogram.
         canvas (ROOT.TCanvas): Canvas onto which the histogram will be plotted. Available after the histogram
             has been classified (ie in processing functions).
-        projectionFunctionsToApply (PersistentList): List-like object of functions that perform projections
+        projectionFunctionsToApply (list): List-like object of functions that perform projections
             to the histogram that is represented by this container. See the :doc:`detector subsystem README </detectorPluginsReadme>`
             for more information.
-        functionsToApply (PersistentList): List-like object of functions that are applied to the histogram
+        functionsToApply (list): List-like object of functions that are applied to the histogram
             during the processing step. See the :doc:`detector subsystem README </detectorPluginsReadme>`
             for more information.
-        trendingObjects (PersistentList): List-like object of trending objects which operate on this
+        trendingObjects (list): List-like object of trending objects which operate on this
             histogram. See the :doc:`detector subsystem and trending README </detectorPluginsReadme>`
             for more information.
+        definition (histogramDefinition): Processing and display options of the histogram.
     """
+    __slots__ = ("histName", "prettyName", "information", "hist", "histType", "canvas", "definition")
+
     def __init__(self, histName, histList = None, prettyName = None):
         # Replace any slashes with underscores to ensure that it can be used safely as a filename
         #histName = histName.replace("/", "_")
@@ -709,34 +1346,113 @@ class histogramContainer(persistent.Persistent):
         else:
             self.prettyName = self.histName
 
-        self.histList = histList
-        self.information = persistent.mapping.PersistentMapping()
+        self.information = {}
         self.hist = None
         self.histType = None
-        self.drawOptions = ""
         # Contains the canvas where the hist may be plotted, along with additional content
         self.canvas = None
-        # Functions which will be applied to project an available histogram to a new derived histogram
-        self.projectionFunctionsToApply = persistent.list.PersistentList()
-        # Functions which will be applied to the histogram each time it is processed
-        self.functionsToApply = persistent.list.PersistentList()
-        # Trending objects which use this histogram
-        self.trendingObjects = persistent.list.PersistentList()
+        # Stacks can only be drawn properly with the "nostack" option.
+        drawOptions = "nostack" if histList is not None and len(histList) > 1 else ""
+        # Contains the histList, draw options, and the functions which will be applied to project an available
+        # histogram to a new derived histogram, as well as those which will be applied to the histogram each time
+        # it is processed, and the trending objects which use this histogram.
+        self.definition = histogramDefinition(histList = histList, drawOptions = drawOptions)
+
+    def __setstate__(self, state):
+        """ Set the state of the object, converting containers which were stored before the definitions were available.
+
+        Args:
+            state (dict or tuple): State of the object.
+        Returns:
+            None.
+        """
+        if isinstance(state, dict):
+            state = dict(state)
+            definition = histogramDefinition(histList = state.pop("histList", None),
+                                             drawOptions = state.pop("drawOptions", ""))
+            definition.projectionFunctionsToApply.extend(state.pop("projectionFunctionsToApply", []))
+            definition.functionsToApply.extend(state.pop("functionsToApply", []))
+            definition.trendingObjects.extend(state.pop("trendingObjects", []))
+            state["definition"] = definition
+            state["information"] = dict(state.get("information", {}))
+            state = (None, state)
+        super(histogramContainer, self).__setstate__(state)
 
     def __repr__(self):
         """ Representation of the object. """
-        # Dummy call. See note at the top of the module.
-        self.histName
-        return "{}(histName = {histName}, histList = {histList}, prettyName = {prettyName})".format(self.__class__.__name__, **self.__dict__)
+        return "{}(histName = {histName}, histList = {histList}, prettyName = {prettyName})".format(self.__class__.__name__,
+                                                                                                    histName = self.histName,
+                                                                                                    histList = self.histList,
+                                                                                                    prettyName = self.prettyName)
 
     def __str__(self):
         """ Print many of the elements of the object. """
-        # Dummy call. See note at the top of the module.
-        self.histName
         return "{}: histName = {histName}, histList = {histList}, prettyName = {prettyName}," \
                " information: {information}, hist: {hist}, histType: {histType}, drawOptions: {drawOptions}," \
                " canvas: {canvas}, projectionFunctionsToApply: {projectionFunctionsToApply}," \
-               " functionsToApply: {functionsToApply}".format(self.__class__.__name__, **self.__dict__)
+               " functionsToApply: {functionsToApply}".format(self.__class__.__name__,
+                                                              histName = self.histName,
+                                                              histList = self.histList,
+                                                              prettyName = self.prettyName,
+                                                              information = self.information,
+                                                              hist = self.hist,
+                                                              histType = self.histType,
+                                                              drawOptions = self.drawOptions,
+                                                              canvas = self.canvas,
+                                                              projectionFunctionsToApply = self.projectionFunctionsToApply,
+                                                              functionsToApply = self.functionsToApply)
+
+    @property
+    def histList(self):
+        return self.definition.histList
+
+    @property
+    def drawOptions(self):
+        return self.definition.drawOptions
+
+    @drawOptions.setter
+    def drawOptions(self, drawOptions):
+        self.modifiableDefinition().drawOptions = drawOptions
+
+    @property
+    def projectionFunctionsToApply(self):
+        return self.definition.projectionFunctionsToApply
+
+    @property
+    def functionsToApply(self):
+        return self.definition.functionsToApply
+
+    @property
+    def trendingObjects(self):
+        return self.definition.trendingObjects
+
+    def modifiableDefinition(self):
+        """ Retrieve the definition of this histogram such that it can be modified.
+
+        If the definition is frozen (ie. it may be shared with other histograms), it is replaced by a
+        private copy, so modifying it doesn't affect the other histograms.
+
+        Args:
+            None.
+        Returns:
+            histogramDefinition: Definition which can be modified.
+        """
+        if self.definition.frozen:
+            self.definition = self.definition.copy()
+        return self.definition
+
+    def compact(self, catalog):
+        """ Share the definition of this histogram with the equivalent histograms of other runs.
+
+        This should be called once the histogram has been classified (ie. once the functions to apply
+        have been determined).
+
+        Args:
+            catalog (histogramDefinitionCatalog): Catalog of the shared histogram definitions.
+        Returns:
+            None. The definition is replaced by the shared definition.
+        """
+        self.definition = catalog.intern(self.definition)
 
     def retrieveHistogram(self, ROOT, fIn = None, trending = None):
         """ Retrieve the histogram from the given file or trending container.
@@ -749,7 +1465,7 @@ class histogramContainer(persistent.Persistent):
             ROOT (ROOT): ROOT module. Passed into this object so this module doesn't need
                 to directly depend on importing ROOT.
             fIn (ROOT.TFile): File in which the histogram(s) is stored. Default: ``None``.
-            trending (trendingContainer): Contains the trending objects, including the trending
+            trending (TrendingManager): Contains the trending objects, including the trending
                 histogram which is represented in this histogram container. It is the source
                 of the histogram, and therefore similar to the input ROOT file. Default: ``None``.
         Returns:
@@ -763,7 +1479,7 @@ class histogramContainer(persistent.Persistent):
                     for name in self.histList:
                         logger.debug("HistName in list: {name}".format(name = name))
                         self.hist.Add(fIn.GetKey(name).ReadObj())
-                    self.drawOptions += "nostack"
+                    # NOTE: The "nostack" draw option is set when the container is created.
                     # TODO: Allow for further configuration of THStack, like TLegend and such
                 elif len(self.histList) == 1:
                     # Projective histogram
@@ -787,15 +1503,15 @@ class histogramContainer(persistent.Persistent):
                     returnValue = False
         elif trending:
             # Retrieve the trending histogram from the collection of trending objects.
-            returnValue = False
-            # Not particularly efficient, but it's straightforward.
-            for subsystemName, subsystem in iteritems(trending.trendingObjects):
-                for name, trendingObject in iteritems(subsystem):
-                    if self.histName in trendingObject.hist.histName:
-                        # Retrieve the graph and make it available in the trending histogram container
-                        trendingObject.retrieveHistogram()
-                        returnValue = True
-                        #self.hist = trending.trendingObjects[subsystemName][self.histName].trendingHist
+            # The trending object is found directly via the trending index.
+            trendingObject = trending.findTrendingObject(self.histName)
+            if trendingObject:
+                # Retrieve the graph and make it available in the trending histogram container
+                self.hist = trendingObject.retrieveHist()
+                returnValue = True
+            else:
+                logger.info("Could not find trending object {}".format(self.histName))
+                returnValue = False
         else:
             logger.warning("Unable to retrieve histogram {}".format(self.histName))
             returnValue = False
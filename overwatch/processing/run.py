@@ -50,6 +50,7 @@ sentry_sdk.init(dsn = sentryDSN, integrations = [sentry_logging])
 
 # Imports are below here so that they can be logged
 from overwatch.processing import processRuns
+from overwatch.processing import databasePacking
 
 def run():
     """ Main entry point for starting ``processAllRuns()``.
@@ -61,6 +62,10 @@ def run():
         The sleep time is defined as the time between when ``processAllRuns()`` finishes and
         when it is started again.
 
+    Note:
+        When repeating, the database is packed during the sleep (if enabled and due). See
+        ``overwatch.processing.databasePacking``.
+
     Args:
         None.
     Returns:
@@ -71,7 +76,8 @@ def run():
     logger.info("Starting processing with sleep time of {sleepTime}.".format(sleepTime = sleepTime))
     # Create connection information here so the processing doesn't attempt to access the database
     # each time that it runs during repeating processing, as such attempts will confuse the database lock.
-    (dbRoot, connection) = utilities.getDB(processingParameters["databaseLocation"])
+    (dbRoot, connection) = utilities.getDB(utilities.retrieveDatabaseLocation(processingParameters, "processing"))
+    packer = databasePacking.databasePacker(connection.db(), processingParameters)
     while not handler.exit.is_set():
         # Note both the time that the processing started, as well as the execution time.
         logger.info("Running processing at {time}.".format(time = pendulum.now()))
@@ -82,10 +88,65 @@ def run():
         logger.info("Processing complete in {time} seconds".format(time = end - start))
         # Only execute once if the sleep time is <= 0. Otherwise, sleep and repeat.
         if sleepTime > 0:
+            # Pack the database (if it's due) while we are idle.
+            packer.schedulePack()
             handler.exit.wait(sleepTime)
         else:
             break
 
+    packer.wait()
+    connection.close()
+
+def runTrendingBackfill():
+    """ Main entry point for backfilling the trending objects from previously processed runs.
+
+    New or changed trending objects are filled with the values from the existing runs. The progress
+    is checkpointed, so the backfill can be interrupted and resumed by executing it again.
+    See ``overwatch.processing.trending.backfill`` for further information.
+
+    Args:
+        None.
+    Returns:
+        None.
+    """
+    # Imported here because it's only needed when backfilling.
+    from overwatch.processing.trending import backfill
+
+    # The backfill may run alongside the processing, so it needs its own client name (and therefore persistent cache).
+    (dbRoot, connection) = utilities.getDB(utilities.retrieveDatabaseLocation(processingParameters, "trendingBackfill"))
+    start = timeit.default_timer()
+    backfill.backfillTrending(dbRoot, processingParameters)
+    end = timeit.default_timer()
+    logger.info("Trending backfill complete in {time} seconds".format(time = end - start))
+    connection.close()
+
+def runTimeSliceJobs():
+    """ Main entry point for processing the time slice jobs which are submitted by the web app.
+
+    The jobs are processed until the executable is stopped. It is deployed separately from the web app so
+    that the (long running) time slice processing doesn't occupy the web app processes, and so that
+    the jobs of a stopped worker are recovered when it is restarted. See ``overwatch.processing.timeSliceJobs``
+    for further information.
+
+    Args:
+        None.
+    Returns:
+        None.
+    """
+    # Imported here because it's only needed when processing the time slice jobs.
+    from overwatch.processing import timeSliceJobs
+
+    handler = utilities.handleSignals()
+    jobParameters = processingParameters["timeSliceJobs"]
+    worker = timeSliceJobs.timeSliceJobWorker(pollInterval = jobParameters["pollInterval"],
+                                              progressInterval = jobParameters["progressInterval"],
+                                              retentionMinutes = jobParameters["retentionMinutes"],
+                                              leaseTimeout = jobParameters["leaseTimeout"],
+                                              maxExpiredLeases = jobParameters["maxExpiredLeases"])
+    logger.info("Starting time slice job worker.")
+    # The worker runs alongside the processing, so it needs its own client name (and therefore persistent cache).
+    (dbRoot, connection) = utilities.getDB(utilities.retrieveDatabaseLocation(processingParameters, "timeSliceJobs"))
+    worker.run(connection.db(), handler.exit)
     connection.close()
 
 if __name__ == "__main__":
@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+
+""" Asynchronous processing of time slice and user reprocessing requests.
+
+Time slice requests move new files, merge the requested files and then process every histogram of the
+subsystem, which can take tens of seconds. Rather than performing this work while handling the request,
+the web app submits a job to a queue which is stored in the database (so that it is shared between all of
+the web app processes) and returns the job id immediately. The jobs are processed by a separate worker
+executable (``overwatchTimeSliceJobs``), which records the progress in the job, so that it can be queried by
+the client from any web app process. Equivalent requests which are submitted while a job is queued or running
+are coalesced into that job.
+
+The worker holds a lease on the job that it is processing, which it renews each time that it records the
+progress. If the worker stops unexpectedly, the lease expires, and the job is requeued (or failed once its
+lease has expired too many times), so that a job is never stuck in the running state.
+"""
+
+import logging
+import time
+import timeit
+
+import transaction
+from ZODB.POSException import ConflictError
+
+from . import processingClasses
+from . import processRuns
+
+logger = logging.getLogger(__name__)
+
+# Number of attempts to commit a submission.
+submitAttempts = 3
+
+def submit(database, runDir, subsystem, minTime, maxTime, processingOptions, leaseTimeout, histGroup = None, histName = None):
+    """ Submit a time slice job, coalescing it with an equivalent job which hasn't yet finished.
+
+    The job is committed immediately via a separate connection, so that it is available to the
+    worker (and other web app processes) before the request finishes.
+
+    Args:
+        database (ZODB.DB): Database which stores the job queue.
+        runDir (str): String containing the requested run number.
+        subsystem (str): The subsystem of the request.
+        minTime (float): Requested start time of the time slice in minutes.
+        maxTime (float): Requested end time of the time slice in minutes.
+        processingOptions (dict): Processing options requested for the time slice.
+        leaseTimeout (float): Time after which the lease of a running job expires in seconds. Requests aren't
+            coalesced into jobs whose lease has expired.
+        histGroup (str): Selection pattern of the requested hist group. Default: None.
+        histName (str): Name of the requested histogram. Default: None.
+    Returns:
+        tuple: (str, bool): Id of the job which handles the request, and True if it was newly submitted.
+    """
+    transactionManager = transaction.TransactionManager()
+    connection = database.open(transactionManager)
+    try:
+        # Submissions from other web app processes may conflict with ours, so we retry a few times.
+        for attempt in range(submitAttempts):
+            try:
+                dbRoot = connection.root()
+                if "timeSliceJobs" not in dbRoot:
+                    dbRoot["timeSliceJobs"] = processingClasses.timeSliceJobQueue()
+                (job, newlySubmitted) = dbRoot["timeSliceJobs"].submit(runDir = runDir,
+                                                                       subsystem = subsystem,
+                                                                       minTime = minTime,
+                                                                       maxTime = maxTime,
+                                                                       processingOptions = processingOptions,
+                                                                       histGroup = histGroup,
+                                                                       histName = histName,
+                                                                       leaseTimeout = leaseTimeout)
+                jobId = job.jobId
+                transactionManager.commit()
+                break
+            except ConflictError:
+                transactionManager.abort()
+                if attempt == submitAttempts - 1:
+                    raise
+    finally:
+        connection.close()
+
+    if newlySubmitted:
+        logger.info("Submitted time slice job {jobId} for {runDir}, {subsystem}".format(jobId = jobId, runDir = runDir, subsystem = subsystem))
+    else:
+        logger.info("Coalesced time slice request for {runDir}, {subsystem} into job {jobId}".format(jobId = jobId, runDir = runDir, subsystem = subsystem))
+    return (jobId, newlySubmitted)
+
+class timeSliceJobWorker(object):
+    """ Processes the queued time slice jobs.
+
+    The worker uses separate connections (each with their own transaction manager) for the processing and for
+    the job status. This way, the progress of a job (and therefore the renewal of its lease) can be committed
+    while the processing is still in progress, without committing a partially processed time slice.
+
+    Note:
+        Only one worker should be deployed. Additional workers would process different jobs concurrently, which
+        is safe (claims are resolved via conflicts), but it provides little benefit since the jobs are mostly
+        limited by the same files and database.
+
+    Args:
+        pollInterval (float): Time between checks for queued jobs in seconds.
+        progressInterval (float): Minimum time between commits of the progress of a job in seconds.
+        retentionMinutes (float): Time that finished jobs are kept in the queue in minutes.
+        leaseTimeout (float): Time after which the lease of a running job expires in seconds.
+        maxExpiredLeases (int): Number of expired leases after which a job fails rather than being requeued.
+
+    Attributes:
+        pollInterval (float): Time between checks for queued jobs in seconds.
+        progressInterval (float): Minimum time between commits of the progress of a job in seconds.
+        retentionMinutes (float): Time that finished jobs are kept in the queue in minutes.
+        leaseTimeout (float): Time after which the lease of a running job expires in seconds.
+        maxExpiredLeases (int): Number of expired leases after which a job fails rather than being requeued.
+    """
+    def __init__(self, pollInterval, progressInterval, retentionMinutes, leaseTimeout, maxExpiredLeases):
+        self.pollInterval = pollInterval
+        self.progressInterval = progressInterval
+        self.retentionMinutes = retentionMinutes
+        self.leaseTimeout = leaseTimeout
+        self.maxExpiredLeases = maxExpiredLeases
+
+    def run(self, database, exitEvent):
+        """ Process the queued jobs until the exit event is set.
+
+        Args:
+            database (ZODB.DB): Database which stores the job queue and the runs.
+            exitEvent (threading.Event): Event which is set when the worker should exit.
+        Returns:
+            None.
+        """
+        jobTransactionManager = transaction.TransactionManager()
+        jobConnection = database.open(jobTransactionManager)
+        processingTransactionManager = transaction.TransactionManager()
+        processingConnection = database.open(processingTransactionManager)
+        while not exitEvent.is_set():
+            try:
+                processedJob = self.processNextJob(jobConnection, jobTransactionManager,
+                                                   processingConnection, processingTransactionManager)
+            except Exception as e:
+                # We don't want the worker to stop due to an unexpected error, since the remaining jobs
+                # would never be processed.
+                logger.error("Time slice job worker failed with {e}".format(e = e))
+                jobTransactionManager.abort()
+                processingTransactionManager.abort()
+                processedJob = False
+            if not processedJob:
+                exitEvent.wait(self.pollInterval)
+
+        jobTransactionManager.abort()
+        processingTransactionManager.abort()
+        jobConnection.close()
+        processingConnection.close()
+
+    def processNextJob(self, jobConnection, jobTransactionManager, processingConnection, processingTransactionManager):
+        """ Claim and process the next queued job.
+
+        Args:
+            jobConnection (ZODB.Connection.Connection): Connection used to update the job.
+            jobTransactionManager (transaction.TransactionManager): Transaction manager of the job connection.
+            processingConnection (ZODB.Connection.Connection): Connection used to process the time slice.
+            processingTransactionManager (transaction.TransactionManager): Transaction manager of the processing
+                connection.
+        Returns:
+            bool: True if a job was processed.
+        """
+        # Start a new transaction to see the most recently submitted jobs.
+        jobTransactionManager.abort()
+        dbRoot = jobConnection.root()
+        if "timeSliceJobs" not in dbRoot:
+            return False
+        queue = dbRoot["timeSliceJobs"]
+
+        # Recover the jobs of a worker which stopped unexpectedly.
+        if queue.handleStaleJobs(now = time.time(), leaseTimeout = self.leaseTimeout, maxExpiredLeases = self.maxExpiredLeases):
+            try:
+                jobTransactionManager.commit()
+                logger.warning("Recovered time slice jobs whose lease expired.")
+            except ConflictError:
+                jobTransactionManager.abort()
+                return True
+
+        job = queue.nextQueuedJob()
+        if job is None:
+            return False
+
+        # Claim the job. If another worker claimed it first, our commit will conflict.
+        job.state = "running"
+        job.claimTime = time.time()
+        job.heartbeatTime = job.claimTime
+        try:
+            jobTransactionManager.commit()
+        except ConflictError:
+            jobTransactionManager.abort()
+            return True
+        logger.info("Processing time slice job {jobId}".format(jobId = job.jobId))
+
+        lastProgressTime = [timeit.default_timer()]
+
+        def recordProgress(histogramsProcessed, histogramsTotal):
+            now = timeit.default_timer()
+            if histogramsProcessed != histogramsTotal and now - lastProgressTime[0] < self.progressInterval:
+                return
+            lastProgressTime[0] = now
+            job.histogramsProcessed = histogramsProcessed
+            job.histogramsTotal = histogramsTotal
+            # Renew the lease.
+            job.heartbeatTime = time.time()
+            try:
+                jobTransactionManager.commit()
+            except ConflictError:
+                # Only this worker modifies a running job, so this is unlikely. The progress will be
+                # committed again with the next update.
+                jobTransactionManager.abort()
+
+        # Start a new transaction to see the most recently processed runs.
+        processingTransactionManager.abort()
+        try:
+            result = processRuns.processTimeSlices(processingConnection.root()["runs"], job.runDir,
+                                                   job.minTime, job.maxTime, job.subsystem, dict(job.processingOptions),
+                                                   histGroup = job.histGroup, histName = job.histName,
+                                                   progressCallback = recordProgress)
+            processingTransactionManager.commit()
+        except ConflictError:
+            # Another job (or the processing) modified the same subsystem concurrently, so we process it again.
+            processingTransactionManager.abort()
+            logger.info("Time slice job {jobId} conflicted with another change. Requeuing it.".format(jobId = job.jobId))
+            job.state = "queued"
+            job.heartbeatTime = None
+            jobTransactionManager.commit()
+            return True
+        except Exception as e:
+            processingTransactionManager.abort()
+            logger.error("Time slice job {jobId} failed with {e}".format(jobId = job.jobId, e = e))
+            result = {"Processing Error": ["Processing the time slice failed with {e}. Please contact the admin!".format(e = e)]}
+
+        # A normal result is a time slice key, while an error is a dictionary.
+        job.state = "failed" if isinstance(result, dict) else "done"
+        job.result = result
+        job.heartbeatTime = None
+        job.finishTime = time.time()
+        jobTransactionManager.commit()
+        logger.info("Finished time slice job {jobId} with state {state}".format(jobId = job.jobId, state = job.state))
+
+        # Cleanup the old jobs. This may conflict with a concurrent submission, in which case it is
+        # attempted again after the next job.
+        queue.removeFinishedJobs(finishedBefore = job.finishTime - self.retentionMinutes * 60)
+        try:
+            jobTransactionManager.commit()
+        except ConflictError:
+            jobTransactionManager.abort()
+        return True
@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+
+""" Backfill trending objects from previously processed runs.
+
+New (or changed) trending objects are normally only filled from the files which arrive after they were
+created. The backfill extracts the values of such trending objects from the combined files of the runs
+which are already stored, and merges them (ordered by time) into the trending objects stored in the database.
+
+The extraction only reads the histograms from the files. It doesn't apply the processing functions and
+doesn't render any run histograms, so it can be performed in parallel workers. The progress is stored
+in a checkpoint file (in the trending directory) after each batch of runs, so an interrupted backfill
+will resume where it stopped.
+"""
+
+from future.utils import iteritems
+
+import logging
+import multiprocessing
+import os
+
+import numpy as np
+import ROOT
+import ruamel.yaml as yaml
+import transaction
+
+import overwatch.processing.trending.constants as CON
+from overwatch.processing import processingClasses
+from overwatch.processing.trending.manager import TrendingManager
+
+logger = logging.getLogger(__name__)
+
+try:
+    from typing import *  # noqa
+except ImportError:
+    pass
+else:
+    # Needed for typing information
+    from BTrees.OOBTree import BTree  # noqa
+    from persistent.mapping import PersistentMapping  # noqa
+
+
+def definitionSignature(trendingClass, histogramNames):  # type: (type, List[str]) -> str
+    """ Create a string which identifies the definition of a trending object.
+
+    If the signature of a stored trending object differs from the signature of its current definition,
+    the definition has changed and the object must be recreated and backfilled.
+
+    Args:
+        trendingClass (type): Concrete ``TrendingObject`` class.
+        histogramNames (list): Names of the histograms from which the trending object depends.
+    Returns:
+        str: Signature of the definition.
+    """
+    return "{module}.{name}:{hists}".format(module=trendingClass.__module__,
+                                            name=trendingClass.__name__,
+                                            hists=",".join(histogramNames))
+
+
+def readCheckpoint(filename):  # type: (str) -> dict
+    """ Read the backfill checkpoint.
+
+    The checkpoint is a dict of the form ``{subsystemName: {trendingName: {"signature": str, "completedRuns": [runDir, ...]}}}``.
+
+    Args:
+        filename (str): Path to the checkpoint file.
+    Returns:
+        dict: Checkpoint information. Empty if the file doesn't exist.
+    """
+    if not os.path.exists(filename):
+        return {}
+    with open(filename, "r") as f:
+        checkpoint = yaml.load(f, Loader=yaml.SafeLoader)
+    return checkpoint if checkpoint else {}
+
+
+def writeCheckpoint(filename, checkpoint):  # type: (str, dict) -> None
+    """ Write the backfill checkpoint.
+
+    The checkpoint is written to a temporary file first and then moved into place, so an interruption
+    while writing can't corrupt the existing checkpoint.
+
+    Args:
+        filename (str): Path to the checkpoint file.
+        checkpoint (dict): Checkpoint information.
+    Returns:
+        None.
+    """
+    tempFilename = filename + ".tmp"
+    with open(tempFilename, "w") as f:
+        yaml.dump(checkpoint, f, default_flow_style=False)
+    os.rename(tempFilename, filename)
+
+
+def extractTrendValues(task):  # type: (tuple) -> tuple
+    """ Extract the trended values from a single combined file.
+
+    This is executed in the worker processes, so it only uses the information passed in the task
+    (and not the database).
+
+    Args:
+        task (tuple): ``(runDir, subsystemName, filename, timeStamp, trendingNames, parameters)``, where
+            ``timeStamp`` is the time stamp to which the values correspond and ``trendingNames`` are the
+            names of the trending objects to extract.
+    Returns:
+        tuple: ``(runDir, subsystemName, timeStamp, values)``, where ``values`` is a dict from the trending
+            object name to an array of the extracted values.
+    """
+    (runDir, subsystemName, filename, timeStamp, trendingNames, parameters) = task
+    infoList = TrendingManager.retrieveTrendingInfo(subsystemName) or []
+
+    values = {}
+    fIn = ROOT.TFile(filename, "READ")
+    try:
+        for info in infoList:
+            if info.name not in trendingNames:
+                continue
+            trendingObject = info.createTrendingClass(subsystemName, parameters)
+            for histName in info.histogramNames:
+                # Only histograms which are stored in the file are available. Histograms which are created
+                # during processing are not recreated here.
+                rootHist = fIn.Get(histName)
+                if not rootHist:
+                    logger.debug("Could not retrieve hist {histName} from {filename}".format(histName=histName, filename=filename))
+                    continue
+                hist = processingClasses.histogramContainer(histName)
+                hist.hist = rootHist
+                trendingObject.extractTrendValue(hist)
+            values[info.name] = np.asarray(trendingObject.trendedValues)
+    finally:
+        fIn.Close()
+
+    return (runDir, subsystemName, timeStamp, values)
+
+
+def mergeBackfilledValues(trendingDB, results):  # type: (BTree, List[tuple]) -> None
+    """ Merge the values extracted by the workers into the stored trending objects, ordered by time.
+
+    Args:
+        trendingDB (BTree): Trending database, which contains the trending objects for each subsystem.
+        results (list): Results returned by ``extractTrendValues()``.
+    Returns:
+        None. The trending objects are updated.
+    """
+    collected = {}
+    for (runDir, subsystemName, timeStamp, values) in results:
+        for name, trendedValues in iteritems(values):
+            if len(trendedValues) == 0:
+                continue
+            timeStamps, allValues = collected.setdefault((subsystemName, name), ([], []))
+            timeStamps.append(np.full(len(trendedValues), timeStamp, dtype=np.int64))
+            allValues.append(trendedValues)
+
+    for (subsystemName, name), (timeStamps, allValues) in iteritems(collected):
+        trendingObject = trendingDB[subsystemName][name]
+        trendingObject.mergeTrendValues(np.concatenate(timeStamps), np.concatenate(allValues, axis=0))
+        logger.debug("Backfilled {nValues} values into {subsystemName} trending object {name}".format(nValues=sum(len(t) for t in timeStamps), subsystemName=subsystemName, name=name))
+
+
+def backfillTrending(dbRoot, parameters, subsystems=None, nWorkers=None, checkpointFilename=None):
+    # type: (PersistentMapping, dict, Optional[List[str]], Optional[int], Optional[str]) -> None
+    """ Backfill new and changed trending objects from the stored runs.
+
+    Trending objects which are not yet recorded in the checkpoint (or whose definition changed since
+    they were recorded) are backfilled from the combined files of all runs which are not ongoing.
+    Objects whose definition changed are recreated before they are backfilled. Runs for which a trending
+    object already has a value (for example, because it was filled during standard processing) are skipped.
+
+    Args:
+        dbRoot (PersistentMapping): Database root.
+        parameters (dict): Processing parameters.
+        subsystems (list): Subsystems to backfill. Default: None, which corresponds to all configured subsystems.
+        nWorkers (int): Number of worker processes. Default: None, which uses the configured number of workers.
+        checkpointFilename (str): Path to the checkpoint file. Default: None, which corresponds to
+            ``backfillCheckpoint.yaml`` in the trending directory.
+    Returns:
+        None. The trending objects in the database are updated and the trending is reprocessed.
+    """
+    if subsystems is None:
+        subsystems = parameters[CON.SUBSYSTEMS]
+    if nWorkers is None:
+        nWorkers = parameters.get(CON.BACKFILL_WORKERS, 4)
+    if checkpointFilename is None:
+        checkpointFilename = os.path.join(parameters[CON.DIR_PREFIX], CON.TRENDING, "backfillCheckpoint.yaml")
+
+    # Ensure that the new trending objects exist.
+    trendingManager = TrendingManager(dbRoot, parameters)
+    trendingManager.createTrendingObjects()
+    trendingDB = trendingManager.trendingDB
+
+    # Determine which trending objects need to be backfilled.
+    checkpoint = readCheckpoint(checkpointFilename)
+    for subsystemName in subsystems:
+        for info in TrendingManager.retrieveTrendingInfo(subsystemName) or []:
+            signature = definitionSignature(info.trendingClass, info.histogramNames)
+            storedObject = trendingDB[subsystemName].get(info.name)
+            if storedObject is None or definitionSignature(type(storedObject), storedObject.histogramNames) != signature:
+                logger.info("Recreating changed trending object {name} in subsystem {subsystemName}".format(name=info.name, subsystemName=subsystemName))
+                trendingDB[subsystemName][info.name] = info.createTrendingClass(subsystemName, parameters)
+                trendingManager.modified = True
+
+            entry = checkpoint.setdefault(subsystemName, {}).get(info.name)
+            if entry is None or entry["signature"] != signature:
+                checkpoint[subsystemName][info.name] = {"signature": signature, "completedRuns": []}
+    transaction.commit()
+
+    # Determine the work for each run.
+    tasks = []
+    for runDir, run in iteritems(dbRoot["runs"]):
+        if run.isRunOngoing():
+            # The values of ongoing runs will be filled by the standard processing.
+            continue
+        for subsystemName in subsystems:
+            subsystem = run.subsystems.get(subsystemName)
+            if subsystem is None or subsystem.combinedFile is None:
+                continue
+            trendingNames = []
+            for name, entry in iteritems(checkpoint.get(subsystemName, {})):
+                if runDir in entry["completedRuns"] or name not in trendingDB[subsystemName]:
+                    continue
+                if trendingDB[subsystemName][name].hasValueBetween(subsystem.startOfRun, subsystem.endOfRun):
+                    entry["completedRuns"].append(runDir)
+                    continue
+                trendingNames.append(name)
+            if trendingNames:
+                tasks.append((runDir, subsystemName,
+                              os.path.join(parameters[CON.DIR_PREFIX], subsystem.combinedFile.filename),
+                              subsystem.endOfRun, trendingNames, parameters))
+    logger.info("Backfilling trending from {nTasks} run files with {nWorkers} workers".format(nTasks=len(tasks), nWorkers=nWorkers))
+
+    # Extract the values in parallel. The results are merged and committed after each batch so that
+    # the checkpoint always reflects the state stored in the database.
+    pool = multiprocessing.Pool(nWorkers) if nWorkers > 1 else None
+    mapFunction = pool.map if pool else map
+    batchSize = max(nWorkers, 1) * 4
+    try:
+        for i in range(0, len(tasks), batchSize):
+            results = list(mapFunction(extractTrendValues, tasks[i:i + batchSize]))
+            mergeBackfilledValues(trendingDB, results)
+            trendingManager.modified = True
+            transaction.commit()
+            for (runDir, subsystemName, _, values) in results:
+                for name in values:
+                    checkpoint[subsystemName][name]["completedRuns"].append(runDir)
+            writeCheckpoint(checkpointFilename, checkpoint)
+            logger.info("Backfilled {nDone}/{nTasks} run files".format(nDone=min(i + batchSize, len(tasks)), nTasks=len(tasks)))
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    writeCheckpoint(checkpointFilename, checkpoint)
+
+    # Update the trending output with the backfilled values.
+    trendingManager.processTrending()
+    trendingManager.updateVersion()
+    transaction.commit()
+    logger.info("Finished trending backfill!")
@@ -7,12 +7,15 @@ Note:
     for other parts of Overwatch should be handled by the Overwatch configuration system.
 """
 TRENDING = 'trending'
+INDEX = 'trendingIndex'
+VERSION = 'trendingVersion'
 SUBSYSTEMS = 'subsystemList'
 DIR_PREFIX = 'dirPrefix'
 RECREATE = 'forceRecreateSubsystem'
 
 EXTENSION = 'fileExtension'
 ENTRIES = "entries"
+BACKFILL_WORKERS = 'trendingBackfillWorkers'
 
 IMAGE = 'img'
 JSON = 'json'
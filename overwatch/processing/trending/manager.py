@@ -49,15 +49,25 @@ class TrendingManager(Persistent):
         parameters (dict): Parameters read from configuration files
         histToTrending (dict): Dictionary whose key is histogram and value is the list of trending objects
         trendingDB (BTree): Database for trending
+        trendingIndex (BTree): Index from the trending object name to the name of the subsystem which contains it
+        modified (bool): True if trending objects were created or filled since the trending version was updated
         """
 
     def __init__(self, dbRoot, parameters):  # type: (PersistentMapping, dict)->None
+        self.dbRoot = dbRoot
         self.parameters = parameters
+        self.modified = False
         self.histToTrending = defaultdict(list)  # type: Dict[str, List[TrendingObject]]
 
         self._prepareDataBase(CON.TRENDING, dbRoot)
         self.trendingDB = dbRoot[CON.TRENDING]  # type: BTree[str, BTree[str, TrendingObject]]
 
+        # The index is stored separately so that it doesn't appear as a subsystem in the trending database.
+        if CON.INDEX not in dbRoot:
+            self._prepareDataBase(CON.INDEX, dbRoot)
+            self._buildIndex(dbRoot[CON.INDEX])
+        self.trendingIndex = dbRoot[CON.INDEX]  # type: BTree[str, str]
+
         self._prepareDirStructure()
 
     def _prepareDirStructure(self):
@@ -81,6 +91,41 @@ class TrendingManager(Persistent):
         if objName not in dbPosition:
             dbPosition[objName] = BTree()
 
+    def _buildIndex(self, trendingIndex):  # type: (BTree) -> None
+        for subsystemName, subsystem in self.trendingDB.items():
+            for name in subsystem.keys():
+                self._addToIndex(trendingIndex, subsystemName, name)
+
+    @staticmethod
+    def _addToIndex(trendingIndex, subsystemName, name):  # type: (BTree, str, str) -> None
+        storedSubsystemName = trendingIndex.get(name)
+        if storedSubsystemName is not None and storedSubsystemName != subsystemName:
+            logger.warning("Trending object {name} exists in subsystems {stored} and {subsystemName}. "
+                           "Only the object in {stored} can be found by name.".format(
+                               name=name, stored=storedSubsystemName, subsystemName=subsystemName))
+            return
+        trendingIndex[name] = subsystemName
+
+    def findTrendingObject(self, name, subsystemName=None):  # type: (str, Optional[str]) -> Optional[TrendingObject]
+        """ Find a trending object by name.
+
+        The object is retrieved directly through the trending index, so the lookup doesn't depend on the
+        number of trending objects.
+
+        Args:
+            name (str): Name of the trending object.
+            subsystemName (str): Name of the subsystem which contains the trending object. Default: None,
+                in which case it is looked up in the index.
+        Returns:
+            TrendingObject: The requested trending object, or None if it doesn't exist.
+        """
+        if subsystemName is None:
+            subsystemName = self.trendingIndex.get(name)
+        subsystem = self.trendingDB.get(subsystemName) if subsystemName is not None else None
+        if subsystem is None:
+            return None
+        return subsystem.get(name)
+
     def createTrendingObjects(self):
         """ It loops over subsystems and calls function that creates trending objects for each subsystem.
 
@@ -92,14 +137,26 @@ class TrendingManager(Persistent):
         for subsystem in self.parameters[CON.SUBSYSTEMS]:
             self._createTrendingObjectsForSubsystem(subsystem)
 
-    def _createTrendingObjectsForSubsystem(self, subsystemName):  # type: (str) -> None
+    @staticmethod
+    def retrieveTrendingInfo(subsystemName):  # type: (str) -> Optional[List[TrendingInfo]]
+        """ Retrieve the trending object information defined by the subsystem plugin.
+
+        Args:
+            subsystemName (str): Name of the subsystem.
+        Returns:
+            list: TrendingInfo objects defined by the subsystem, or None if the subsystem doesn't define any.
+        """
         functionName = "{subsystem}_getTrendingObjectInfo".format(subsystem=subsystemName)
         getTrendingObjectInfo = getattr(pluginManager, functionName, None)  # type: Callable[[], List[TrendingInfo]]
         if getTrendingObjectInfo:
-            info = getTrendingObjectInfo()
+            return getTrendingObjectInfo()
+        logger.info("Could not find {functionName}".format(functionName=functionName))
+        return None
+
+    def _createTrendingObjectsForSubsystem(self, subsystemName):  # type: (str) -> None
+        info = self.retrieveTrendingInfo(subsystemName)
+        if info:
             self._createTrendingObjectFromInfo(subsystemName, info)
-        else:
-            logger.info("Could not find {functionName}".format(functionName=functionName))
 
     def _createTrendingObjectFromInfo(self, subsystemName, infoList):
         # type: (str, List[TrendingInfo]) -> None
@@ -110,6 +167,8 @@ class TrendingManager(Persistent):
             if info.name not in self.trendingDB[subsystemName] or self.parameters[CON.RECREATE]:
                 to = info.createTrendingClass(subsystemName, self.parameters)
                 self.trendingDB[subsystemName][info.name] = to
+                self._addToIndex(self.trendingIndex, subsystemName, info.name)
+                self.modified = True
                 self._subscribe(to, info.histogramNames)
 
                 logger.debug(success.format(name=info.name, subsystemName=subsystemName))
@@ -122,6 +181,7 @@ class TrendingManager(Persistent):
 
     def resetDB(self):  # TODO not used - is it needed?
         self.trendingDB.clear()
+        self.trendingIndex.clear()
 
     def processTrending(self):
         """ Process the trending objects.
@@ -143,7 +203,7 @@ class TrendingManager(Persistent):
                 logger.debug("trendingObject: {trendingObject}".format(trendingObject=trendingObject))
                 trendingObject.processHist(canvas)
 
-    def notifyAboutNewHistogramValue(self, hist):  # type: (histogramContainer) -> None
+    def notifyAboutNewHistogramValue(self, hist, timeStamp=0):  # type: (histogramContainer, int) -> None
         """ This function is called when the ROOT histogram is being processed.
 
         It loops over trending objects to which histogram is subscribed to and calls function that extracts
@@ -151,8 +211,26 @@ class TrendingManager(Persistent):
 
         Args:
             hist (histogramContainer): Histogram which is processed.
+            timeStamp (int): Unix time stamp of the data in the histogram. Default: 0 (unknown).
         Returns:
             None.
         """
         for trend in self.histToTrending.get(hist.histName, []):
             trend.extractTrendValue(hist)
+            trend.recordTimeStamp(timeStamp)
+            self.modified = True
+
+    def updateVersion(self):
+        """ Increment the trending version stored in the database if the trending objects were modified.
+
+        The version allows readers (such as the web app) to determine cheaply whether their cached
+        trending information is still valid. It must be called before the trending changes are committed.
+
+        Args:
+            None.
+        Returns:
+            None.
+        """
+        if self.modified:
+            self.dbRoot[CON.VERSION] = self.dbRoot.get(CON.VERSION, 0) + 1
+            self.modified = False
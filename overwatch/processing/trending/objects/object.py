@@ -7,6 +7,7 @@
 import logging
 import os
 
+import numpy as np
 import ROOT
 from persistent import Persistent
 
@@ -36,6 +37,8 @@ class TrendingObject(Persistent):
         self.currentEntry = 0
         self.maxEntries = self.parameters.get(CON.ENTRIES, 100)
         self.trendedValues = self.initializeTrendingArray()
+        # Unix time stamps of the trended values. They are kept aligned with ``trendedValues``.
+        self.timeStamps = np.zeros(0, dtype=np.int64)
 
         self.histogram = None
         # Ensure that the axis and points are drawn on the TGraph
@@ -78,6 +81,94 @@ class TrendingObject(Persistent):
         """
         raise NotImplementedError
 
+    def recordTimeStamp(self, timeStamp):  # type: (int) -> None
+        """ Record the time stamp of the most recently extracted trend value.
+
+        It must be called after ``extractTrendValue()``. The time stamps are trimmed in the same way
+        as the trended values, such that each time stamp corresponds to the value at the same index.
+
+        Args:
+            timeStamp (int): Unix time stamp of the file from which the value was extracted.
+        Returns:
+            None.
+        """
+        timeStamps = getattr(self, "timeStamps", None)
+        nValues = len(self.trendedValues)
+        if timeStamps is None:
+            # Objects created before time stamps were available. Their existing values are of unknown time.
+            timeStamps = np.zeros(max(nValues - 1, 0), dtype=np.int64)
+        timeStamps = np.append(timeStamps, timeStamp)
+        self.timeStamps = timeStamps[len(timeStamps) - nValues:] if nValues else timeStamps[:0]
+
+    def hasValueBetween(self, start, end):  # type: (int, int) -> bool
+        """ Check whether a trended value was recorded in the given (inclusive) time range.
+
+        Args:
+            start (int): Unix time stamp of the start of the range.
+            end (int): Unix time stamp of the end of the range.
+        Returns:
+            bool: True if a value with a time stamp in the range is stored.
+        """
+        timeStamps = getattr(self, "timeStamps", None)
+        if timeStamps is None:
+            return False
+        return bool(np.any((timeStamps >= start) & (timeStamps <= end)))
+
+    def retrieveTrendedValues(self, startTime=0, endTime=0):  # type: (int, int) -> Tuple[np.ndarray, np.ndarray]
+        """ Retrieve the trended values and their time stamps within the given (inclusive) time range.
+
+        Args:
+            startTime (int): Unix time stamp of the start of the range. 0 corresponds to no limit.
+            endTime (int): Unix time stamp of the end of the range. 0 corresponds to no limit.
+        Returns:
+            tuple: (timeStamps, values) of the selected entries, ordered by time.
+        """
+        values = np.asarray(self.trendedValues)
+        timeStamps = getattr(self, "timeStamps", None)
+        if timeStamps is None or len(timeStamps) != len(values):
+            timeStamps = np.zeros(len(values), dtype=np.int64)
+
+        selected = np.ones(len(values), dtype=bool)
+        if startTime:
+            selected &= timeStamps >= startTime
+        if endTime:
+            selected &= timeStamps <= endTime
+        return timeStamps[selected], values[selected]
+
+    def mergeTrendValues(self, timeStamps, values):  # type: (np.ndarray, np.ndarray) -> None
+        """ Merge additional trended values into the stored values, ordered by time.
+
+        Used to backfill values extracted from older files. Values with a time stamp that is already
+        stored are ignored. Only the most recent ``maxEntries`` values are kept.
+
+        Args:
+            timeStamps (np.ndarray): Unix time stamps of the new values.
+            values (np.ndarray): New trended values. The first axis must correspond to ``timeStamps``.
+        Returns:
+            None.
+        """
+        timeStamps = np.asarray(timeStamps, dtype=np.int64)
+        values = np.asarray(values)
+        storedTimeStamps = getattr(self, "timeStamps", None)
+        storedValues = np.asarray(self.trendedValues)
+        if storedTimeStamps is None or len(storedTimeStamps) != len(storedValues):
+            storedTimeStamps = np.zeros(len(storedValues), dtype=np.int64)
+
+        newEntries = ~np.in1d(timeStamps, storedTimeStamps)
+        if not np.any(newEntries):
+            return
+        if len(storedValues) == 0:
+            storedValues = storedValues.reshape((0,) + values.shape[1:])
+
+        allTimeStamps = np.concatenate([storedTimeStamps, timeStamps[newEntries]])
+        allValues = np.concatenate([storedValues, values[newEntries]], axis=0)
+        # A stable sort keeps the existing order for entries of unknown time (which are stored as 0).
+        order = np.argsort(allTimeStamps, kind="mergesort")[-self.maxEntries:]
+
+        self.timeStamps = allTimeStamps[order]
+        self.trendedValues = allValues[order]
+        self.currentEntry = len(order)
+
     def processHist(self, canvas):
         self.resetCanvas(canvas)
         # Ensure we plot onto the right canvas
@@ -10,8 +10,18 @@ This module defines a REST API for receiving files via POST request. It is a rel
 from __future__ import print_function
 from future.utils import iteritems
 
+import collections
 import functools
 import os
+import re
+import tempfile
+import threading
+import time
+# For the deep validation queue
+try:
+    import queue
+except ImportError:
+    import Queue as queue
 import logging
 logger = logging.getLogger(__name__)
 import pendulum
@@ -19,7 +29,7 @@ import pendulum
 from overwatch.base import config
 (receiverParameters, filesRead) = config.readConfig(config.configurationType.receiver)
 
-from flask import Flask, request, send_from_directory, jsonify, url_for
+from flask import Flask, Request, request, send_from_directory, jsonify, url_for
 from werkzeug.utils import secure_filename
 
 import ROOT
@@ -28,8 +38,27 @@ import ROOT
 ROOT.std.__file__ = "ROOT.std.py"
 #import rootpy.io
 #import rootpy.ROOT as ROOT
+# Deep validation reads objects in a background thread while the requests are opening other files, so ROOT
+# must be thread safe. It must be enabled before any other threads use ROOT.
+if receiverParameters["deepValidation"]["enabled"] and hasattr(ROOT.ROOT, "EnableThreadSafety"):
+    ROOT.ROOT.EnableThreadSafety()
+
+# Prefix of the temporary files which hold uploads until they are complete. These files are hidden and don't
+# end in ``.root``, so they are never picked up by the data transfer or the processing.
+temporaryFilePrefix = ".receiving."
+
+class receiverRequest(Request):
+    """ Request which streams uploaded files directly to temporary files in the data folder.
+
+    By default, uploaded files are spooled in memory (or in the system temporary directory). Instead, we write
+    them in chunks to a temporary file in the data folder, such that they can be moved into place via an
+    atomic rename once they are complete. The temporary files are removed at the end of the request.
+    """
+    def _get_file_stream(self, total_content_length, content_type, filename = None, content_length = None):
+        return createTemporaryFile()
 
 app = Flask(__name__)
+app.request_class = receiverRequest
 
 # From: http://flask.pocoo.org/docs/0.12/patterns/apierrors/
 class InvalidUsage(Exception):
@@ -122,6 +151,118 @@ def checkForToken(func):
 
     return decoratedCheckToken
 
+class uploadLimiter(object):
+    """ Limits the uploads which are handled concurrently by a receiver process.
+
+    Uploads are rejected if accepting them would exceed the maximum number of in-flight requests or bytes, if
+    the free disk space of the data folder is too low, or if too many received files are waiting to be moved
+    by the processing. A limit of 0 disables the corresponding check. The limits apply per receiver process.
+
+    Args:
+        maxInFlightRequests (int): Maximum number of uploads which are handled concurrently.
+        maxInFlightBytes (int): Maximum number of bytes of the uploads which are handled concurrently. A single
+            upload is always accepted if no other upload is in progress.
+        minFreeDiskSpace (int): Minimum free disk space in the data folder (in bytes) to accept an upload.
+        maxBacklogFiles (int): Maximum number of received files in the data folder to accept an upload.
+
+    Attributes:
+        inFlightRequests (int): Number of uploads which are currently being handled.
+        inFlightBytes (int): Number of bytes of the uploads which are currently being handled.
+    """
+    def __init__(self, maxInFlightRequests, maxInFlightBytes, minFreeDiskSpace, maxBacklogFiles):
+        self.maxInFlightRequests = maxInFlightRequests
+        self.maxInFlightBytes = maxInFlightBytes
+        self.minFreeDiskSpace = minFreeDiskSpace
+        self.maxBacklogFiles = maxBacklogFiles
+        self.inFlightRequests = 0
+        self.inFlightBytes = 0
+        self.lock = threading.Lock()
+
+    def acquire(self, size):
+        """ Attempt to accept an upload.
+
+        If the upload is accepted, ``release()`` must be called once it has been handled.
+
+        Args:
+            size (int): Size of the upload in bytes (ie. the content length). 0 if it is unknown.
+        Returns:
+            str: Reason that the upload was rejected, or None if it was accepted.
+        """
+        directory = receiverParameters["dataFolder"]
+        if self.minFreeDiskSpace and hasattr(os, "statvfs"):
+            stats = os.statvfs(directory)
+            if stats.f_bavail * stats.f_frsize - size < self.minFreeDiskSpace:
+                return "Insufficient disk space to receive the file"
+        if self.maxBacklogFiles:
+            (_, nFiles) = fileIndex.files(directory)
+            if nFiles >= self.maxBacklogFiles:
+                return "Too many received files are waiting to be processed"
+        with self.lock:
+            if self.maxInFlightRequests and self.inFlightRequests >= self.maxInFlightRequests:
+                return "Too many files are being received concurrently"
+            if self.maxInFlightBytes and self.inFlightRequests and self.inFlightBytes + size > self.maxInFlightBytes:
+                return "Too much data is being received concurrently"
+            self.inFlightRequests += 1
+            self.inFlightBytes += size
+        return None
+
+    def release(self, size):
+        """ Note that an accepted upload has been handled.
+
+        Args:
+            size (int): Size of the upload in bytes, as passed to ``acquire()``.
+        Returns:
+            None.
+        """
+        with self.lock:
+            self.inFlightRequests -= 1
+            self.inFlightBytes -= size
+
+limiter = uploadLimiter(maxInFlightRequests = receiverParameters["backpressure"]["maxInFlightRequests"],
+                        maxInFlightBytes = receiverParameters["backpressure"]["maxInFlightBytes"],
+                        minFreeDiskSpace = receiverParameters["backpressure"]["minFreeDiskSpace"],
+                        maxBacklogFiles = receiverParameters["backpressure"]["maxBacklogFiles"])
+
+def limitUploads(func):
+    """ Reject uploads with ``503 Service Unavailable`` if the receiver is too busy to handle them.
+
+    The response follows the format of the other upload responses, and includes a ``Retry-After`` header, so the
+    sender can try again later. Only ``POST`` requests are limited. It should be applied after ``checkForToken``,
+    such that invalid requests are still rejected due to their token.
+
+    Args:
+        func (function): Routing function to be wrapped.
+    Returns:
+        Any: Wrapped function.
+    """
+    @functools.wraps(func)
+    def decoratedLimitUploads(*args, **kwargs):
+        """ Reject the upload if the receiver is too busy, and otherwise execute the function.
+
+        Args:
+            *args (list): Arguments to be passed to the function.
+            **kwargs (dict): Arguments to be passed to the function.
+        Returns:
+            Any: Executes the function with the given arguments, or a ``503`` response if the receiver is too busy.
+        """
+        if request.method != "POST":
+            return func(*args, **kwargs)
+
+        size = request.content_length or 0
+        reason = limiter.acquire(size)
+        if reason is not None:
+            logger.warning("Rejecting upload: {reason}".format(reason = reason))
+            resp = jsonify({"status": 503, "message": "{reason}. Please try again later.".format(reason = reason), "received": None})
+            resp.status_code = 503
+            resp.headers["Retry-After"] = str(receiverParameters["backpressure"]["retryAfter"])
+            return resp
+        try:
+            return func(*args, **kwargs)
+        finally:
+            limiter.release(size)
+
+    return decoratedLimitUploads
+
 @app.route("/", methods = ["GET", "POST"])
 @checkForToken
 def index():
@@ -143,6 +284,7 @@ def index():
 
 @app.route("/rest/api/files", methods = ["GET", "POST"])
 @checkForToken
+@limitUploads
 def dqm():
     """ Receive files from the DQM system.
 
@@ -160,10 +302,13 @@ def dqm():
     response = {}
     # Handle the "GET request"
     if request.method == "GET":
-        # We use upper on the filename so that "DQM" will always match, regardless of the case in the file.
-        # "DQM" is unique enough in English that we don't need to worry about this matching unrelated files.
-        availableFiles = [f for f in os.listdir(receiverParameters["dataFolder"]) if os.path.isfile(os.path.join(receiverParameters["dataFolder"], f)) and "DQM" in f.upper()]
+        (runNumber, agent, offset, limit) = validateFileListingRequest(request)
+        (availableFiles, total) = fileIndex.files(receiverParameters["dataFolder"], runNumber = runNumber, agent = agent,
+                                                  offset = offset, limit = limit)
         response["files"] = availableFiles
+        response["total"] = total
+        response["offset"] = offset
+        response["limit"] = limit
         resp = jsonify(response)
         resp.status_code = 200
         return resp
@@ -221,43 +366,53 @@ def dqm():
     # - http://flask.pocoo.org/docs/0.12/patterns/fileuploads/
     # - https://pythonhosted.org/Flask-Uploads/
     # - https://stackoverflow.com/questions/10434599/how-to-get-data-received-in-flask-request
+    # In both cases, the file is written in chunks to a temporary file in the data folder, and then renamed once
+    # it is complete. This way, the memory usage doesn't depend on the size of the file, and a partially written
+    # file is never visible to the processing.
     savedFile = False
-    if "file" in request.files:
-        # Handle multi-part file request. This is the preferred method!
-        # We expect the file to be sent under the key "file".
-
-        # Get file
-        logger.info("Handling file in form via form/multi-part")
-        payloadFile = request.files["file"]
+    try:
+        if "file" in request.files:
+            # Handle multi-part file request. This is the preferred method!
+            # We expect the file to be sent under the key "file".
 
-        # Save it out
-        payloadFile.save(outputPath)
-        savedFile = True
-    else:
-        # Get the payload by hand. This is strongly disfavored, such that it isn't documented
-        # in the API reference.
-        logger.info("Handling payload directly")
-        # Can use request.stream to get the data in an unmodified way
-        # Can use request.data to get the data as a string
-        # Can use request.get_data() to get all non-form data as the bytes of whatever is in the body
-        payload = request.get_data()
-        logger.info("payload: {payload}".format(payload = payload[:100]))
-        if payload:
-            # Not opening as ROOT file since we are just writing the bytes to a file
-            with open(outputPath, "wb") as fOut:
-                fOut.write(payload)
+            # Get file
+            logger.info("Handling file in form via form/multi-part")
+            payloadFile = request.files["file"]
 
+            # Move it into place. It was already streamed to a temporary file while parsing the request.
+            storeUploadedFile(payloadFile.stream, outputPath)
             savedFile = True
         else:
-            logger.warning("No payload...")
+            # Get the payload by hand. This is strongly disfavored, such that it isn't documented
+            # in the API reference.
+            logger.info("Handling payload directly")
+            # We use request.stream to get the data in an unmodified way without reading it all into memory.
+            size = writeStreamToFile(request.stream, outputPath)
+            logger.info("Received payload of {size} bytes".format(size = size))
+            if size:
+                savedFile = True
+            else:
+                logger.warning("No payload...")
+    finally:
+        # Cleanup any temporary files which weren't moved into place (for example, due to additional or
+        # unexpected form fields, or an error while writing).
+        for uploadedFile in request.files.values():
+            removeTemporaryFile(uploadedFile.stream)
 
     if savedFile:
+        # Make the file available in the listing immediately, rather than waiting for the next reconciliation.
+        fileIndex.add(filename)
+
         # Extract received object info
         (infoSuccess, receivedObjects) = receivedObjectInfo(outputPath)
         if infoSuccess:
             response["status"] = 200
             response["message"] = "Successfully received file and extracted information"
             response["received"] = receivedObjects
+            # Optionally read all of the objects in the background. The result is available via the validation route.
+            if receiverParameters["deepValidation"]["enabled"]:
+                deepValidator.submit(filename, outputPath)
+                response["validation"] = "queued"
         else:
             response["status"] = 400
             response["message"] = "Successfully received the file, but the file is not valid! Perhaps it was corrupted?"
@@ -280,11 +435,225 @@ def dqm():
     logger.info("Response: {response}, resp: {resp}".format(response = response, resp = resp))
     return resp
 
+def validateFileListingRequest(request):
+    """ Validate the parameters of a file listing request.
+
+    Args:
+        request (Flask.request): The request object from Flask.
+    Returns:
+        tuple: (runNumber, agent, offset, limit), where runNumber (int) and agent (str) filter the files (None
+            for no filter), offset (int) is the number of files to skip, and limit (int) is the maximum number of
+            files to return (0 for all files).
+
+    Raises:
+        InvalidUsage: If one of the parameters is invalid.
+    """
+    values = {}
+    for name in ["runNumber", "offset", "limit"]:
+        value = request.args.get(name, None)
+        try:
+            values[name] = int(value) if value else None
+        except ValueError:
+            raise InvalidUsage("{name} must be an integer, but received {value}".format(name = name, value = value))
+        if values[name] is not None and values[name] < 0:
+            raise InvalidUsage("{name} must be positive, but received {value}".format(name = name, value = value))
+    agent = request.args.get("agent", None) or None
+    return (values["runNumber"], agent, values["offset"] or 0, values["limit"] or 0)
+
+class receivedFileIndex(object):
+    """ Index of the received files which are available in the data folder.
+
+    Listing the data folder on every request is expensive, since it may contain many files until the processing
+    moves them. Instead, files are added to the index when they are received, and the index is periodically
+    reconciled with the directory (for example, to remove files which were moved by the processing, or to add
+    files received by other receiver processes).
+
+    Args:
+        reconcileInterval (float): Minimum time between reconciliations with the directory in seconds.
+
+    Attributes:
+        reconcileInterval (float): Minimum time between reconciliations with the directory in seconds.
+        directory (str): Directory which is indexed. None if it hasn't been indexed yet.
+        entries (dict): Information about the indexed files. Keys are the filenames, and the values are
+            ``(runNumber, agent)``, which are None if they can't be determined from the filename.
+        lastReconcileTime (float): Time of the most recent reconciliation (as determined by ``time.time()``).
+    """
+    # Format is "SUBSYSTEMhistos_runNumber_hltMode_time.root". See ``dqm()``.
+    filenameFormat = re.compile(r"^(?P<agent>.*)histos_(?P<runNumber>\d+)_")
+
+    def __init__(self, reconcileInterval):
+        self.reconcileInterval = reconcileInterval
+        self.directory = None
+        self.entries = {}
+        self.lastReconcileTime = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def isReceivedFile(filename):
+        """ Check whether a file in the data folder is a received file.
+
+        We use upper on the filename so that "DQM" will always match, regardless of the case in the file.
+        "DQM" is unique enough in English that we don't need to worry about this matching unrelated files.
+        Uploads which are still in progress are excluded.
+
+        Args:
+            filename (str): Name of the file.
+        Returns:
+            bool: True if the file is a received file.
+        """
+        return "DQM" in filename.upper() and not filename.startswith(temporaryFilePrefix)
+
+    def createEntry(self, filename):
+        """ Determine the run number and agent of a file from its name.
+
+        Args:
+            filename (str): Name of the file.
+        Returns:
+            tuple: (runNumber, agent). Each value is None if it can't be determined.
+        """
+        match = self.filenameFormat.match(filename)
+        if not match:
+            return (None, None)
+        return (int(match.group("runNumber")), match.group("agent"))
+
+    def add(self, filename):
+        """ Add a received file to the index.
+
+        Args:
+            filename (str): Name of the file.
+        Returns:
+            None.
+        """
+        if not self.isReceivedFile(filename):
+            return
+        with self.lock:
+            self.entries[filename] = self.createEntry(filename)
+
+    def reconcile(self, directory):
+        """ Reconcile the index with the files in the directory.
+
+        Args:
+            directory (str): Directory which contains the received files.
+        Returns:
+            None.
+        """
+        # ``scandir`` provides the file type without an additional ``stat`` for each file. It is only available
+        # in python 3, so we fall back to ``listdir`` otherwise.
+        if hasattr(os, "scandir"):
+            filenames = [entry.name for entry in os.scandir(directory) if entry.is_file()]
+        else:
+            filenames = [f for f in os.listdir(directory) if os.path.isfile(os.path.join(directory, f))]
+        entries = {}
+        with self.lock:
+            for filename in filenames:
+                if self.isReceivedFile(filename):
+                    entries[filename] = self.entries[filename] if filename in self.entries else self.createEntry(filename)
+            self.entries = entries
+            self.directory = directory
+            self.lastReconcileTime = time.time()
+
+    def files(self, directory, runNumber = None, agent = None, offset = 0, limit = 0):
+        """ List the received files, reconciling the index with the directory if necessary.
+
+        Args:
+            directory (str): Directory which contains the received files.
+            runNumber (int): Only list files from this run. Default: None, which lists files from all runs.
+            agent (str): Only list files from this agent. Default: None, which lists files from all agents.
+            offset (int): Number of files to skip. Default: 0.
+            limit (int): Maximum number of files to return. Default: 0, which returns all files.
+        Returns:
+            tuple: (list, int). The names of the selected files (sorted by name), and the total number of files
+                which match the filters.
+        """
+        if self.directory != directory or self.lastReconcileTime is None or time.time() - self.lastReconcileTime > self.reconcileInterval:
+            self.reconcile(directory)
+        with self.lock:
+            selected = sorted(filename for filename, (fileRunNumber, fileAgent) in self.entries.items()
+                              if (runNumber is None or fileRunNumber == runNumber) and (agent is None or fileAgent == agent))
+        end = offset + limit if limit else None
+        return (selected[offset:end], len(selected))
+
+fileIndex = receivedFileIndex(reconcileInterval = receiverParameters["fileIndexReconcileInterval"])
+
+def createTemporaryFile():
+    """ Create a temporary file in the data folder for an upload which is in progress.
+
+    Args:
+        None.
+    Returns:
+        file: Temporary file which is opened for writing. It is not automatically deleted.
+    """
+    return tempfile.NamedTemporaryFile(dir = receiverParameters["dataFolder"], prefix = temporaryFilePrefix,
+                                       suffix = ".tmp", delete = False)
+
+def removeTemporaryFile(temporaryFile):
+    """ Close and remove a temporary file (if it still exists).
+
+    Args:
+        temporaryFile (file): Temporary file created by ``createTemporaryFile()``. Other file-like objects are ignored.
+    Returns:
+        None.
+    """
+    filename = getattr(temporaryFile, "name", None)
+    if not isinstance(filename, str) or not os.path.basename(filename).startswith(temporaryFilePrefix):
+        return
+    temporaryFile.close()
+    if os.path.exists(filename):
+        os.remove(filename)
+
+def writeStreamToFile(stream, outputPath):
+    """ Write a stream in chunks to a temporary file, and then move it into place via an atomic rename.
+
+    Args:
+        stream (file): Stream which contains the file contents.
+        outputPath (str): Path where the file should be stored.
+    Returns:
+        int: Number of bytes written. If no bytes were available, the file is not stored.
+    """
+    temporaryFile = createTemporaryFile()
+    try:
+        size = 0
+        with temporaryFile:
+            while True:
+                chunk = stream.read(receiverParameters["uploadChunkSize"])
+                if not chunk:
+                    break
+                temporaryFile.write(chunk)
+                size += len(chunk)
+        if size:
+            os.rename(temporaryFile.name, outputPath)
+    finally:
+        removeTemporaryFile(temporaryFile)
+    return size
+
+def storeUploadedFile(stream, outputPath):
+    """ Move an uploaded file into place.
+
+    Files which were streamed to a temporary file in the data folder (see ``receiverRequest``) are renamed
+    directly, while other streams are copied in chunks.
+
+    Args:
+        stream (file): Stream of the uploaded file.
+        outputPath (str): Path where the file should be stored.
+    Returns:
+        None.
+    """
+    filename = getattr(stream, "name", None)
+    if isinstance(filename, str) and os.path.basename(filename).startswith(temporaryFilePrefix):
+        stream.close()
+        os.rename(filename, outputPath)
+    else:
+        stream.seek(0)
+        writeStreamToFile(stream, outputPath)
+
 def receivedObjectInfo(outputPath):
     """ Print the ROOT objects in a received file.
 
-    Helper function to confirm that the file was transferred successfully by reading the objects
-    contained within.
+    Helper function to confirm that the file was transferred successfully by inspecting the key directory
+    of the file. Only the names, class names, and sizes stored in the keys are used, so none of the objects need
+    to be read (and decompressed). The file is considered valid if it contains at least one key, and all of the
+    keys point to records which are contained within the file (ie. the file wasn't truncated). For a check which
+    reads every object, see ``fileValidator``.
 
     Args:
         outputPath (str): Name of the file.
@@ -297,23 +666,162 @@ def receivedObjectInfo(outputPath):
     success = False
     receivedObjects = {}
 
-    # Open file, and if it's valid, read the objects.
+    # Open file, and if it's valid, inspect the keys.
     # The file could be invalid if the file sent was not a ROOT object.
     fOut = ROOT.TFile.Open(outputPath, "READ")
-    if fOut:
+    if fOut and not fOut.IsZombie():
         keys = fOut.GetListOfKeys()
+        fileEnd = fOut.GetEND()
 
         # Iterate over the available objects.
+        success = len(keys) > 0
         for key in keys:
-            obj = key.ReadObj()
-            receivedObjects[key.GetName()] = "Obj name: {}, Obj IsA() Name: {}".format(obj.GetName(), obj.IsA().GetName())
-            success = True
+            receivedObjects[key.GetName()] = "Obj name: {}, Obj IsA() Name: {}".format(key.GetName(), key.GetClassName())
+            if key.GetNbytes() <= 0 or key.GetSeekKey() + key.GetNbytes() > fileEnd:
+                logger.warning("Key {} in {} extends beyond the end of the file.".format(key.GetName(), outputPath))
+                success = False
 
         # Print to log for convenience
         logger.info(receivedObjects)
+    if fOut:
+        fOut.Close()
 
     return (success, receivedObjects)
 
+class fileValidator(object):
+    """ Validates received files in a background thread by reading every object that they contain.
+
+    Reading every object requires decompressing and deserializing the entire file, so it is performed after
+    the upload response has been sent. The results are recorded in memory in the receiver process which
+    received the file, and are available via the validation route.
+
+    Args:
+        maxResults (int): Maximum number of results to keep. The oldest results are removed first.
+
+    Attributes:
+        maxResults (int): Maximum number of results to keep.
+        results (collections.OrderedDict): Validation results keyed by filename. Each result is a dict containing the
+            ``status`` ("queued", "running", "valid", or "invalid"), a ``message``, and the ``time`` of the most
+            recent update.
+        workerThread (threading.Thread): Thread which validates the files. None if it hasn't been started.
+    """
+    def __init__(self, maxResults):
+        self.maxResults = maxResults
+        self.results = collections.OrderedDict()
+        self.queue = queue.Queue()
+        self.workerThread = None
+        self.lock = threading.Lock()
+
+    def submit(self, filename, outputPath):
+        """ Queue a file to be validated, starting the worker thread if necessary.
+
+        Args:
+            filename (str): Name of the file, which is used to look up the result.
+            outputPath (str): Path to the file.
+        Returns:
+            None.
+        """
+        self.recordResult(filename, "queued", "Waiting to be validated")
+        with self.lock:
+            if self.workerThread is None or not self.workerThread.is_alive():
+                self.workerThread = threading.Thread(target = self.run, name = "fileValidator")
+                self.workerThread.daemon = True
+                self.workerThread.start()
+        self.queue.put((filename, outputPath))
+
+    def result(self, filename):
+        """ Retrieve the validation result of a file.
+
+        Args:
+            filename (str): Name of the file.
+        Returns:
+            dict: Validation result, or None if the file hasn't been submitted to this process.
+        """
+        with self.lock:
+            result = self.results.get(filename)
+            return dict(result) if result is not None else None
+
+    def recordResult(self, filename, status, message):
+        """ Record the validation status of a file.
+
+        Args:
+            filename (str): Name of the file.
+            status (str): Validation status.
+            message (str): Explanation of the status.
+        Returns:
+            None.
+        """
+        with self.lock:
+            self.results.pop(filename, None)
+            self.results[filename] = {"status": status, "message": message, "time": time.time()}
+            while len(self.results) > self.maxResults:
+                self.results.popitem(last = False)
+
+    def run(self):
+        """ Validate the queued files until the process exits.
+
+        Args:
+            None.
+        Returns:
+            None.
+        """
+        while True:
+            (filename, outputPath) = self.queue.get()
+            self.recordResult(filename, "running", "Validating")
+            try:
+                (valid, message) = readAllObjects(outputPath)
+            except Exception as e:
+                (valid, message) = (False, "Validation failed with {e}".format(e = e))
+            if valid:
+                logger.info("Validated {filename}: {message}".format(filename = filename, message = message))
+            else:
+                logger.warning("Received file {filename} is invalid: {message}".format(filename = filename, message = message))
+            self.recordResult(filename, "valid" if valid else "invalid", message)
+
+def readAllObjects(outputPath):
+    """ Read every object in a file to confirm that it can be completely deserialized.
+
+    Args:
+        outputPath (str): Path to the file.
+    Returns:
+        tuple: (bool, str). The bool is ``True`` if all of the objects could be read, and the str describes the result.
+    """
+    fIn = ROOT.TFile.Open(outputPath, "READ")
+    if not fIn or fIn.IsZombie():
+        return (False, "Could not open the file")
+    try:
+        nObjects = 0
+        for key in fIn.GetListOfKeys():
+            obj = key.ReadObj()
+            if not obj:
+                return (False, "Could not read object {}".format(key.GetName()))
+            nObjects += 1
+    finally:
+        fIn.Close()
+    return (True, "Read {} objects".format(nObjects))
+
+deepValidator = fileValidator(maxResults = receiverParameters["deepValidation"]["maxResults"])
+
+@app.route("/rest/api/files/<string:filename>/validation", methods = ["GET"])
+@checkForToken
+def fileValidation(filename):
+    """ Return the result of the deep validation of a received file.
+
+    For further information on the REST API (which is partially defined here), see
+    :doc:`the DQM receiver README </dqmReceiverReadme>`.
+
+    Args:
+        filename (str): Name of the file.
+    Returns:
+        Response: ``JSON`` based response which contains the validation result of the file.
+    """
+    filename = secure_filename(filename)
+    result = deepValidator.result(filename)
+    if result is None:
+        raise InvalidUsage("No validation result is available for {}".format(filename), status_code = 404)
+    result["filename"] = filename
+    return jsonify(result)
+
 @app.route("/rest/api/files/<string:filename>", methods = ["GET"])
 @checkForToken
 def returnFile(filename):
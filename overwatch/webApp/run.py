@@ -38,8 +38,24 @@ utilities.setupLogging(logger = logger,
 logger.info(serverParameters)
 
 # Imports are below here so that they can be logged
+from overwatch.webApp import webApp
 from overwatch.webApp.webApp import app
 
+# Warm the database cache in each serving process.
+try:
+    import uwsgi
+except ImportError:
+    # Not running under uwsgi. The development server warms the cache when it starts.
+    uwsgi = None
+if uwsgi is not None:
+    if uwsgi.opt.get("lazy-apps"):
+        # The app is loaded separately in each worker (ie. after the fork), so we can warm it immediately.
+        webApp.warmDatabaseCache()
+    else:
+        # The app is loaded by the master, so we need to wait until the workers are forked.
+        from uwsgidecorators import postfork
+        postfork(webApp.warmDatabaseCache)
+
 # Get the secret key for the web app
 if not serverParameters["debug"]:
     # Connect to database ourselves and grab the secret key
@@ -74,6 +90,7 @@ def runDevelopment():
     Returns:
         None.
     """
+    webApp.warmDatabaseCache()
     if "pdsf" in socket.gethostname():
         from flup.server.fcgi import WSGIServer
         logger.info("Starting flup WSGI app")
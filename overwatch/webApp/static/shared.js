@@ -92,6 +92,9 @@ function initPage(jsRootState) {
 
     // Sets the max limits of the form.
     setTimeSlicesFormValues();
+
+    // Receive notifications when new processing output is available.
+    subscribeToUpdates();
 }
 
 /**
@@ -176,36 +179,83 @@ function handleFormSubmit(selectedForm, selectedButton) {
             data.mainContent = "500: Internal Server Error! Please contact the admin with information about what you were doing so that the error can be fixed! Thank you!";
         }
 
-        handleAjaxResponse()(data);
+        // Time slice requests are processed asynchronously, so we need to wait for the job to finish.
+        if (data !== null && data.hasOwnProperty("jobId")) {
+            waitForTimeSliceJob(data.statusUrl);
+            return;
+        }
 
-        // Determine the GET parameters for display in the history.
-        // NOTE: It could be null here in some cases if the request failed and we returned
-        // an error message.
-        if (data !== null) {
-            var localParams = {};
-            if (data.hasOwnProperty("timeSliceKey") && data.timeSliceKey !== "null") {
-                localParams.timeSliceKey = data.timeSliceKey;
-            }
-            if (data.hasOwnProperty("histName") && data.histName !== "null") {
-                localParams.histName = data.histName;
+        handleTimeSlicesResponse(data);
+    });
+}
+
+/**
+  * Wait for a time slice job to finish, showing the progress in the meantime.
+  *
+  * The job status is requested periodically until it returns the content to display (either the
+  * run page with the time slice, or the error message(s)), which is then passed to `handleResponse`.
+  */
+function waitForTimeSliceJob(statusUrl, handleResponse) {
+    handleResponse = typeof handleResponse !== 'undefined' ? handleResponse : handleTimeSlicesResponse;
+    var progress = document.querySelector("#loadingSpinnerProgress");
+    $.get(statusUrl, function(data) {
+        if (data.hasOwnProperty("jobId")) {
+            // Still being processed. Show the progress and check again shortly.
+            if (data.histogramsTotal > 0) {
+                $(progress).text("Processed " + data.histogramsProcessed + " of " + data.histogramsTotal + " histograms");
             }
-            if (data.hasOwnProperty("histGroup") && data.histGroup !== "null") {
-                localParams.histGroup = data.histGroup;
+            else {
+                $(progress).text("Time slice is " + data.state + "...");
             }
-            /*console.log("data: " + data);
-            console.log("localParams: " + JSON.stringify(localParams));*/
-
-            // Stay on the current page and update the history.
-            // We need to set retrieve the current page and pass it to `updateHistory()`
-            // to ensure that it doesn't navigate us away from our current page, where
-            // we want to stay.
-            var currentPage = window.location.pathname;
-            console.log("currentPage: " + currentPage);
-            updateHistory(localParams, currentPage);
+            setTimeout(function() { waitForTimeSliceJob(statusUrl, handleResponse); }, 1000);
+            return;
         }
+
+        $(progress).text("");
+        handleResponse(data);
+    }).fail(function(jqXHR, textStatus, errorThrown) {
+        $(progress).text("");
+        var data = {};
+        data.mainContent = textStatus + ": " + errorThrown;
+        data.mainContent += ". Please contact the admin with information about what you were doing so that the error can be fixed! Thank you!";
+
+        handleAjaxResponse()(data);
     });
 }
 
+/**
+  * Display the result of a time slice request and update the history.
+  */
+function handleTimeSlicesResponse(data) {
+    handleAjaxResponse()(data);
+
+    // Determine the GET parameters for display in the history.
+    // NOTE: It could be null here in some cases if the request failed and we returned
+    // an error message.
+    if (data !== null) {
+        var localParams = {};
+        if (data.hasOwnProperty("timeSliceKey") && data.timeSliceKey !== "null") {
+            localParams.timeSliceKey = data.timeSliceKey;
+        }
+        if (data.hasOwnProperty("histName") && data.histName !== "null") {
+            localParams.histName = data.histName;
+        }
+        if (data.hasOwnProperty("histGroup") && data.histGroup !== "null") {
+            localParams.histGroup = data.histGroup;
+        }
+        /*console.log("data: " + data);
+        console.log("localParams: " + JSON.stringify(localParams));*/
+
+        // Stay on the current page and update the history.
+        // We need to set retrieve the current page and pass it to `updateHistory()`
+        // to ensure that it doesn't navigate us away from our current page, where
+        // we want to stay.
+        var currentPage = window.location.pathname;
+        console.log("currentPage: " + currentPage);
+        updateHistory(localParams, currentPage);
+    }
+}
+
 /**
   * Set the values in the time slice form based on those provided in the main content.
   *
@@ -544,6 +594,12 @@ var handleAjaxResponse = function (localParams) {
         console.log("Handling AJAX response");
         //console.log(data)
 
+        // The requested histograms of a time slice may need to be processed first.
+        if (data !== null && data.hasOwnProperty("jobId")) {
+            waitForTimeSliceJob(data.statusUrl, handleAjaxResponse(localParams));
+            return;
+        }
+
         // Replace the drawer content if we received a meaningful response
         var drawerContent = $(data).prop("drawerContent");
         // console.log("drawerContent " + drawerContent);
@@ -594,8 +650,9 @@ var handleAjaxResponse = function (localParams) {
   * for the histogram representation in json. On a successful request, we use this information
   * to draw a histogram vis jsRoot.
   */
-function jsRootRequest() {
+function jsRootRequest(refresh) {
     console.log("Handling js root request!");
+    refresh = typeof refresh !== 'undefined' ? refresh : false;
     // Find all histograms that should be requested
     var requestedHists = Polymer.dom(this.root).querySelectorAll(".histogramContainer");
     $(requestedHists).addClass("histogramContainerStyle");
@@ -621,6 +678,10 @@ function jsRootRequest() {
             // (re)draw `jsRootObj` at specified frame "objectToDrawIn"
             // `redraw()` was the previous API, while the newer API requires `draw()`.
             //JSROOT.redraw(objectToDrawIn, jsRootObj, "colz");
+            // Remove the existing drawing if we are refreshing the histogram.
+            if (refresh === true) {
+                JSROOT.cleanup(objectToDrawIn);
+            }
             JSROOT.draw(objectToDrawIn, jsRootObj, "colz");
         });
 
@@ -629,6 +690,73 @@ function jsRootRequest() {
     });
 }
 
+// Event source which receives the notifications about new processing output. Null if not subscribed.
+var updatesSource = null;
+
+/**
+  * Subscribe to notifications about new processing output via server-sent events.
+  *
+  * When the subsystem displayed on the current run page has new output, we only request its histograms
+  * again. Unchanged histograms are revalidated via their ETag, so requesting them again is cheap.
+  *
+  * Each open event stream occupies a server thread, so we only subscribe while a run page is displayed,
+  * and close the stream when navigating to any other page.
+  */
+function subscribeToUpdates() {
+    if (typeof(EventSource) === "undefined") {
+        console.log("Server-sent events are not supported, so updates will not be received.");
+        return;
+    }
+
+    // Only run pages display histograms, and they store the run and subsystem in the time slices values.
+    var runPage = document.querySelector("#timeSlicesValues") !== null;
+    if (runPage === false) {
+        if (updatesSource !== null) {
+            updatesSource.close();
+            updatesSource = null;
+        }
+        return;
+    }
+    if (updatesSource !== null) {
+        return;
+    }
+
+    updatesSource = new EventSource("/updates");
+    updatesSource.addEventListener("newOutput", function(e) {
+        var update = JSON.parse(e.data);
+        var pageValues = document.querySelector("#timeSlicesValues");
+        if (!pageValues || $(pageValues).data("rundir") !== update.runDir || $(pageValues).data("subsystem") !== update.subsystem) {
+            return;
+        }
+        // Time slices are not updated by the standard processing.
+        if (window.location.search.indexOf("timeSliceKey=") >= 0 && window.location.search.indexOf("timeSliceKey=null") < 0) {
+            return;
+        }
+        console.log("New output for " + update.runDir + ", " + update.subsystem + ". Refreshing histograms.");
+        refreshHistograms(update.generation);
+    });
+}
+
+/**
+  * Request the histograms displayed on the current page again.
+  */
+function refreshHistograms(generation) {
+    var jsRootState = $(document.querySelector("#jsRootToggle")).prop("checked") === true;
+    if (jsRootState === true) {
+        jsRootRequest(true);
+    }
+    else {
+        $(document.querySelectorAll(".histogramImage")).each(function() {
+            // The protected files ignore GET parameters, so we use one to request the updated image.
+            var src = $(this).attr("src").split("?")[0];
+            $(this).attr("src", src + "?generation=" + generation);
+        });
+        $(document.querySelectorAll(".histogramThumbnail")).each(function() {
+            $(this).css("background-image", "url('" + $(this).data("spritesheet") + "?generation=" + generation + "')");
+        });
+    }
+}
+
 /**
   *  Handle changes in the history when navigating within the site.
   */
@@ -4,30 +4,81 @@
 
 """
 
+import collections
+import hashlib
+import io
 import logging
+import threading
 from flask_login import login_required
-from flask import request, render_template, jsonify
+from flask import request, render_template, jsonify, make_response
 from flask import Blueprint
 import jinja2
+import numpy as np
 import os
 
 import overwatch.processing.trending.constants as CON
-from overwatch.processing.trending.manager import TrendingManager
 from overwatch.webApp.webApp import db, serverParameters
 from overwatch.webApp import validation
 
 logger = logging.getLogger(__name__)
 trendingPage = Blueprint('trendingPage', __name__)
 
+TrendingObjectSummary = collections.namedtuple("TrendingObjectSummary", ["name", "desc"])
 
-def determineSubsystemName(subsystemName, trendingManager):  # type: (str, TrendingManager) -> str
-    """If subsystem argument is not valid, trying to return any subsystem from TrendingManager database"""
+
+class TrendingPageModel(object):
+    """ Read-only snapshot of the trending information which is needed to render the trending page.
+
+    The snapshot is created from the trending database once per trending version, so rendering the
+    trending page doesn't need to walk the database (or touch the file system).
+
+    Args:
+        trendingDB (BTree): Database for trending.
+        version (int): Trending version of the database when the snapshot was created.
+
+    Attributes:
+        version (int): Trending version of the database when the snapshot was created.
+        subsystems (OrderedDict): Summaries of the trending objects, keyed by subsystem name and then
+            by trending object name.
+    """
+    def __init__(self, trendingDB, version):  # type: (BTree, int) -> None
+        self.version = version
+        self.subsystems = collections.OrderedDict()
+        for subsystemName, subsystem in trendingDB.items():
+            self.subsystems[subsystemName] = collections.OrderedDict(
+                (name, TrendingObjectSummary(name, trendingObject.desc)) for name, trendingObject in subsystem.items()
+            )
+
+    def firstSubsystemName(self):  # type: () -> Optional[str]
+        """Return the name of the first subsystem which contains trending objects, or None if there is none."""
+        for subsystemName, subsystem in self.subsystems.items():
+            if len(subsystem):
+                return subsystemName
+        return None
+
+
+_trendingPageModel = {"model": None}
+_trendingPageModelLock = threading.Lock()
+
+def retrieveTrendingPageModel():  # type: () -> TrendingPageModel
+    """Return the cached trending page model, recreating it if the trending version in the database changed."""
+    version = db[CON.VERSION] if CON.VERSION in db else 0
+    model = _trendingPageModel["model"]
+    if model is None or model.version != version:
+        with _trendingPageModelLock:
+            model = _trendingPageModel["model"]
+            if model is None or model.version != version:
+                logger.debug("Creating trending page model for trending version {version}".format(version=version))
+                model = TrendingPageModel(db[CON.TRENDING], version)
+                _trendingPageModel["model"] = model
+    return model
+
+def determineSubsystemName(subsystemName, trendingModel):  # type: (str, TrendingPageModel) -> str
+    """If subsystem argument is not valid, trying to return any subsystem from the trending page model"""
     if subsystemName:
         return subsystemName
 
-    for subsystemName, subsystem in trendingManager.trendingDB.items():
-        if len(subsystem):
-            return subsystemName
+    return trendingModel.firstSubsystemName()
 
 
 @trendingPage.route("/" + CON.TRENDING, methods=["GET", "POST"])
@@ -62,9 +113,9 @@ def trending():
             return jsonify(drawerContent = drawerContent, mainContent = mainContent)
         return render_template("error.html", errors = error)
 
-    # Create trending container from stored trending information
-    trendingManager = TrendingManager(db, serverParameters)
-    subsystemName = determineSubsystemName(subsystemName, trendingManager)
+    # Retrieve the (cached) trending information
+    trendingModel = retrieveTrendingPageModel()
+    subsystemName = determineSubsystemName(subsystemName, trendingModel)
 
     if not subsystemName:
         error.setdefault("Subsystem", []).append("Cannot find any trended subsystem")
@@ -80,7 +131,7 @@ def trending():
     jsonFilenameTemplate = filenameTemplate.format(type=CON.JSON, extension="json")
 
     templateKwargs = {
-        "trendingManager": trendingManager,
+        "trendingModel": trendingModel,
         "selectedHistGroup": subsystemName,
         "selectedHist": requestedHist,
         "jsonFilenameTemplate": jsonFilenameTemplate,
@@ -102,6 +153,92 @@ def trending():
     returnValue = reRenderIfError(error, "error.html", returnValue)
     return returnValue
 
+@trendingPage.route("/" + CON.TRENDING + "/data", methods=["GET"])
+@login_required
+def trendingData():
+    """ Route to provide the trended values of a trending object.
+
+    The values are returned as numeric arrays (time stamps and values), so they can be used without
+    rendering anything. The response includes an ``ETag`` which changes only when the trending object
+    is modified, so polling clients can cheaply revalidate their cached values. Responses for a range
+    which is already closed (ie. it ends before the most recent trended value) are cacheable for
+    ``trendingDataCacheTime`` seconds.
+
+    Note:
+        Function args are provided through the flask request object.
+
+    Args:
+        subsystemName (str): Name of the subsystem which contains the trending object.
+        trendingName (str): Name of the trending object.
+        startTime (int): Unix time of the start of the requested range. Optional.
+        endTime (int): Unix time of the end of the requested range. Optional.
+        startRun (int): First run of the requested range. Optional.
+        endRun (int): Last run of the requested range. Optional.
+        resolution (int): Maximum number of returned values. Values are averaged if necessary. Optional.
+        format (str): "json" (default) or "binary". The binary format is a numpy ``npz`` archive which
+            contains the ``timeStamps`` and ``values`` arrays.
+    Returns:
+        Response: Trended values in the requested format, or the errors (as json) if the request is invalid.
+    """
+    logger.debug("request: {0}".format(request.args))
+    (error, subsystemName, trendingName, timeRange, runRange, resolution, responseFormat) = validation.validateTrendingData(request)
+    if error:
+        return jsonify(errors = error), 400
+
+    if CON.TRENDING not in db or subsystemName not in db[CON.TRENDING] or trendingName not in db[CON.TRENDING][subsystemName]:
+        error.setdefault("Trending object", []).append("Cannot find trending object {} in subsystem {}".format(trendingName, subsystemName))
+        return jsonify(errors = error), 404
+    trendingObject = db[CON.TRENDING][subsystemName][trendingName]
+
+    # The run range is converted into a time range.
+    (startTime, endTime) = timeRange
+    for runNumber, useStartOfRun in [(runRange[0], True), (runRange[1], False)]:
+        if not runNumber:
+            continue
+        run = db["runs"].get("Run{}".format(runNumber)) if "runs" in db else None
+        if not run or not len(run.subsystems):
+            error.setdefault("Run range", []).append("Cannot find run {}".format(runNumber))
+            return jsonify(errors = error), 404
+        subsystem = run.subsystems.get(subsystemName, run.subsystems[run.subsystems.minKey()])
+        if useStartOfRun:
+            startTime = max(startTime, subsystem.startOfRun)
+        else:
+            endTime = min(endTime, subsystem.endOfRun) if endTime else subsystem.endOfRun
+
+    (timeStamps, values) = trendingObject.retrieveTrendedValues(startTime, endTime)
+    (timeStamps, values) = downsampleTrendedValues(timeStamps, values, resolution)
+
+    if responseFormat == "binary":
+        output = io.BytesIO()
+        np.savez(output, timeStamps = timeStamps, values = values)
+        response = make_response(output.getvalue())
+        response.mimetype = "application/octet-stream"
+    else:
+        response = jsonify(subsystemName = subsystemName, trendingName = trendingName,
+                           timeStamps = timeStamps.tolist(), values = values.tolist())
+
+    # The serial is updated by the database whenever the trending object is modified.
+    etag = hashlib.sha1(trendingObject._p_serial + request.query_string).hexdigest()
+    response.set_etag(etag)
+    response.cache_control.private = True
+    allTimeStamps = getattr(trendingObject, "timeStamps", None)
+    if endTime and allTimeStamps is not None and len(allTimeStamps) and endTime < allTimeStamps[-1]:
+        response.cache_control.max_age = serverParameters["trendingDataCacheTime"]
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def downsampleTrendedValues(timeStamps, values, resolution):  # type: (np.ndarray, np.ndarray, int) -> Tuple[np.ndarray, np.ndarray]
+    """Reduce the number of values to at most resolution by averaging adjacent values.
+    A resolution of 0 returns the values unchanged."""
+    if not resolution or len(timeStamps) <= resolution:
+        return (timeStamps, values)
+
+    bins = np.array_split(np.arange(len(timeStamps)), resolution)
+    timeStamps = np.array([timeStamps[b].mean() for b in bins], dtype=np.int64)
+    values = np.array([values[b].mean(axis=0) for b in bins])
+    return (timeStamps, values)
+
 def safeRenderTemplate(error, *args, **kwargs):
     """If error is empty, return rendered template from *args and **kwargs.
     Otherwise return empty string, if exception appear return empty string."""
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+
+""" Blueprint for pushing notifications about new processing output to the browser.
+
+The notifications are sent as server-sent events (SSE). Each web app process checks the database for new
+output (via the ``generation`` of the subsystems of the most recent runs) at most once per check interval,
+regardless of the number of connected clients, and then broadcasts the resulting events to all of its
+connected clients. The clients then only need to request the histograms of the subsystem which changed.
+
+Note:
+    Each open event stream occupies a ``uwsgi`` thread for up to ``updateEvents.streamDuration``. They
+    should therefore be served by a separate instance of the web app with its own thread pool (see the
+    ``webAppUpdates`` executable and the ``updatesWebAppName`` option of ``nginx`` in ``overwatch.base.deploy``),
+    so that they don't exhaust the threads which serve the pages.
+"""
+
+import collections
+import json
+import logging
+import threading
+import timeit
+
+import transaction
+from flask import Blueprint, Response, request
+from flask_login import login_required
+
+from overwatch.webApp.webApp import db, serverParameters
+
+logger = logging.getLogger(__name__)
+updatesPage = Blueprint("updatesPage", __name__)
+
+class updateBroadcaster(object):
+    """ Detects new processing output and broadcasts it to the connected clients of a web app process.
+
+    The database is checked via a dedicated connection (with its own transaction manager), so the event
+    streams don't need to hold a database connection while they wait for events.
+
+    Args:
+        checkInterval (float): Minimum time between checks of the database in seconds.
+        nRuns (int): Number of the most recent runs to check for new output.
+        maxEvents (int): Maximum number of events to keep for clients which are catching up. Default: 1000.
+
+    Attributes:
+        checkInterval (float): Minimum time between checks of the database in seconds.
+        nRuns (int): Number of the most recent runs to check for new output.
+        generations (dict): Generation of each subsystem as of the most recent check, keyed by
+            ``(runDir, subsystemName)``.
+        events (collections.deque): Most recent events, stored as ``(sequence, event)``.
+        sequence (int): Sequence number of the most recent event.
+        lastCheckTime (float): Time of the most recent check (as determined by ``timeit.default_timer()``).
+        connection (ZODB.Connection.Connection): Connection used to check the database.
+    """
+    def __init__(self, checkInterval, nRuns, maxEvents = 1000):
+        self.checkInterval = checkInterval
+        self.nRuns = nRuns
+        self.generations = {}
+        self.events = collections.deque(maxlen = maxEvents)
+        self.sequence = 0
+        self.lastCheckTime = None
+        self.connection = None
+        self.transactionManager = transaction.TransactionManager()
+        # Only one thread checks the database at a time.
+        self.checkLock = threading.Lock()
+        # Used to wake up the waiting event streams.
+        self.condition = threading.Condition()
+
+    def check(self, database):
+        """ Check the database for new output, and broadcast the corresponding events.
+
+        The check is skipped if the database was checked less than ``checkInterval`` ago, or if another
+        thread is already checking it.
+
+        Args:
+            database (ZODB.DB): Database to be checked.
+        Returns:
+            None.
+        """
+        if not self.checkLock.acquire(False):
+            return
+        try:
+            now = timeit.default_timer()
+            if self.lastCheckTime is not None and now - self.lastCheckTime < self.checkInterval:
+                return
+            self.lastCheckTime = now
+
+            if self.connection is None:
+                self.connection = database.open(self.transactionManager)
+            # Start a new transaction to see the changes committed since the last check.
+            self.transactionManager.abort()
+            newEvents = self.findNewOutput(self.connection.root())
+            # We never write with this connection.
+            self.transactionManager.abort()
+        finally:
+            self.checkLock.release()
+
+        if newEvents:
+            with self.condition:
+                for event in newEvents:
+                    self.sequence += 1
+                    self.events.append((self.sequence, event))
+                self.condition.notify_all()
+
+    def findNewOutput(self, dbRoot):
+        """ Find the subsystems of the most recent runs whose generation changed since the previous check.
+
+        Args:
+            dbRoot (PersistentMapping): Database root.
+        Returns:
+            list: Events (dict) describing the subsystems with new output.
+        """
+        newEvents = []
+        if "runSummaries" not in dbRoot or "runs" not in dbRoot:
+            return newEvents
+        runs = dbRoot["runs"]
+        (summaries, _, _) = dbRoot["runSummaries"].page(numberOfRuns = self.nRuns)
+        for summary in summaries:
+            if summary.runDir not in runs:
+                continue
+            run = runs[summary.runDir]
+            for subsystemName, subsystem in run.subsystems.items():
+                key = (run.runDir, subsystemName)
+                previousGeneration = self.generations.get(key)
+                self.generations[key] = subsystem.generation
+                # Subsystems seen for the first time only establish the baseline.
+                if previousGeneration is not None and previousGeneration != subsystem.generation:
+                    newEvents.append({"runDir": run.runDir,
+                                      "runNumber": run.runNumber,
+                                      "subsystem": subsystemName,
+                                      "generation": subsystem.generation})
+        return newEvents
+
+    def waitForEvents(self, lastSequence, timeout):
+        """ Wait for events after the given sequence number.
+
+        Args:
+            lastSequence (int): Sequence number of the last event received by the client.
+            timeout (float): Maximum time to wait in seconds.
+        Returns:
+            list: Events as ``(sequence, event)`` with a sequence number greater than ``lastSequence``.
+        """
+        with self.condition:
+            if self.sequence <= lastSequence:
+                self.condition.wait(timeout)
+            return [(sequence, event) for (sequence, event) in self.events if sequence > lastSequence]
+
+broadcaster = updateBroadcaster(checkInterval = serverParameters["updateEvents"]["checkInterval"],
+                                nRuns = serverParameters["updateEvents"]["nRuns"])
+
+def formatEvent(sequence, event):
+    """ Format an event according to the server-sent events protocol.
+
+    Args:
+        sequence (int): Sequence number of the event.
+        event (dict): Event information.
+    Returns:
+        str: Formatted event.
+    """
+    return "id: {sequence}\nevent: newOutput\ndata: {data}\n\n".format(sequence = sequence, data = json.dumps(event))
+
+@updatesPage.route("/updates", methods = ["GET"])
+@login_required
+def updates():
+    """ Stream notifications about new processing output as server-sent events.
+
+    Each event is a ``newOutput`` event, with ``json`` data containing the ``runDir``, ``runNumber``,
+    ``subsystem``, and ``generation`` of the subsystem with new output. The stream ends after
+    ``updateEvents.streamDuration`` seconds, after which the browser reconnects automatically. Since the
+    events are sequenced per web app process, a client which reconnects to a different process only
+    receives the events from that point onwards.
+
+    Args:
+        None.
+    Returns:
+        Response: Event stream.
+    """
+    # The database must be retrieved while the application context is available.
+    database = db.db
+    streamDuration = serverParameters["updateEvents"]["streamDuration"]
+    checkInterval = serverParameters["updateEvents"]["checkInterval"]
+    try:
+        lastSequence = int(request.headers.get("Last-Event-ID", -1))
+    except ValueError:
+        lastSequence = -1
+    if lastSequence < 0 or lastSequence > broadcaster.sequence:
+        # New client (or one which was connected to another process), so start from now.
+        lastSequence = broadcaster.sequence
+
+    def stream(lastSequence):
+        # Tell the browser how quickly to reconnect once the stream ends.
+        yield "retry: {retry}\n\n".format(retry = int(checkInterval * 1000))
+        deadline = timeit.default_timer() + streamDuration
+        while True:
+            remaining = deadline - timeit.default_timer()
+            if remaining <= 0:
+                break
+            broadcaster.check(database)
+            events = broadcaster.waitForEvents(lastSequence, timeout = min(checkInterval, remaining))
+            for (sequence, event) in events:
+                yield formatEvent(sequence, event)
+                lastSequence = sequence
+            if not events:
+                # Comment to keep the connection alive through proxies.
+                yield ": keepalive\n\n"
+
+    return Response(stream(lastSequence), mimetype = "text/event-stream",
+                    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
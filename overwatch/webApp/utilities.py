@@ -8,12 +8,21 @@ to other Overwatch packages.
 .. codeauthor:: Raymond Ehlers <raymond.ehlers@cern.ch>, Yale University
 """
 
+import collections
+import hashlib
 import os
 import subprocess
+import sys
+import tempfile
+import threading
+import timeit
+import zipfile
 import logging
 logger = logging.getLogger(__name__)
 # Webassets
 import webassets.filter
+# Status requests
+import requests
 
 # Configuration
 from ..base import config
@@ -99,3 +108,257 @@ class PolymerBundler(webassets.filter.ExternalTool):
 
 # Register filter so it can be run in the web app
 webassets.filter.register_filter(PolymerBundler)
+
+class fragmentCache(object):
+    """ Cache of rendered page fragments, invalidated via a generation counter.
+
+    Each entry stores the generation of the underlying object (for example, ``subsystemContainer.generation``)
+    at the time that it was rendered. An entry is only valid while the generation is unchanged, so the owner
+    of the object invalidates all of the related entries by incrementing its generation. The least recently used
+    entries are removed when the cache is full. The cache is shared between the threads of a process.
+
+    Args:
+        maxEntries (int): Maximum number of entries in the cache.
+
+    Attributes:
+        maxEntries (int): Maximum number of entries in the cache.
+        entries (collections.OrderedDict): Cached entries of the form ``(generation, value)``, ordered from the least
+            to the most recently used.
+        hits (int): Number of cache hits.
+        misses (int): Number of cache misses.
+    """
+    def __init__(self, maxEntries):
+        self.maxEntries = maxEntries
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, generation):
+        """ Retrieve a cached value.
+
+        Args:
+            key (tuple): Key of the value.
+            generation (int): Current generation of the underlying object.
+        Returns:
+            object: The cached value, or None if there is no valid cached value.
+        """
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None or entry[0] != generation:
+                self.misses += 1
+                return None
+            # Mark as most recently used.
+            self.entries[key] = entry
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, generation, value):
+        """ Store a value in the cache.
+
+        Args:
+            key (tuple): Key of the value.
+            generation (int): Generation of the underlying object used to create the value.
+            value (object): Value to be cached.
+        Returns:
+            None.
+        """
+        if self.maxEntries <= 0:
+            return
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (generation, value)
+            while len(self.entries) > self.maxEntries:
+                self.entries.popitem(last = False)
+
+# Content hashes of the served files, which are invalidated when the file is modified.
+_fileETags = fragmentCache(maxEntries = 20000)
+
+def fileContentETag(path):
+    """ Determine an ETag for a file based on its content.
+
+    The content hash is only calculated when the file has been modified (as determined by the modification
+    time, size, and inode), so repeated requests for an unchanged file only require a ``stat``. The inode
+    catches files which are replaced within the modification time resolution of the file system.
+
+    Args:
+        path (str): Path to the file.
+    Returns:
+        str: ETag of the file. None if the file doesn't exist.
+    """
+    try:
+        fileStat = os.stat(path)
+    except OSError:
+        return None
+    generation = (fileStat.st_mtime, fileStat.st_size, fileStat.st_ino)
+    etag = _fileETags.get(path, generation)
+    if etag is None:
+        hasher = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                hasher.update(chunk)
+        etag = hasher.hexdigest()
+        _fileETags.set(path, generation, etag)
+    return etag
+
+class siteStatusProber(object):
+    """ Determine the status of other Overwatch sites by querying their status pages.
+
+    All of the sites are queried concurrently (one thread per site), using a shared session so that the
+    connections to each site are pooled and reused between probes. The aggregated result is cached for
+    ``cacheTime`` seconds, and only one thread probes the sites at a time, so many simultaneous viewers of
+    the status page only lead to one set of requests.
+
+    Args:
+        timeout (float): Timeout of each status request in seconds.
+        cacheTime (float): Time that the aggregated result is cached in seconds.
+
+    Attributes:
+        timeout (float): Timeout of each status request in seconds.
+        cacheTime (float): Time that the aggregated result is cached in seconds.
+        session (requests.Session): Session used for all status requests.
+        cachedStatuses (collections.OrderedDict): Most recently determined statuses, keyed by site name.
+        cachedSites (dict): Sites which were probed to determine the cached statuses.
+        lastProbeTime (float): Time of the most recent probe (as determined by ``timeit.default_timer()``).
+    """
+    def __init__(self, timeout, cacheTime):
+        self.timeout = timeout
+        self.cacheTime = cacheTime
+        self.session = requests.Session()
+        self.cachedStatuses = None
+        self.cachedSites = None
+        self.lastProbeTime = None
+        self.lock = threading.Lock()
+
+    def probeSite(self, site, url):
+        """ Query the status page of a single site.
+
+        Args:
+            site (str): Name of the site.
+            url (str): Base URL of the site.
+        Returns:
+            tuple: (str or dict, float): Status of the site (or a dict containing the errors), and the
+                latency of the request in milliseconds.
+        """
+        exceptionErrorMessage = "Request to \"{site}\" at \"{url}\" {errorType} with error message {e}!"
+        serverError = {}
+        statusResult = ""
+        start = timeit.default_timer()
+        try:
+            serverRequest = self.session.get(url + "/status", timeout = self.timeout)
+            if serverRequest.status_code != 200:
+                serverError.setdefault("Request error", []).append("Request to \"{}\" at \"{}\" returned error response {}!".format(site, url, serverRequest.status_code))
+            else:
+                statusResult = "Site is up!"
+        except requests.exceptions.Timeout as e:
+            serverError.setdefault("Timeout error", []).append(exceptionErrorMessage.format(site = site, url = url, errorType = "timed out", e = e))
+        except requests.exceptions.ConnectionError as e:
+            serverError.setdefault("Connection error", []).append(exceptionErrorMessage.format(site = site, url = url, errorType = "had a connection error", e = e))
+        except requests.exceptions.RequestException as e:
+            serverError.setdefault("General Requests error", []).append(exceptionErrorMessage.format(site = site, url = url, errorType = "had a general requests error", e = e))
+        latency = (timeit.default_timer() - start) * 1000
+
+        # Store the error if one occurred
+        if serverError != {}:
+            statusResult = serverError
+        return (statusResult, latency)
+
+    def probeSites(self, sites):
+        """ Query the status pages of all of the given sites concurrently.
+
+        Args:
+            sites (dict): Base URLs of the sites, keyed by site name.
+        Returns:
+            collections.OrderedDict: (status, latency) of each site, keyed by site name. See ``probeSite(...)``.
+        """
+        results = {}
+
+        def probe(site, url):
+            results[site] = self.probeSite(site, url)
+
+        threads = [threading.Thread(target = probe, args = (site, url), name = "statusProbe") for site, url in sites.items()]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return collections.OrderedDict((site, results[site]) for site in sites)
+
+    def statuses(self, sites):
+        """ Retrieve the statuses of the given sites, probing them if the cached result is outdated.
+
+        Args:
+            sites (dict): Base URLs of the sites, keyed by site name.
+        Returns:
+            collections.OrderedDict: (status, latency) of each site, keyed by site name. See ``probeSite(...)``.
+        """
+        # Threads which arrive during a probe wait for it, and then use its result.
+        with self.lock:
+            now = timeit.default_timer()
+            if self.cachedStatuses is None or self.cachedSites != sites or now - self.lastProbeTime >= self.cacheTime:
+                self.cachedStatuses = self.probeSites(sites)
+                self.cachedSites = dict(sites)
+                self.lastProbeTime = timeit.default_timer()
+            return self.cachedStatuses
+
+class _zipStreamBuffer(object):
+    """ Write only file-like object which collects the output of a ``zipfile.ZipFile`` for streaming.
+
+    Since it doesn't support ``tell()`` or ``seek()``, the zip file is written sequentially (using data descriptors).
+    """
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """ Retrieve and clear the collected output. """
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def streamZipArchive(files, chunkSize = 1 << 16):
+    """ Stream a zip archive of the given files as it is created.
+
+    The files are read and written to the archive in chunks, so the memory usage is bounded by the chunk
+    size, and the archive is never stored on disk. The files are stored without compression, since ROOT
+    files are already compressed.
+
+    Note:
+        Writing to a stream requires python 3.6 or later. For earlier versions, the archive is created in an
+        anonymous temporary file, which is then streamed.
+
+    Args:
+        files (list): (path, name in the archive) of each file to be included.
+        chunkSize (int): Size of the chunks which are read and yielded in bytes. Default: 64 KB.
+    Returns:
+        generator: Yields the archive in chunks (bytes).
+    """
+    if sys.version_info < (3, 6):
+        with tempfile.TemporaryFile() as f:
+            with zipfile.ZipFile(f, "w") as zipFile:
+                for path, arcname in files:
+                    zipFile.write(path, arcname)
+            f.seek(0)
+            for chunk in iter(lambda: f.read(chunkSize), b""):
+                yield chunk
+        return
+
+    output = _zipStreamBuffer()
+    with zipfile.ZipFile(output, "w") as zipFile:
+        for path, arcname in files:
+            # The file size is stored in the info, which allows zipfile to determine whether zip64 is required.
+            zipInfo = zipfile.ZipInfo.from_file(path, arcname)
+            with open(path, "rb") as fIn, zipFile.open(zipInfo, "w") as fOut:
+                for chunk in iter(lambda: fIn.read(chunkSize), b""):
+                    fOut.write(chunk)
+                    yield output.drain()
+            yield output.drain()
+    # The central directory is written when the zip file is closed.
+    yield output.drain()
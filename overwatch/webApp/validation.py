@@ -285,6 +285,184 @@ def validateTrending(request):
     else:
         return (error, None, None, None, None)
 
+def validateTrendingData(request):
+    """ Validate requests for trended values.
+
+    The return tuple contains the validated values. The error value should always be checked first
+    before using the other return values (they will be safe, but may not be meaningful).
+
+    Note:
+        For the error format in ``error``, see the :doc:`web app README </webAppReadme>`.
+
+    Note:
+        Function args are provided through the flask ``request.args`` dictionary.
+
+    Args:
+        request (Flask.request): The request object from Flask.
+        subsystemName (str): Name of the subsystem which contains the trending object.
+        trendingName (str): Name of the trending object.
+        startTime (int): Unix time of the start of the requested range. 0 corresponds to no limit.
+        endTime (int): Unix time of the end of the requested range. 0 corresponds to no limit.
+        startRun (int): First run of the requested range. 0 corresponds to no limit.
+        endRun (int): Last run of the requested range. 0 corresponds to no limit.
+        resolution (int): Maximum number of returned values. 0 corresponds to all values.
+        format (str): Format of the response. Either "json" (default) or "binary".
+    Returns:
+        tuple: (error, subsystemName, trendingName, timeRange, runRange, resolution, responseFormat), where
+            error (dict) contains any possible errors, subsystemName (str) is the requested subsystem,
+            trendingName (str) is the name of the trending object, timeRange (tuple) and runRange (tuple)
+            are (start, end) of the requested range (0 corresponds to no limit), resolution (int) is the
+            maximum number of values (0 for all values), and responseFormat (str) is the requested format.
+    """
+    error = {}
+    try:
+        subsystemName = convertRequestToStringWhichMayBeEmpty("subsystemName", request.args)
+        trendingName = convertRequestToStringWhichMayBeEmpty("trendingName", request.args)
+        timeRange = (convertRequestToPositiveInteger("startTime", request.args),
+                     convertRequestToPositiveInteger("endTime", request.args))
+        runRange = (convertRequestToPositiveInteger("startRun", request.args),
+                    convertRequestToPositiveInteger("endRun", request.args))
+        resolution = convertRequestToPositiveInteger("resolution", request.args)
+        responseFormat = request.args.get("format", "json", type=str)
+
+        if subsystemName not in serverParameters["subsystemList"] + ["TDG"]:
+            error.setdefault("Subsystem", []).append("{} is not a valid subsystem!".format(subsystemName))
+        if not trendingName:
+            error.setdefault("Trending object", []).append("Must request a trending object!")
+        if timeRange[1] and timeRange[0] > timeRange[1]:
+            error.setdefault("Time range", []).append("Start time {} is after end time {}!".format(*timeRange))
+        if runRange[1] and runRange[0] > runRange[1]:
+            error.setdefault("Run range", []).append("Start run {} is after end run {}!".format(*runRange))
+        if responseFormat not in ["json", "binary"]:
+            error.setdefault("Format", []).append("{} is not a valid format!".format(responseFormat))
+    except KeyError as e:
+        error.setdefault("keyError", []).append("Key error in " + e.args[0])
+    except Exception as e:
+        error.setdefault("generalError", []).append("Unknown exception! " + str(e))
+
+    if error == {}:
+        return (error, subsystemName, trendingName, timeRange, runRange, resolution, responseFormat)
+    else:
+        return (error, None, None, None, None, None, None)
+
+def validateHistogramData(runDir, subsystemName, runs):
+    """ Validate requests for the histogram data (bin contents, errors, and edges).
+
+    The return tuple contains the validated values. The error value should always be checked first
+    before using the other return values (they will be safe, but may not be meaningful).
+
+    Note:
+        For the error format in ``error``, see the :doc:`web app README </webAppReadme>`.
+
+    Note:
+        The listed args (after the first three) are provided through the flask ``request.args`` dictionary.
+
+    Args:
+        runDir (str): String containing the run number. For an example run 123456, it should be
+            formatted as ``Run123456``
+        subsystemName (str): The current subsystem in the form of a three letter, all capital name (ex. ``EMC``).
+        runs (BTree): Dict-like object which stores all run, subsystem, and hist information. This should
+            be retrieved from the database.
+        histName (str): Name of a requested histogram. May be repeated to request multiple histograms.
+            Default: all of the histograms of the subsystem.
+        timeSliceKey (str): Key of the requested time slice. Default: the full processing.
+    Returns:
+        tuple: (error, subsystem, histNames, timeSlice), where error (dict) contains any possible errors,
+            subsystem (subsystemContainer) corresponds to the requested subsystem, histNames (list) are
+            the names of the requested histograms, and timeSlice (timeSliceContainer) is the requested
+            time slice (None for the full processing).
+    """
+    error = {}
+    try:
+        if runDir not in runs.keys():
+            error.setdefault("Run Dir", []).append("{runDir} is not a valid run dir! Please select a different run!".format(runDir = runDir))
+            return (error, None, None, None)
+        run = runs[runDir]
+        if subsystemName not in run.subsystems.keys():
+            error.setdefault("Subsystem", []).append("{subsystemName} is not a valid subsystem in {prettyName}!".format(subsystemName = subsystemName, prettyName = run.prettyName))
+            return (error, None, None, None)
+        subsystem = run.subsystems[subsystemName]
+
+        histNames = [histName for histName in request.args.getlist("histName") if histName]
+        if not histNames:
+            histNames = list(subsystem.hists.keys())
+        for histName in histNames:
+            if histName not in subsystem.hists:
+                error.setdefault("Histogram", []).append("{histName} is not a valid histogram in {subsystemName}!".format(histName = histName, subsystemName = subsystemName))
+
+        (timeSliceKey, timeSlice) = retrieveAndValidateTimeSlice(subsystem, error)
+        # Time slices only process the histograms which have been requested for display.
+        if timeSlice and not error:
+            unprocessedHists = timeSlice.unprocessedHists(histNames)
+            if unprocessedHists:
+                error.setdefault("timeSliceKey", []).append("Histograms {histNames} have not been processed for time slice {timeSliceKey}. Please display them first!".format(histNames = ", ".join(unprocessedHists), timeSliceKey = timeSliceKey))
+    except KeyError as e:
+        error.setdefault("keyError", []).append("Key error in " + e.args[0])
+    except Exception as e:
+        error.setdefault("generalError", []).append("Unknown exception! " + str(e))
+
+    if error == {}:
+        return (error, subsystem, histNames, timeSlice)
+    else:
+        return (error, None, None, None)
+
+def validateTestingDataArchive(request):
+    """ Validate requests for the testing data archive.
+
+    The return tuple contains the validated values. The error value should always be checked first
+    before using the other return values (they will be safe, but may not be meaningful).
+
+    Note:
+        For the error format in ``error``, see the :doc:`web app README </webAppReadme>`.
+
+    Note:
+        Function args are provided through the flask ``request.args`` dictionary.
+
+    Args:
+        request (Flask.request): The request object from Flask.
+        runs (str): Comma separated run numbers to include. Default: "", which corresponds to the most recent runs.
+        subsystems (str): Comma separated subsystems to include. Default: "", which corresponds to all subsystems.
+        nRuns (int): Number of the most recent runs to include if the runs are not specified. Default: 5.
+        nFiles (int): Number of the most recent files of each subsystem to include. Default: 1.
+    Returns:
+        tuple: (error, runNumbers, subsystems, nRuns, nFiles), where error (dict) contains any possible errors,
+            runNumbers (list) are the requested run numbers (empty for the most recent runs), subsystems (list)
+            are the requested subsystems, nRuns (int) is the number of the most recent runs, and nFiles (int)
+            is the number of the most recent files of each subsystem.
+    """
+    error = {}
+    try:
+        runNumbers = []
+        for runNumber in request.args.get("runs", "", type=str).split(","):
+            if not runNumber.strip():
+                continue
+            try:
+                runNumbers.append(int(runNumber))
+            except ValueError:
+                error.setdefault("Runs", []).append("{} is not a valid run number!".format(runNumber))
+
+        subsystems = [subsystem.strip() for subsystem in request.args.get("subsystems", "", type=str).split(",") if subsystem.strip()]
+        if not subsystems:
+            subsystems = list(serverParameters["subsystemList"])
+        for subsystem in subsystems:
+            if subsystem not in serverParameters["subsystemList"]:
+                error.setdefault("Subsystem", []).append("{} is not a valid subsystem!".format(subsystem))
+
+        maxRuns = serverParameters["testingDataArchiveMaxRuns"]
+        nRuns = convertRequestToPositiveInteger("nRuns", request.args) or 5
+        if nRuns > maxRuns or len(runNumbers) > maxRuns:
+            error.setdefault("Runs", []).append("At most {} runs can be requested!".format(maxRuns))
+        nFiles = convertRequestToPositiveInteger("nFiles", request.args) or 1
+    except KeyError as e:
+        error.setdefault("keyError", []).append("Key error in " + e.args[0])
+    except Exception as e:
+        error.setdefault("generalError", []).append("Unknown exception! " + str(e))
+
+    if error == {}:
+        return (error, runNumbers, subsystems, nRuns, nFiles)
+    else:
+        return (error, None, None, None, None)
+
 ## Validate individual values
 
 def convertRequestToPythonBool(paramName, source):
@@ -16,26 +16,42 @@ from future.utils import iteritems
 
 # General includes
 import os
-import zipfile
+import io
+import hashlib
 import subprocess
 import signal
 import jinja2
 import json
 import collections
+import mimetypes
 import pendulum
 import pkg_resources
+import numpy as np
 # For server status
-import requests
+import threading
 import logging
 logger = logging.getLogger(__name__)
 
 # Flask
-from flask import Flask, url_for, request, render_template, redirect, flash, send_from_directory, jsonify, session
+from flask import Flask, url_for, request, render_template, redirect, flash, send_from_directory, jsonify, session, Response, abort
+# Moved from ``werkzeug.security`` to ``werkzeug.utils`` in newer versions.
+try:
+    from werkzeug.utils import safe_join
+except ImportError:
+    from werkzeug.security import safe_join
+# For the internal redirects to the front-end server.
+try:
+    from urllib.parse import quote
+except ImportError:
+    from urllib import quote
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_bcrypt import Bcrypt
 from flask_zodb import ZODB
 from flask_assets import Environment
 from flask_wtf.csrf import CSRFProtect, CSRFError
+# For writing from a read-only web app
+import ZODB as ZODBDatabase
+import zodburi
 
 import sentry_sdk
 from sentry_sdk.integrations.logging import LoggingIntegration
@@ -54,17 +70,90 @@ from . import validation
 from . import utilities  # NOQA
 
 # Processing module includes
-from ..processing import processRuns
+from ..processing import timeSliceJobs
 
 # Flask setup
 app = Flask(__name__, static_url_path=serverParameters["staticURLPath"], static_folder=serverParameters["staticFolder"], template_folder=serverParameters["templateFolder"])
 
+# Name of the web app component. The separate instance which serves the update event streams runs this same module,
+# so it is identified via the environment (see ``webAppUpdates`` in ``overwatch.base.deploy``).
+webAppComponent = os.getenv("OVERWATCH_WEBAPP_COMPONENT", "webApp")
+
 # Setup database
-app.config["ZODB_STORAGE"] = serverParameters["databaseLocation"]
+# If the database is provided by a ZEO server, the web app may connect read-only. In that case, the
+# (rare) writes, such as time slices, are performed via a separate writable connection.
+databaseReadOnly = serverParameters["databaseLocation"].startswith("zeo://") and serverParameters["zeoClient"]["readOnlyWebClients"]
+app.config["ZODB_STORAGE"] = baseUtilities.retrieveDatabaseLocation(serverParameters, baseUtilities.uniqueClientName(webAppComponent), readOnly = databaseReadOnly)
 db = ZODB(app)
+writableDatabase = None
+writableDatabaseLock = threading.Lock()
 
 from .trending import trendingPage
 app.register_blueprint(trendingPage)
+from .updates import updatesPage
+app.register_blueprint(updatesPage)
+
+def retrieveWritableDatabase():
+    """ Retrieve a writable database for the writes performed by a read-only web app.
+
+    The database is opened lazily, since most web app processes never need to write. It doesn't use a
+    persistent client cache, so it doesn't conflict with the cache of the read-only connection.
+
+    Args:
+        None.
+    Returns:
+        ZODB.DB: Writable database.
+    """
+    global writableDatabase
+    with writableDatabaseLock:
+        if writableDatabase is None:
+            (storageFactory, dbArgs) = zodburi.resolve_uri(serverParameters["databaseLocation"])
+            writableDatabase = ZODBDatabase.DB(storageFactory(), **dbArgs)
+    return writableDatabase
+
+# Cache of the rendered run page fragments.
+runPageCache = utilities.fragmentCache(maxEntries = serverParameters["runPageCacheSize"])
+# Prober for the status of the other Overwatch sites, which is shared by the threads of the process.
+siteStatusProber = utilities.siteStatusProber(timeout = serverParameters["statusRequestTimeout"],
+                                              cacheTime = serverParameters["statusRequestCacheTime"])
+
+# Statistics to tune the database cache size.
+databaseCacheStatistics = baseUtilities.databaseCacheStatistics(logInterval = serverParameters["databaseCache"]["statisticsInterval"])
+
+def warmDatabaseCache():
+    """ Load the most recent runs and the trending into the cache of each pooled connection.
+
+    This way, the first page loads are fast. It must be called in each serving process (ie. after the
+    fork when running under ``uwsgi``). See ``overwatch.webApp.run``.
+
+    Note:
+        The pool only keeps up to its pool size of connections, so at most that many connections are warmed.
+        The update events instance of the web app doesn't serve any pages, so it is never warmed.
+
+    Args:
+        None.
+    Returns:
+        None.
+    """
+    if webAppComponent != "webApp":
+        logger.info("Not warming the database cache for the {component} instance.".format(component = webAppComponent))
+        return
+    with app.app_context():
+        database = db.db
+        baseUtilities.warmDatabaseConnections(database,
+                                              nConnections = min(baseUtilities.processThreads(), database.getPoolSize()),
+                                              nRuns = serverParameters["databaseCache"]["warmRuns"])
+
+@app.after_request
+def recordDatabaseCacheStatistics(response):
+    """ Record the database cache statistics for the request.
+
+    Only requests which already used the database are recorded, so we never open a connection just for the
+    statistics. Static and protected files don't access the objects, so they would only skew the hit rate.
+    """
+    if db.is_connected and request.endpoint not in ["static", "protected"]:
+        databaseCacheStatistics.record(db.connection)
+    return response
 
 # Set secret key for flask
 if serverParameters["debug"]:
@@ -351,23 +440,33 @@ def index():
     Note:
         Function args are provided through the flask request object.
 
+    Note:
+        The run list is created from the run summary catalog (which is maintained by the processing),
+        so the run containers don't need to be loaded to display it.
+
     Args:
         ajaxRequest (bool): True if the response should be via AJAX.
-        runOffset (int): Number of runs to offset into the run list. Default: 0.
+        startRun (int): Run number of the first (most recent) run on the page. Default: 0, which
+            corresponds to the most recent run.
     Returns:
         Response: The main index page populated via template.
     """
     logger.debug("request.args: {args}".format(args = request.args))
     ajaxRequest = validation.convertRequestToPythonBool("ajaxRequest", request.args)
     # We only use this once and there isn't much complicated, so we just perform the validation here.
-    runOffset = validation.convertRequestToPositiveInteger(paramName = "runOffset", source = request.args)
+    startRun = validation.convertRequestToPositiveInteger(paramName = "startRun", source = request.args)
 
-    runs = db["runs"]
+    if "runSummaries" not in db:
+        error = {"Run list": ["The run list is not yet available. Please wait for the processing to update it."]}
+        if ajaxRequest:
+            return jsonify(drawerContent = "", mainContent = render_template("errorMainContent.html", errors = error))
+        return render_template("error.html", errors = error)
+    runSummaries = db["runSummaries"]
 
     # Determine if a run is ongoing
     # To do so, we need the most recent run (regardless of which runs we selected to display)
-    mostRecentRun = runs[runs.keys()[-1]]
-    runOngoing = mostRecentRun.isRunOngoing()
+    mostRecentRun = runSummaries.mostRecentRun()
+    runOngoing = mostRecentRun.isRunOngoing() if mostRecentRun else False
     if runOngoing:
         runOngoingNumber = mostRecentRun.runNumber
     else:
@@ -377,13 +476,12 @@ def index():
     # We select a default of 50 runs per page. Too many might be unreasonable.
     numberOfRunsToDisplay = 50
     # Restrict the runs that we are going to display to those that are included in our requested range.
-    # It is reversed because we process the earliest runs first. However, the reversed object isn't scriptable,
-    # so it must be converted to a list to slice it.
-    # +1 on the upper limit so that the 50 is inclusive
-    runsToUse = list(reversed(runs.values()))[runOffset:runOffset + numberOfRunsToDisplay + 1]
-    logger.debug("runOffset: {}, numberOfRunsToDisplay: {}".format(runOffset, numberOfRunsToDisplay))
+    # The catalog is ordered from the most recent run, so we only need to retrieve the runs on the page.
+    (runsToUse, nextRunNumber, previousRunNumber) = runSummaries.page(startRunNumber = startRun,
+                                                                      numberOfRuns = numberOfRunsToDisplay)
+    logger.debug("startRun: {}, numberOfRunsToDisplay: {}".format(startRun, numberOfRunsToDisplay))
     # Total number of runs, which should be displayed at the bottom.
-    numberOfRuns = len(runs.keys())
+    numberOfRuns = len(runSummaries)
 
     # We want 10 anchors
     # NOTE: We need to convert it to an int to ensure that the mod call in the template works.
@@ -396,7 +494,7 @@ def index():
                                runOngoingNumber = runOngoingNumber,
                                subsystemsWithRootFilesToShow = serverParameters["subsystemsWithRootFilesToShow"],
                                anchorFrequency = anchorFrequency,
-                               runOffset = runOffset, numberOfRunsToDisplay = numberOfRunsToDisplay,
+                               nextRunNumber = nextRunNumber, previousRunNumber = previousRunNumber,
                                totalNumberOfRuns = numberOfRuns)
     else:
         drawerContent = render_template("runListDrawer.html", runs = runsToUse, runOngoing = runOngoing,
@@ -405,7 +503,7 @@ def index():
                                       runOngoingNumber = runOngoingNumber,
                                       subsystemsWithRootFilesToShow = serverParameters["subsystemsWithRootFilesToShow"],
                                       anchorFrequency = anchorFrequency,
-                                      runOffset = runOffset, numberOfRunsToDisplay = numberOfRunsToDisplay,
+                                      nextRunNumber = nextRunNumber, previousRunNumber = previousRunNumber,
                                       totalNumberOfRuns = numberOfRuns)
 
         return jsonify(drawerContent = drawerContent, mainContent = mainContent)
@@ -448,9 +546,38 @@ def runPage(runNumber, subsystemName, requestedFileType):
     runDir = "Run{runNumber}".format(runNumber = runNumber)
     runs = db["runs"]
 
+    # Page fragments (ie. AJAX responses) are served from the cache if the subsystem output hasn't changed
+    # since they were rendered. Full pages aren't cached since they contain user specific information.
+    cacheKey = None
+    if request.args.get("ajaxRequest", "") == "true" and runDir in runs and subsystemName in runs[runDir].subsystems:
+        generation = runs[runDir].subsystems[subsystemName].generation
+        cacheKey = (runDir, subsystemName, requestedFileType) + tuple(request.args.get(name, "") for name in ["jsRoot", "histGroup", "histName", "timeSliceKey"])
+        cachedResponse = runPageCache.get(cacheKey, generation)
+        if cachedResponse is not None:
+            return jsonify(**cachedResponse)
+
     # Validation for all passed values
     (error, run, subsystem, requestedFileType, jsRoot, ajaxRequest, requestedHistGroup, requestedHist, timeSliceKey, timeSlice) = validation.validateRunPage(runDir, subsystemName, requestedFileType, runs)
 
+    # Time slices only process the requested histograms. If other histograms of an existing time slice are
+    # requested, we submit a job to process them, and the client displays them once the job is done.
+    if error == {} and ajaxRequest is True and requestedFileType == "runPage" and timeSlice:
+        if timeSlice.unprocessedHists(subsystem.selectedHistNames(histGroup = requestedHistGroup, histName = requestedHist)):
+            database = retrieveWritableDatabase() if databaseReadOnly else db.db
+            (jobId, newlySubmitted) = timeSliceJobs.submit(database, runDir, subsystemName,
+                                                           minTime = (timeSlice.minUnixTimeRequested - timeSlice.startOfRun) / 60.0,
+                                                           maxTime = (timeSlice.maxUnixTimeRequested - timeSlice.startOfRun) / 60.0,
+                                                           processingOptions = dict(timeSlice.processingOptions),
+                                                           leaseTimeout = serverParameters["timeSliceJobs"]["leaseTimeout"],
+                                                           histGroup = requestedHistGroup, histName = requestedHist)
+            return jsonify(jobId = jobId,
+                           coalesced = not newlySubmitted,
+                           statusUrl = url_for("timeSliceJob",
+                                               jobId = jobId,
+                                               jsRoot = json.dumps(jsRoot),
+                                               histGroup = requestedHistGroup,
+                                               histName = requestedHist))
+
     # This will only work if all of the values are properly defined.
     # Otherwise, we just skip to the end to return the error to the user.
     if error == {}:
@@ -552,11 +679,15 @@ def runPage(runNumber, subsystemName, requestedFileType):
             mainContent = render_template("errorMainContent.html", errors = error)
 
         # Includes hist group and hist name for time slices since it is easier to pass it here than parse the GET requests. Otherwise, they are ignored.
-        return jsonify(drawerContent = drawerContent,
-                       mainContent = mainContent,
-                       timeSliceKey = json.dumps(timeSliceKey),
-                       histName = requestedHist,
-                       histGroup = requestedHistGroup)
+        response = dict(drawerContent = drawerContent,
+                        mainContent = mainContent,
+                        timeSliceKey = json.dumps(timeSliceKey),
+                        histName = requestedHist,
+                        histGroup = requestedHistGroup)
+        # Errors aren't cached so that they are reported again.
+        if error == {} and cacheKey is not None:
+            runPageCache.set(cacheKey, generation, response)
+        return jsonify(**response)
 
 @app.route("/monitoring/protected/<path:filename>")
 @login_required
@@ -568,6 +699,15 @@ def protected(filename):
     to provide access via this function. To provide this function, we utilized the approach
     `described here <https://stackoverflow.com/a/27611882>`_.
 
+    Histogram ``json`` and image files are served with an ``ETag`` based on their content, so clients which
+    poll for updates receive a ``304 Not Modified`` (without content) if the file hasn't changed. For ``json``
+    files, the precompressed variants written by the processing are served to clients which accept them.
+
+    If ``accelRedirect`` is enabled, this function only authorizes the request, and then returns an internal
+    redirect (``X-Accel-Redirect``) to the front-end server (``nginx``), which serves the file via ``sendfile``.
+    In that case, the front-end server is responsible for the ``ETag`` and the precompressed variants (via
+    ``gzip_static``). The internal location is configured when deploying ``nginx`` with a ``protectedFolder``.
+
     Note:
         This function ignores GET parameters. This is done intentionally to allow for avoiding problematic
         caching by a browser. To avoid this caching, simply pass an additional get parameter after the
@@ -583,19 +723,128 @@ def protected(filename):
     # Ignore the time GET parameter that is sometimes passed- just to avoid the cache when required
     #if request.args.get("time"):
     #    print "timeParameter:", request.args.get("time")
-    return send_from_directory(os.path.realpath(serverParameters["protectedFolder"]), filename)
+    protectedFolder = os.path.realpath(serverParameters["protectedFolder"])
+    (_, extension) = os.path.splitext(filename)
+    path = safe_join(protectedFolder, filename)
+
+    if serverParameters["accelRedirect"]["enabled"]:
+        if not path:
+            abort(404)
+        # The front-end server only passes on a few headers (including the content type and the cache control)
+        # from the internal redirect response, so we just need to set those.
+        response = app.response_class(mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream")
+        response.headers["X-Accel-Redirect"] = serverParameters["accelRedirect"]["location"] + quote(filename)
+        # The files require authentication, and should always be revalidated since they may change during a run.
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+    etag = None
+    if path and extension in [".json", "." + serverParameters["fileExtension"]]:
+        etag = utilities.fileContentETag(path)
+    if etag is None:
+        # Other files (such as ROOT files) are served directly.
+        return send_from_directory(protectedFolder, filename)
+
+    # Select the precompressed variant (if available).
+    encoding = None
+    servedFilename = filename
+    if extension == ".json":
+        for (availableEncoding, encodingExtension) in [("br", ".br"), ("gzip", ".gz")]:
+            if availableEncoding in request.accept_encodings and os.path.isfile(path + encodingExtension):
+                encoding = availableEncoding
+                servedFilename = filename + encodingExtension
+                break
+    # Each encoding is a different representation, so it needs a different ETag.
+    representationETag = etag if encoding is None else "{etag}-{encoding}".format(etag = etag, encoding = encoding)
+
+    if request.if_none_match.contains(representationETag):
+        response = app.response_class(status = 304)
+    else:
+        response = send_from_directory(protectedFolder, servedFilename, mimetype = mimetypes.guess_type(filename)[0])
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(representationETag)
+    response.vary.add("Accept-Encoding")
+    # The files require authentication, and should always be revalidated since they may change during a run.
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+@app.route("/histogramData/Run<int:runNumber>/<string:subsystemName>", methods=["GET"])
+@login_required
+def histogramData(runNumber, subsystemName):
+    """ Provides the bin contents, errors, and edges of histograms to programmatic clients.
+
+    The data is written alongside the histogram ``json`` when processing (see ``writeHistogramData`` in the
+    processing configuration), so requests only need to combine the already available arrays. The response
+    is a numpy ``npz`` archive, with arrays stored under ``{histName}/contents``, ``{histName}/errors``,
+    and ``{histName}/xEdges`` (as well as ``yEdges`` and ``zEdges`` for multi-dimensional histograms). The
+    contents and errors include the underflow and overflow bins. The response includes an ``ETag`` which
+    changes only when the subsystem is processed again, so clients can cheaply revalidate their copy (a
+    ``304 Not Modified`` is returned without loading any of the data).
+
+    Note:
+        Some function args (after the first 2) are provided through the flask request object.
+
+    Args:
+        runNumber (int): Run number of interest.
+        subsystemName (str): Name of the subsystem of interest.
+        histName (str): Name of a requested histogram. May be repeated to request multiple histograms.
+            Default: all of the histograms of the subsystem.
+        timeSliceKey (str): Key of the requested time slice. Default: the full processing.
+    Returns:
+        Response: Histogram data as a numpy ``npz`` archive, or the errors (as json) if the request is invalid.
+    """
+    runDir = "Run{runNumber}".format(runNumber = runNumber)
+    (error, subsystem, histNames, timeSlice) = validation.validateHistogramData(runDir, subsystemName, db["runs"])
+    if error:
+        return jsonify(errors = error), 400
+
+    # The generation is updated whenever the subsystem is processed again, so the ETag (and therefore whether
+    # the client's copy is still valid) can be determined before loading any of the data.
+    etag = hashlib.sha1("{runDir}/{subsystem}/{generation}".format(runDir = runDir, subsystem = subsystemName,
+                                                                   generation = subsystem.generation).encode() + request.query_string).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status = 304)
+    else:
+        # Retrieve the data written during processing.
+        prefix = timeSlice.filenamePrefix + "." if timeSlice else ""
+        data = {}
+        for histName in histNames:
+            filename = os.path.join(serverParameters["protectedFolder"], subsystem.jsonDir,
+                                    "{prefix}{name}.npz".format(prefix = prefix, name = histName.replace("/", "_")))
+            if not os.path.isfile(filename):
+                error.setdefault("Histogram", []).append("Data for {histName} is not available.".format(histName = histName))
+                continue
+            with np.load(filename) as histData:
+                for name in histData.files:
+                    data["{histName}/{name}".format(histName = histName, name = name)] = histData[name]
+        if error:
+            return jsonify(errors = error), 404
+
+        # The arrays are already compressed on disk, and compressing them again for each request is expensive.
+        output = io.BytesIO()
+        np.savez(output, **data)
+        response = app.response_class(output.getvalue(), mimetype = "application/octet-stream")
+
+    response.set_etag(etag)
+    # The data requires authentication, and should always be revalidated since it may change during a run.
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
 
 @app.route("/timeSlice", methods=["GET", "POST"])
 @login_required
 def timeSlice():
     """ Handles time slice and user reprocessing requests.
 
-    This is the main function for serving user requests. This function calls out directly to the processing module
-    to perform the actual time slice or reprocessing request. It provides access to this functionality through
-    the interface built into the header of the run page. In the case of a POST request, it handles, validates,
-    and processes the timing request, rendering the result template and returning the user to the same spot as
-    in the previous page. A GET request is invalid and will return an error (but the route itself is allowed
-    to check that it is handled correctly).
+    This is the main function for serving user requests. It provides access to the time slice and reprocessing
+    functionality through the interface built into the header of the run page. In the case of a POST request, it
+    handles and validates the timing request, and then submits it as a job to be processed asynchronously by the
+    time slice job worker (see ``processing.timeSliceJobs``). An equivalent request which is already queued or
+    running is coalesced into the existing job. The response contains the job id and the URL where the progress
+    of the job can be retrieved (see ``timeSliceJob()``). A GET request is invalid and will return an error (but
+    the route itself is allowed to check that it is handled correctly).
 
     This request should always be submitted via AJAX.
 
@@ -614,8 +863,8 @@ def timeSlice():
         histGroup (str): Name of the requested hist group. It is fine for it to be an empty string.
         histName (str): Name of the requested histogram. It is fine for it to be an empty string.
     Returns:
-        Response: A run page template populated with information from a newly processed time slice (via a redirect
-            to ``runPage()``). In case of error(s), returns the error message(s).
+        Response: The id and status URL of the job which processes the request, as well as whether the request
+            was coalesced into an existing job. In case of error(s), returns the error message(s).
     """
     logger.debug("request.form: {}".format(request.form))
     # We don't get ``ajaxRequest`` because this request should always be made via AJAX.
@@ -637,31 +886,23 @@ def timeSlice():
             logger.debug("histGroup: {histGroup}".format(histGroup = histGroup))
             logger.debug("histName: {histName}".format(histName = histName))
 
-            # Process the time slice
-            returnValue = processRuns.processTimeSlices(runs, runDir, minTime, maxTime, subsystem, inputProcessingOptions)
-            logger.info("returnValue: {}".format(returnValue))
-            logger.debug("runs[runDir].subsystems[subsystem].timeSlices: {}".format(runs[runDir].subsystems[subsystem].timeSlices))
-
-            # A normal return value should be a time slice key as a string. We can continue as expected.
-            # However, if we received an error, we expect some sort of dictionary (mapping). We handle that below.
-            if not isinstance(returnValue, collections.Mapping):
-                timeSliceKey = returnValue
-
-                # Passed off the result to render via the run page since we a time slice just modifies
-                # the content which is displayed there.
-                # We always want to use AJAX here
-                return redirect(url_for("runPage",
-                                        runNumber = runs[runDir].runNumber,
-                                        subsystemName = subsystem,
-                                        requestedFileType = "runPage",
-                                        ajaxRequest = json.dumps(True),
-                                        jsRoot = json.dumps(jsRoot),
-                                        histGroup = histGroup,
-                                        histName = histName,
-                                        timeSliceKey = json.dumps(timeSliceKey)))
-            else:
-                # Fall through to return an error
-                error = returnValue
+            # Submit the time slice to be processed.
+            # The job is written via a separate connection so that it is committed immediately. In the read-only
+            # mode, this is also required because the request connection is read-only.
+            database = retrieveWritableDatabase() if databaseReadOnly else db.db
+            # The job is processed by the time slice job worker executable.
+            (jobId, newlySubmitted) = timeSliceJobs.submit(database, runDir, subsystem, minTime, maxTime, inputProcessingOptions,
+                                                           leaseTimeout = serverParameters["timeSliceJobs"]["leaseTimeout"],
+                                                           histGroup = histGroup, histName = histName)
+
+            # We always want to use AJAX here
+            return jsonify(jobId = jobId,
+                           coalesced = not newlySubmitted,
+                           statusUrl = url_for("timeSliceJob",
+                                               jobId = jobId,
+                                               jsRoot = json.dumps(jsRoot),
+                                               histGroup = histGroup,
+                                               histName = histName))
 
         logger.info("Time slices error: {error}".format(error = error))
         drawerContent = ""
@@ -672,74 +913,161 @@ def timeSlice():
     else:
         return render_template("error.html", errors={"error": ["Need to access through a run page!"]})
 
+@app.route("/timeSlice/job/<string:jobId>", methods=["GET"])
+@login_required
+def timeSliceJob(jobId):
+    """ Provides the progress of a time slice job, and the result once it has finished.
+
+    While the job is queued or running, the response contains the ``state`` of the job, as well as the number of
+    ``histogramsProcessed`` out of ``histogramsTotal`` (which is 0 until the histograms are being processed). Once
+    the job is done, the result is rendered via the run page (through a redirect to ``runPage()``), since a time
+    slice just modifies the content which is displayed there. If the job failed, the error message(s) are returned.
+
+    This request should always be submitted via AJAX.
+
+    Note:
+        Function args are provided through the flask request object.
+
+    Args:
+        jobId (str): Id of the time slice job.
+        jsRoot (bool): True if the response should use jsRoot instead of images.
+        histGroup (str): Name of the requested hist group. It is fine for it to be an empty string.
+        histName (str): Name of the requested histogram. It is fine for it to be an empty string.
+    Returns:
+        Response: Progress of the job, or the run page populated with the newly processed time slice
+            (via a redirect to ``runPage()``). In case of error(s), returns the error message(s).
+    """
+    jsRoot = validation.convertRequestToPythonBool("jsRoot", request.args)
+    histGroup = request.args.get("histGroup", "")
+    histName = request.args.get("histName", "")
+
+    jobs = db["timeSliceJobs"].jobs if "timeSliceJobs" in db else {}
+    job = jobs.get(jobId)
+    if job is None:
+        error = {"Request Error": ["Time slice job {jobId} does not exist! It may have expired, so please resubmit the request.".format(jobId = jobId)]}
+    elif not job.isFinished():
+        return jsonify(jobId = jobId,
+                       state = job.state,
+                       histogramsProcessed = job.histogramsProcessed,
+                       histogramsTotal = job.histogramsTotal)
+    elif job.state == "done":
+        timeSliceKey = job.result
+        # Passed off the result to render via the run page since we a time slice just modifies
+        # the content which is displayed there.
+        # We always want to use AJAX here
+        return redirect(url_for("runPage",
+                                runNumber = db["runs"][job.runDir].runNumber,
+                                subsystemName = job.subsystem,
+                                requestedFileType = "runPage",
+                                ajaxRequest = json.dumps(True),
+                                jsRoot = json.dumps(jsRoot),
+                                histGroup = histGroup,
+                                histName = histName,
+                                timeSliceKey = json.dumps(timeSliceKey)))
+    else:
+        error = job.result
+
+    logger.info("Time slices error: {error}".format(error = error))
+    drawerContent = ""
+    mainContent = render_template("errorMainContent.html", errors = error)
+
+    # We always want to use AJAX here
+    return jsonify(drawerContent = drawerContent, mainContent = mainContent)
+
 @app.route("/testingDataArchive")
 @login_required
 def testingDataArchive():
     """ Provides a zip archive of test data for Overwatch development.
 
-    This function will look through at most the 5 most recent runs, looking for the minimum number of files
-    necessary for running Overwatch successfully. These files will be zipped up and provided to the user.
-    The minimum files are the combined file, and the most recent file received for the subsystem (they are
-    usually the same, but it is easier to include both). If possible, an additional file is included for testing
-    the time slice and trending functionality. It may not always be available if runs are extremely short. The
-    zip archive will include all subsystems which are available. It will skip runs where any subsystem is unavailable
-    to ensure that the data provided is of more utility.
+    This function will look through the most recent runs (or the requested runs), looking for the minimum number
+    of files necessary for running Overwatch successfully. These files will be zipped up and provided to the user.
+    The minimum files are the combined file, and the most recent files received for the subsystem (the number of
+    which can be selected). If possible, an additional file is included for testing the time slice and trending
+    functionality. It may not always be available if runs are extremely short. The zip archive will include the
+    requested subsystems (by default, all subsystems). When selecting the most recent runs, it will skip runs where
+    any requested subsystem is unavailable to ensure that the data provided is of more utility.
+
+    The archive is streamed to the client as it is created, so it is never stored on disk and the memory usage
+    is bounded.
 
     Warning:
         Careful in changing the routing for this function, as the name of it is hard coded in
         ``webApp.routing.redirectBack()``. This hard coding is to avoid a loop where the user is stuck accessing
         this file after logging in.
 
+    Note:
+        Function args are provided through the flask request object.
+
     Args:
-        None
+        runs (str): Comma separated run numbers to include. Default: "", which corresponds to the most recent runs.
+        subsystems (str): Comma separated subsystems to include. Default: "", which corresponds to all subsystems.
+        nRuns (int): Number of the most recent runs to include if the runs are not specified. Default: 5.
+        nFiles (int): Number of the most recent files of each subsystem to include. Default: 1.
     Returns:
-        redirect: Redirect to the newly created file.
+        Response: Streamed zip archive. In case of error(s), returns the error message(s).
     """
+    (error, runNumbers, subsystems, nRuns, nFiles) = validation.validateTestingDataArchive(request)
+
     # Get db
     runs = db["runs"]
-    runList = runs.keys()
-
-    # Retrieve at most 5 files
-    numberOfFilesToDownload = 5
-    if len(runList) < 5:
-        numberOfFilesToDownload = len(runList)
-
-    # Create zip file. It will be stored in the root of the data directory.
-    # It is fine to be overwritten because it can always be recreated.
-    zipFilename = "testingDataArchive.zip"
-    with zipfile.ZipFile(os.path.join(serverParameters["protectedFolder"], zipFilename), "w") as zipFile:
-        logger.info("Creating zipFile at %s" % os.path.join(serverParameters["protectedFolder"], zipFilename))
-
-        # Starting from the end, we look for runs which have the full set of subsystems. For each one, we write
-        # each subsystem of that run to the zip file. Note that the files are written in reverse order. However,
-        # this is fine because the order doesn't make a difference in the final archive.
-        numberOfFilesWritten = 0
-        # We need to explicitly call keys here because ``BTree`` doesn't support being reversed directly.
-        for runDir in reversed(runs.keys()):
-            if numberOfFilesWritten == numberOfFilesToDownload:
-                break
-            # It's easier to operate with the runContainer object.
-            run = runs[runDir]
-            # Ensure that we get a full set of subsystems. If the run doesn't have data for all subsystems, we skip
-            # it because otherwise the test data is much less useful.
-            if set(serverParameters["subsystemList"]) != set(run.subsystems):
+
+    # Determine the runs to include
+    selectedRuns = []
+    if error == {}:
+        if runNumbers:
+            for runNumber in runNumbers:
+                runDir = "Run{runNumber}".format(runNumber = runNumber)
+                if runDir not in runs:
+                    error.setdefault("Runs", []).append("{runDir} is not a valid run!".format(runDir = runDir))
+                else:
+                    selectedRuns.append(runs[runDir])
+        else:
+            # Starting from the end, we look for runs which have the full set of requested subsystems. Note that the
+            # runs are selected in reverse order. However, this is fine because the order doesn't make a difference in
+            # the final archive.
+            # We need to explicitly call keys here because ``BTree`` doesn't support being reversed directly.
+            for runDir in reversed(runs.keys()):
+                if len(selectedRuns) == nRuns:
+                    break
+                # It's easier to operate with the runContainer object.
+                run = runs[runDir]
+                # Ensure that we get a full set of subsystems. If the run doesn't have data for all subsystems, we skip
+                # it because otherwise the test data is much less useful.
+                if not set(subsystems).issubset(set(run.subsystems)):
+                    continue
+                selectedRuns.append(run)
+
+    if error != {}:
+        logger.warning("Testing data archive error: {error}".format(error = error))
+        return render_template("error.html", errors = error)
+
+    # Determine the files to include. This is done before streaming, so the database isn't needed while streaming.
+    filenames = []
+    for run in selectedRuns:
+        for subsystemName in subsystems:
+            if subsystemName not in run.subsystems:
                 continue
-            else:
-                for subsystem in run.subsystems.values():
-                    # Write files to the zip file
-                    # Combined file
-                    zipFile.write(os.path.join(serverParameters["protectedFolder"], subsystem.combinedFile.filename))
-                    # Uncombined file. This is the last file that was received from the subsystem.
-                    zipFile.write(os.path.join(serverParameters["protectedFolder"], subsystem.files[subsystem.files.keys()[-1]].filename))
-                    # We select 4 as an arbitrary point to ensure that there is some different between the data stored
-                    # in it and the combined file.
-                    if len(subsystem.files) > 4:
-                        # Write an additional file for testing time slices.
-                        zipFile.write(os.path.join(serverParameters["protectedFolder"], subsystem.files[subsystem.files.keys()[-5]].filename))
-                numberOfFilesWritten += 1
-
-    # Return with a download link
-    return redirect(url_for("protected", filename=zipFilename))
+            subsystem = run.subsystems[subsystemName]
+            fileKeys = list(subsystem.files.keys())
+            # Combined file
+            if subsystem.combinedFile:
+                filenames.append(subsystem.combinedFile.filename)
+            # Uncombined files. These are the last files that were received from the subsystem.
+            for key in fileKeys[-nFiles:]:
+                filenames.append(subsystem.files[key].filename)
+            # We select 4 as an arbitrary point to ensure that there is some different between the data stored
+            # in it and the combined file.
+            if len(fileKeys) > nFiles + 3:
+                # Write an additional file for testing time slices.
+                filenames.append(subsystem.files[fileKeys[-(nFiles + 4)]].filename)
+
+    # Files are stored relative to the protected folder, using the same layout as the data directory.
+    files = [(os.path.join(serverParameters["protectedFolder"], filename), filename) for filename in collections.OrderedDict.fromkeys(filenames)]
+    logger.info("Streaming testing data archive with {nFiles} files from {nRuns} runs".format(nFiles = len(files), nRuns = len(selectedRuns)))
+
+    return Response(utilities.streamZipArchive(files), mimetype = "application/zip",
+                    headers = {"Content-Disposition": "attachment; filename=testingDataArchive.zip",
+                               "X-Accel-Buffering": "no"})
 
 @app.route("/overwatchStatus")
 @login_required
@@ -748,17 +1076,15 @@ def overwatchStatus():
 
     This function takes advantage of the status functionality of the web app to determine the state of any
     deployed web apps that are specified in the web app config. This is achieved by sending requests to all
-    other sites and then aggregating the results. Each request is allowed a 0.5 second timeout.
+    other sites and then aggregating the results. The requests are sent concurrently, with each request allowed
+    ``statusRequestTimeout`` seconds. The aggregated result is cached for ``statusRequestCacheTime`` seconds, so
+    simultaneous viewers don't each send the requests. The latency of each request is included in the status.
 
     It will also provide information on when the last files were received from other sites.
 
     This functionality will only work if the web app is accessible from the site where this is run. This may
     not always be the case.
 
-    Note:
-        Since the GET requests are blocking, it can appear that the web app is hanging. However, this is
-        just due to the time that the requests take.
-
     Warning:
         This can behave somewhat strangely using the flask development server, especially if there is reloading.
         If possible, it is best to run with ``uwsgi`` for testing of this function.
@@ -772,16 +1098,17 @@ def overwatchStatus():
         Response: Status template populated with the status of Overwatch sites specified in the configuration.
     """
     # Setup
-    runs = db["runs"]
     ajaxRequest = validation.convertRequestToPythonBool("ajaxRequest", request.args)
 
     # Where the statuses will be collected
     statuses = collections.OrderedDict()
 
     # Determine if a run is ongoing
-    # To do so, we need the most recent run
-    mostRecentRun = runs[runs.keys()[-1]]
-    runOngoing = mostRecentRun.isRunOngoing()
+    # To do so, we need the most recent run. The run summaries store the time of the most recent
+    # file, so we don't need to look at the files themselves.
+    runSummaries = db["runSummaries"] if "runSummaries" in db else None
+    mostRecentRun = runSummaries.mostRecentRun() if runSummaries else None
+    runOngoing = mostRecentRun.isRunOngoing() if mostRecentRun else False
     if runOngoing:
         runOngoingNumber = "- " + mostRecentRun.prettyName
     else:
@@ -791,31 +1118,19 @@ def overwatchStatus():
 
     # Determine the time of the most recent modification
     # Add to status
-    statuses["Time since last timestamp file"] = "{minutes} minutes".format(minutes = int(mostRecentRun.minutesSinceLastTimestamp()))
+    minutesSinceLastTimestamp = runSummaries.minutesSinceLastTimestamp() if runSummaries else -1
+    statuses["Time since last timestamp file"] = "{minutes} minutes".format(minutes = int(minutesSinceLastTimestamp))
 
     # Determine server statuses
-    exceptionErrorMessage = "Request to \"{site}\" at \"{url}\" {errorType} with error message {e}!"
     sites = serverParameters["statusRequestSites"]
-    for site, url in iteritems(sites):
-        serverError = {}
-        statusResult = ""
-        try:
-            serverRequest = requests.get(url + "/status", timeout = 0.5)
-            if serverRequest.status_code != 200:
-                serverError.setdefault("Request error", []).append("Request to \"{}\" at \"{}\" returned error response {}!".format(site, url, serverRequest.status_code))
-            else:
-                statusResult = "Site is up!"
-        except requests.exceptions.Timeout as e:
-            serverError.setdefault("Timeout error", []).append(exceptionErrorMessage.format(site = site, url = url, errorType = "timed out", e = e))
-        except requests.exceptions.ConnectionError as e:
-            serverError.setdefault("Connection error", []).append(exceptionErrorMessage.format(site = site, url = url, errorType = "had a connection error", e = e))
-        except requests.exceptions.RequestException as e:
-            serverError.setdefault("General Requests error", []).append(exceptionErrorMessage.format(site = site, url = url, errorType = "had a general requests error", e = e))
-
-        # Store the error if one occurred
-        if serverError != {}:
-            statusResult = serverError
+    for site, (statusResult, latency) in iteritems(siteStatusProber.statuses(sites)):
         # Add to status
+        if isinstance(statusResult, dict):
+            # Copy so that the cached result isn't modified.
+            statusResult = dict(statusResult)
+            statusResult["Latency"] = ["{latency:.0f} ms".format(latency = latency)]
+        else:
+            statusResult = "{statusResult} ({latency:.0f} ms)".format(statusResult = statusResult, latency = latency)
         statuses[site] = statusResult
 
     if ajaxRequest is False:
@@ -74,6 +74,9 @@ setup(
             # points to a different type of function. This function will on an interval if the
             # sleep time is set to a positive value. Otherwise, it will run once.
             "overwatchProcessing = overwatch.processing.run:run",
+            # Backfill trending objects from previously processed runs.
+            "overwatchTrendingBackfill = overwatch.processing.run:runTrendingBackfill",
+            "overwatchTimeSliceJobs = overwatch.processing.run:runTimeSliceJobs",
             # Deployment script
             "overwatchDeploy = overwatch.base.deploy:run",
             # Utility script to update the database users
@@ -143,6 +146,10 @@ setup(
         ],
         "dev": [
             "flake8",
-        ]
+        ],
+        # Brotli compressed variants of the histogram json files.
+        "brotli": [
+            "brotli",
+        ],
     }
 )
@@ -928,6 +928,11 @@ def testTwoOverwatchExecutablesWithCustomConfigs(loggingMixin):
                         description = "Overwatch processing",
                         args = ["overwatchProcessing"],
                         config = {})),
+    ("timeSliceJobs", {},
+     executableExpected(name = "timeSliceJobs",
+                        description = "Overwatch time slice job worker",
+                        args = ["overwatchTimeSliceJobs"],
+                        config = {})),
     ("webApp", {"uwsgi": {}},
      executableExpected(name = "webApp",
                         description = "Overwatch web app",
@@ -943,12 +948,17 @@ def testTwoOverwatchExecutablesWithCustomConfigs(loggingMixin):
                         description = "Overwatch web app",
                         args = ["uwsgi", "--yaml", "exec/config/webApp_uwsgi.yaml"],
                         config = {})),
+    ("webAppUpdates", {"uwsgi": {}},
+     executableExpected(name = "webAppUpdates",
+                        description = "Overwatch web app update events",
+                        args = ["overwatchWebApp"],
+                        config = {})),
     ("dqmReceiver", {"uwsgi": {}},
      executableExpected(name = "dqmReceiver",
                         description = "Overwatch DQM receiver",
                         args = ["overwatchDQMReceiver"],
                         config = {})),
-], ids = ["Data transfer", "Processing", "Web App", "Web App - uwsgi", "Web App - uwsgi + nginx", "DQM Receiver"])
+], ids = ["Data transfer", "Processing", "Time slice jobs", "Web App", "Web App - uwsgi", "Web App - uwsgi + nginx", "Web App Updates", "DQM Receiver"])
 def testOverwatchExecutableProperties(loggingMixin, executableType, config, expected, setupStartProcessWithLog, mocker):
     """ Integration test for the setup and properties of Overwatch based executables. """
     executable = deploy.retrieveExecutable(executableType, config = config)
@@ -1062,6 +1072,118 @@ def testOverwatchExecutableProperties(loggingMixin, executableType, config, expe
         # We skip the gzip config contents because they're static
         mFile.assert_any_call(os.path.join("exec", "config", "conf.d", "gzip.conf"), "w")
 
+def testNginxProtectedLocation(loggingMixin, mocker):
+    """ Test that the internal location for the protected files is included in the nginx config if requested. """
+    executable = deploy.nginx(config = {
+        "webAppName": "webApp",
+        "basePath": "exec/config",
+        "sitesPath": "sites-enabled",
+        "configPath": "conf.d",
+        "protectedFolder": "data",
+    })
+
+    mFile = mocker.mock_open()
+    mocker.patch("overwatch.base.deploy.open", mFile)
+    mMakedirs = mocker.MagicMock()
+    mocker.patch("overwatch.base.deploy.os.makedirs", mMakedirs)
+
+    executable.setup()
+
+    expectedMainNginxConfig = """
+    server {
+        listen 80 default_server;
+        # "_" is a wildcard for all possible server names
+        server_name _;
+        location / {
+            include uwsgi_params;
+            uwsgi_pass unix:///tmp/sockets/webApp.sock;
+        }
+        # Protected files, which are only served after the request is authorized by the web app.
+        location /protectedFiles/ {
+            internal;
+            alias %(folder)s/;
+            sendfile on;
+            tcp_nopush on;
+            # Serve the precompressed variants written by the processing.
+            gzip_static on;
+            # Requires the ngx_brotli module.
+            #brotli_static on;
+        }
+    }"""
+    expectedMainNginxConfig = inspect.cleandoc(expectedMainNginxConfig % {"folder": os.path.abspath("data")})
+
+    mFile.assert_any_call(os.path.join("exec", "config", "sites-enabled", "webAppNginx.conf"), "w")
+    mFile().write.assert_any_call(expectedMainNginxConfig)
+
+def testNginxUpdatesLocation(loggingMixin, mocker):
+    """ Test that the update event streams are passed to the separate web app if requested. """
+    executable = deploy.nginx(config = {
+        "webAppName": "webApp",
+        "basePath": "exec/config",
+        "sitesPath": "sites-enabled",
+        "configPath": "conf.d",
+        "updatesWebAppName": "webAppUpdates",
+    })
+
+    mFile = mocker.mock_open()
+    mocker.patch("overwatch.base.deploy.open", mFile)
+    mMakedirs = mocker.MagicMock()
+    mocker.patch("overwatch.base.deploy.os.makedirs", mMakedirs)
+
+    executable.setup()
+
+    expectedMainNginxConfig = """
+    server {
+        listen 80 default_server;
+        # "_" is a wildcard for all possible server names
+        server_name _;
+        location / {
+            include uwsgi_params;
+            uwsgi_pass unix:///tmp/sockets/webApp.sock;
+        }
+        # Update event streams, which are served by a separate web app with its own thread pool.
+        location /updates {
+            include uwsgi_params;
+            uwsgi_pass unix:///tmp/sockets/webAppUpdates.sock;
+            # Send the events to the client as soon as they are available.
+            uwsgi_buffering off;
+            # The streams are long lived, so we don't want them to time out while waiting for events.
+            uwsgi_read_timeout 600s;
+        }
+    }"""
+    expectedMainNginxConfig = inspect.cleandoc(expectedMainNginxConfig)
+
+    mFile.assert_any_call(os.path.join("exec", "config", "sites-enabled", "webAppNginx.conf"), "w")
+    mFile().write.assert_any_call(expectedMainNginxConfig)
+
+def testWebAppUpdatesComponent(loggingMixin, setupStartProcessWithLog, mocker):
+    """ Test that the update events instance of the web app is identified to the web app via uwsgi. """
+    executable = deploy.retrieveExecutable("webAppUpdates", config = {
+        "uwsgi": {
+            "enabled": True,
+            "module": "overwatch.webApp.run",
+            "uwsgi-socket": "/tmp/sockets/webAppUpdates.sock",
+            "additionalOptions": {
+                "chdir": "myDir",
+                "threads": 64,
+            },
+        },
+    })
+
+    mFile = mocker.mock_open()
+    mocker.patch("overwatch.base.deploy.open", mFile)
+    mYaml = mocker.MagicMock()
+    mocker.patch("overwatch.base.deploy.configModule.yaml.dump", mYaml)
+    mMakedirs = mocker.MagicMock()
+    mocker.patch("overwatch.base.deploy.os.makedirs", mMakedirs)
+
+    executable.setup()
+
+    uwsgiConfigs = [args[0]["uwsgi"] for args, _ in mYaml.call_args_list if "uwsgi" in args[0]]
+    assert len(uwsgiConfigs) == 1
+    assert uwsgiConfigs[0]["env"] == "OVERWATCH_WEBAPP_COMPONENT=webAppUpdates"
+    assert uwsgiConfigs[0]["threads"] == 64
+
 def testUwsgiExecutableRunFailure(loggingMixin):
     """ Minimal test to ensure that the uwsgi executable fails when attempting to execute it directly. """
     # Create the executable. The values don't matter.
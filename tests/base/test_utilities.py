@@ -86,3 +86,70 @@ def testWriteRunInfoToFile(loggingMixin, fileExists, hltMode, mocker):
         mOpen.assert_not_called()
         mConfig.assert_not_called()
 
+
+@pytest.mark.parametrize("databaseLocation, readOnly, expectedLocation", [
+    ("file://data/overwatch.fs", True, "file://data/overwatch.fs"),
+    ("zeo://127.0.0.1:2345", False, "zeo://127.0.0.1:2345?cache_size=1000&client=webApp&var=data%2FzeoCache"),
+    ("zeo://127.0.0.1:2345", True, "zeo://127.0.0.1:2345?cache_size=1000&client=webApp&var=data%2FzeoCache&read_only=true"),
+], ids = ["File storage", "ZEO client", "Read-only ZEO client"])
+def testRetrieveDatabaseLocation(loggingMixin, databaseLocation, readOnly, expectedLocation, mocker):
+    """ Tests for determining the database location of a particular client. """
+    # Avoid creating the cache directory.
+    mocker.patch("overwatch.base.utilities.os.path.exists", return_value = True)
+    parameters = {
+        "databaseLocation": databaseLocation,
+        "zeoClient": {"cacheSize": 1000, "cacheDirectory": os.path.join("data", "zeoCache")},
+    }
+
+    location = utilities.retrieveDatabaseLocation(parameters, "webApp", readOnly = readOnly)
+
+    assert location == expectedLocation
+
+def testRetrieveDatabaseLocationCacheSize(loggingMixin):
+    """ Test configuring the object cache size via the database location. """
+    parameters = {
+        "databaseLocation": "file://data/overwatch.fs",
+        "databaseCache": {"objects": 20000, "bytes": 0},
+    }
+
+    location = utilities.retrieveDatabaseLocation(parameters, "processing")
+
+    assert location == "file://data/overwatch.fs?connection_cache_size=20000"
+
+@pytest.mark.parametrize("maxChanges, nChanges, force, expectedCommits, expectedPending", [
+    (1, 3, False, 3, 0),
+    (2, 3, False, 1, 1),
+    (10, 3, False, 0, 3),
+    (10, 3, True, 3, 0),
+], ids = ["Commit every change", "Batch of two", "Batch not full", "Forced commits"])
+def testCommitBatcher(loggingMixin, maxChanges, nChanges, force, expectedCommits, expectedPending, mocker):
+    """ Tests for batching transaction commits. """
+    transactionManager = mocker.MagicMock()
+    batcher = utilities.commitBatcher(maxChanges = maxChanges, transactionManager = transactionManager)
+
+    for _ in range(nChanges):
+        batcher.recordChange(force = force)
+
+    assert transactionManager.commit.call_count == expectedCommits
+    assert batcher.pendingChanges == expectedPending
+
+    # Committing the rest of the batch leaves no pending changes.
+    batcher.commit()
+    assert batcher.pendingChanges == 0
+
+def testWriteFileWithCompressedVariants(loggingMixin, tmpdir):
+    """ Test writing a file along with its precompressed variants. """
+    import gzip
+    filename = str(tmpdir.join("hist.json"))
+    data = b'{"_typename": "TCanvas"}'
+    # An outdated variant should be removed.
+    tmpdir.join("hist.json.br").write("outdated")
+
+    utilities.writeFileWithCompressedVariants(filename, data, {"gzip": True, "brotli": False})
+
+    with open(filename, "rb") as f:
+        assert f.read() == data
+    with gzip.open(filename + ".gz", "rb") as f:
+        assert f.read() == data
+    assert not os.path.exists(filename + ".br")
+    assert sorted(p.basename for p in tmpdir.listdir()) == ["hist.json", "hist.json.gz"]
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+
+""" Tests for scheduled packing of the database.
+
+"""
+
+import pytest
+
+import logging
+logger = logging.getLogger(__name__)
+
+from overwatch.processing import databasePacking
+
+@pytest.fixture
+def packer(mocker):
+    """ Create a database packer with a mock database. """
+    db = mocker.MagicMock()
+    db.getSize.side_effect = [1000, 400]
+    parameters = {"databasePacking": {"enabled": True, "retentionDays": 1, "intervalHours": 1}}
+    return databasePacking.databasePacker(db, parameters)
+
+@pytest.mark.parametrize("enabled, lastPackTime, expected", [
+    (True, 0, True),
+    (True, 10000 - 60 * 60, True),
+    (True, 10000 - 60, False),
+    (False, 0, False),
+], ids = ["Never packed", "Interval elapsed", "Recently packed", "Disabled"])
+def testIsPackDue(loggingMixin, packer, enabled, lastPackTime, expected):
+    """ Test determining whether a pack is due. """
+    packer.enabled = enabled
+    packer.lastPackTime = lastPackTime
+
+    assert packer.isPackDue(currentTime = 10000) is expected
+
+def testSchedulePack(loggingMixin, packer):
+    """ Test scheduling a pack, which removes the history older than the retention. """
+    currentTime = 100000
+    assert packer.schedulePack(currentTime = currentTime) is True
+    packer.wait()
+
+    packer.db.pack.assert_called_once_with(t = currentTime - 24 * 60 * 60)
+    assert packer.lastPackTime == currentTime
+    # It isn't due again until the interval has passed.
+    assert packer.schedulePack(currentTime = currentTime + 60) is False
+
+def testPack(loggingMixin, packer):
+    """ Test reporting the reclaimed size and duration of a pack. """
+    (reclaimed, duration) = packer.pack(packTime = 0)
+
+    assert reclaimed == 600
+    assert duration >= 0
+
+def testPackFailure(loggingMixin, packer):
+    """ Test that a failed pack doesn't raise. """
+    packer.db.pack.side_effect = IOError("Pack failed")
+
+    assert packer.pack(packTime = 0) is None
@@ -200,6 +200,10 @@ def checkAllCreatedSubsystems(subsystems, expectedRunDict, runDir, runs):
         # Check the actual values
         assert checkCreatedSubsystem(createdSubsystem, expectedSubsystem)
 
+    # The run should keep track of the most recent file without needing to look at the files.
+    assert runs[runDir].newFile is True
+    assert runs[runDir].lastFileTime == max(subsystem.endOfRun for subsystem in itervalues(runs[runDir].subsystems))
+
     return True
 
 @pytest.mark.parametrize("useExistingRunContainer", [
@@ -383,3 +387,130 @@ def testProcessMovedFilesWithInitialFileArrival(setupNewSubsystemsFromMovedFileI
             assert len(runs[runDir].subsystems[subsystem].histsAvailable) == 1
             assert runs[runDir].subsystems[subsystem].histsAvailable["hello"] == "world_{subsystem}".format(subsystem = subsystem)
 
+
+def testProcessAllRunsCommitBatching(loggingMixin, mocker):
+    """ Test that the processed runs are committed in batches, with only the most recent run committed immediately. """
+    runs = OOBTree()
+    for runNumber in [123, 124, 125]:
+        run = mocker.MagicMock(runDir = "Run{}".format(runNumber), prettyName = "Run {}".format(runNumber),
+                               newFile = False, lastFileTime = runNumber * 10)
+        combinedFile = mocker.MagicMock(filename = os.path.join(run.runDir, "EMC", "combined.root"))
+        run.subsystems = {"EMC": mocker.MagicMock(subsystem = "EMC", newFile = False, combinedFile = combinedFile)}
+        runs[run.runDir] = run
+    dbRoot = {"runs": runs}
+
+    def simulateNewFiles(runs, runDict):
+        """ All of the runs receive a new file, as when catching up on many runs. """
+        for run in runs.values():
+            run.newFile = True
+            for subsystem in run.subsystems.values():
+                subsystem.newFile = True
+
+    mocker.patch.dict(processRuns.processingParameters, {"trending": False, "debug": False, "forceReprocessing": False,
+                                                         "forceReprocessRuns": [],
+                                                         "commitBatching": {"maxRuns": 10, "maxSeconds": 60}})
+    mocker.patch("overwatch.processing.processRuns.utilities.moveRootFiles", return_value = {})
+    mocker.patch("overwatch.processing.processRuns.processMovedFilesIntoRuns", side_effect = simulateNewFiles)
+    mocker.patch("overwatch.processing.processRuns.updateRunSummaries")
+    mocker.patch("overwatch.processing.processRuns.mergeFiles.mergeRootFiles")
+    mProcessRootFile = mocker.patch("overwatch.processing.processRuns.processRootFile")
+    mocker.patch("overwatch.processing.processRuns.transaction.commit")
+    mBatcher = mocker.MagicMock()
+    mocker.patch("overwatch.processing.processRuns.utilities.commitBatcher", return_value = mBatcher)
+
+    processRuns.processAllRuns(dbRoot = dbRoot, connection = mocker.MagicMock())
+
+    assert mProcessRootFile.call_count == 3
+    assert mBatcher.recordChange.call_args_list == [mocker.call(force = False), mocker.call(force = False), mocker.call(force = True)]
+    mBatcher.commit.assert_called_once_with()
+
+def testProcessTimeSlicesKeepsGeneration(loggingMixin, mocker):
+    """ Test that processing a time slice doesn't request an update of the subsystem generation. """
+    timeSlice = mocker.MagicMock(filenamePrefix = "timeSlice.1", processingOptions = {},
+                                 filename = mocker.MagicMock(filename = "timeSlice.1.root"))
+    timeSlice.unprocessedHists.return_value = ["histA"]
+    subsystem = mocker.MagicMock(baseDir = os.path.join("Run123", "EMC"), timeSlices = {"timeSlice.1": timeSlice})
+    subsystem.selectedHistNames.return_value = ["histA"]
+    run = mocker.MagicMock(subsystems = {"EMC": subsystem})
+    runs = mocker.MagicMock()
+    runs.__contains__.return_value = True
+    runs.__getitem__.return_value = run
+
+    mocker.patch("overwatch.processing.processRuns.utilities.moveRootFiles", return_value = {})
+    mocker.patch("overwatch.processing.processRuns.processMovedFilesIntoRuns")
+    mocker.patch("overwatch.processing.processRuns.updateRunSummaries")
+    mocker.patch("overwatch.processing.processRuns.validateAndCreateNewTimeSlice", return_value = ("timeSlice.1", False, {}))
+    mProcessRootFile = mocker.patch("overwatch.processing.processRuns.processRootFile")
+
+    result = processRuns.processTimeSlices(runs, "Run123", 0, 5, "EMC", {})
+
+    assert result == "timeSlice.1"
+    mProcessRootFile.assert_called_once()
+    assert mProcessRootFile.call_args[1]["updateGeneration"] is False
+
+def testRunSummaryCatalogPagination(loggingMixin):
+    """ Test updating and paginating the run summary catalog. """
+    # Minimal stand ins for the run and subsystem containers.
+    fakeRun = collections.namedtuple("fakeRun", ["runDir", "runNumber", "prettyName", "hltMode", "subsystems", "lastFileTime", "newFile"])
+    fakeSubsystem = collections.namedtuple("fakeSubsystem", ["startOfRun"])
+    runs = OOBTree()
+    for runNumber in range(100, 125):
+        runDir = "Run{}".format(runNumber)
+        subsystems = OOBTree()
+        subsystems["EMC"] = fakeSubsystem(startOfRun = runNumber * 10)
+        runs[runDir] = fakeRun(runDir, runNumber, "Run {}".format(runNumber), "C", subsystems, runNumber * 10 + 5, False)
+    dbRoot = {"runs": runs}
+
+    processRuns.updateRunSummaries(dbRoot)
+    catalog = dbRoot["runSummaries"]
+    assert len(catalog) == 25
+    assert catalog.mostRecentRun().runNumber == 124
+    assert catalog.lastFileTime == 1245
+
+    # First page
+    (summaries, nextRunNumber, previousRunNumber) = catalog.page(numberOfRuns = 10)
+    assert [summary.runNumber for summary in summaries] == list(range(124, 114, -1))
+    assert summaries[0].subsystems == ("EMC",)
+    assert summaries[0].startOfRun == 1240
+    assert nextRunNumber == 114
+    assert previousRunNumber is None
+
+    # Middle page
+    (summaries, nextRunNumber, previousRunNumber) = catalog.page(startRunNumber = 114, numberOfRuns = 10)
+    assert [summary.runNumber for summary in summaries] == list(range(114, 104, -1))
+    assert nextRunNumber == 104
+    assert previousRunNumber == 124
+
+    # Last page
+    (summaries, nextRunNumber, previousRunNumber) = catalog.page(startRunNumber = 104, numberOfRuns = 10)
+    assert [summary.runNumber for summary in summaries] == list(range(104, 99, -1))
+    assert nextRunNumber is None
+    assert previousRunNumber == 114
+
+    # Updating an existing run shouldn't change the number of runs.
+    runs["Run124"].subsystems["HLT"] = fakeSubsystem(startOfRun = 1240)
+    processRuns.updateRunSummaries(dbRoot, runDirs = ["Run124"])
+    assert len(catalog) == 25
+    assert catalog.mostRecentRun().subsystems == ("EMC", "HLT")
+
+def testExtractHistogramData(loggingMixin):
+    """ Test extracting the bin contents, errors, and edges of a histogram. """
+    ROOT = pytest.importorskip("ROOT")
+    hist = ROOT.TH2D("testExtractHistogramData", "testExtractHistogramData", 2, 0, 2, 3, 0, 6)
+    hist.Sumw2()
+    hist.Fill(0.5, 1, 2)
+    hist.Fill(1.5, 5)
+    # Overflow in x
+    hist.Fill(3, 1)
+
+    data = processRuns.extractHistogramData(hist)
+    # Includes the underflow and overflow bins.
+    assert data["contents"].shape == (4, 5)
+    assert data["errors"].shape == (4, 5)
+    assert data["contents"][1, 1] == 2
+    assert data["contents"][2, 3] == 1
+    assert data["contents"][3, 1] == 1
+    assert data["errors"][1, 1] == pytest.approx(2)
+    assert list(data["xEdges"]) == [0, 1, 2]
+    assert list(data["yEdges"]) == [0, 2, 4, 6]
+    assert "zEdges" not in data
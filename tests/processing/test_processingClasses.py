@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+
+""" Tests for the processing classes.
+
+"""
+
+import pytest
+
+import logging
+logger = logging.getLogger(__name__)
+
+from overwatch.processing import processingClasses
+
+def exampleFunction(subsystem, hist, processingOptions):
+    """ Example processing function. """
+    pass
+
+def otherExampleFunction(subsystem, hist, processingOptions):
+    """ Another example processing function. """
+    pass
+
+@pytest.fixture
+def catalog():
+    """ Create a histogram definition catalog. """
+    return processingClasses.histogramDefinitionCatalog()
+
+def createHist(histName, functions, histList = None):
+    """ Create a histogram container with the given processing functions. """
+    hist = processingClasses.histogramContainer(histName, histList = histList)
+    hist.functionsToApply.extend(functions)
+    return hist
+
+def testSharedHistogramDefinitions(loggingMixin, catalog):
+    """ Test that equivalent definitions are shared, while different definitions are not. """
+    hists = [createHist("hist1", [exampleFunction]), createHist("hist2", [exampleFunction]),
+             createHist("hist3", [exampleFunction, otherExampleFunction])]
+    for hist in hists:
+        hist.compact(catalog)
+
+    assert len(catalog) == 2
+    assert hists[0].definition is hists[1].definition
+    assert hists[0].definition is not hists[2].definition
+    assert hists[0].functionsToApply == (exampleFunction,)
+    assert hists[2].functionsToApply == (exampleFunction, otherExampleFunction)
+
+def testModifySharedHistogramDefinition(loggingMixin, catalog):
+    """ Test that modifying a shared definition only affects the modified histogram. """
+    hists = [createHist("hist1", [exampleFunction]), createHist("hist2", [exampleFunction])]
+    for hist in hists:
+        hist.compact(catalog)
+
+    hists[0].drawOptions += " colz"
+
+    assert hists[0].drawOptions == " colz"
+    assert hists[1].drawOptions == ""
+    assert hists[0].definition is not hists[1].definition
+    assert hists[0].definition.frozen is False
+
+def testStackDrawOptions(loggingMixin):
+    """ Test that stacks are drawn with the "nostack" option. """
+    hist = processingClasses.histogramContainer("stack", histList = ["hist1", "hist2"])
+
+    assert hist.drawOptions == "nostack"
+    assert hist.histList == ["hist1", "hist2"]
+
+def testLegacyHistogramContainerState(loggingMixin):
+    """ Test loading a histogram container which was stored before the definitions were available. """
+    hist = processingClasses.histogramContainer.__new__(processingClasses.histogramContainer)
+    hist.__setstate__({"histName": "hist", "prettyName": "Hist", "histList": None, "information": {"Key": "Value"},
+                       "hist": None, "histType": None, "drawOptions": "colz", "canvas": None,
+                       "projectionFunctionsToApply": [], "functionsToApply": [exampleFunction], "trendingObjects": []})
+
+    assert hist.histName == "hist"
+    assert hist.drawOptions == "colz"
+    assert hist.functionsToApply == [exampleFunction]
+    assert hist.information == {"Key": "Value"}
+
+def testTimeSliceJobCoalescing(loggingMixin):
+    """ Test that equivalent requests are coalesced while a job hasn't finished. """
+    queue = processingClasses.timeSliceJobQueue()
+    (job, newlySubmitted) = queue.submit("Run123", "EMC", 0, 5, {"scaleHists": True}, submitTime = 1)
+    (sameJob, sameNewlySubmitted) = queue.submit("Run123", "EMC", 0, 5, {"scaleHists": True}, submitTime = 2)
+    (otherJob, otherNewlySubmitted) = queue.submit("Run123", "EMC", 0, 6, {"scaleHists": True}, submitTime = 3)
+
+    assert newlySubmitted is True
+    assert sameNewlySubmitted is False
+    assert sameJob is job
+    assert otherNewlySubmitted is True
+    assert otherJob is not job
+    assert queue.nextQueuedJob() is job
+
+    # Once the job has finished, an equivalent request creates a new job.
+    job.state = "done"
+    job.finishTime = 10
+    (newJob, newNewlySubmitted) = queue.submit("Run123", "EMC", 0, 5, {"scaleHists": True}, submitTime = 11)
+    assert newNewlySubmitted is True
+    assert newJob is not job
+    assert queue.nextQueuedJob() is otherJob
+
+def testTimeSliceJobStaleCoalescing(loggingMixin):
+    """ Test that requests aren't coalesced into a running job whose lease has expired. """
+    queue = processingClasses.timeSliceJobQueue()
+    (job, newlySubmitted) = queue.submit("Run123", "EMC", 0, 5, {}, submitTime = 1, leaseTimeout = 10)
+    job.state = "running"
+    job.claimTime = 2
+    job.heartbeatTime = 5
+
+    (sameJob, sameNewlySubmitted) = queue.submit("Run123", "EMC", 0, 5, {}, submitTime = 14, leaseTimeout = 10)
+    assert sameNewlySubmitted is False
+    assert sameJob is job
+
+    (newJob, newNewlySubmitted) = queue.submit("Run123", "EMC", 0, 5, {}, submitTime = 16, leaseTimeout = 10)
+    assert newNewlySubmitted is True
+    assert newJob is not job
+
+@pytest.mark.parametrize("expiredLeases, expectedState", [
+    (0, "queued"),
+    (1, "failed"),
+], ids = ["Requeue", "Fail"])
+def testHandleStaleTimeSliceJobs(loggingMixin, expiredLeases, expectedState):
+    """ Test that running jobs whose lease has expired are requeued or failed. """
+    queue = processingClasses.timeSliceJobQueue()
+    (staleJob, _) = queue.submit("Run123", "EMC", 0, 5, {}, submitTime = 1)
+    staleJob.state = "running"
+    staleJob.heartbeatTime = 2
+    staleJob.expiredLeases = expiredLeases
+    (runningJob, _) = queue.submit("Run123", "EMC", 0, 6, {}, submitTime = 1)
+    runningJob.state = "running"
+    runningJob.heartbeatTime = 15
+
+    assert queue.handleStaleJobs(now = 20, leaseTimeout = 10, maxExpiredLeases = 2) == 1
+    assert staleJob.state == expectedState
+    assert staleJob.expiredLeases == expiredLeases + 1
+    assert staleJob.heartbeatTime is None
+    assert runningJob.state == "running"
+    if expectedState == "failed":
+        assert staleJob.finishTime == 20
+        assert "Processing Error" in staleJob.result
+    else:
+        assert queue.nextQueuedJob() is staleJob
+
+def testRemoveFinishedTimeSliceJobs(loggingMixin):
+    """ Test that only the jobs which finished before the given time are removed. """
+    queue = processingClasses.timeSliceJobQueue()
+    jobs = [queue.submit("Run123", "EMC", 0, maxTime, {}, submitTime = maxTime)[0] for maxTime in range(1, 4)]
+    jobs[0].state = "done"
+    jobs[0].finishTime = 10
+    jobs[1].state = "failed"
+    jobs[1].finishTime = 20
+
+    assert queue.removeFinishedJobs(finishedBefore = 15) == 1
+    assert len(queue) == 2
+    assert jobs[0].jobId not in queue.jobs
+
+def testTimeSliceUnprocessedHists(loggingMixin):
+    """ Test determining the histograms which still need to be processed for a time slice. """
+    timeSlice = processingClasses.timeSliceContainer(minUnixTimeRequested = 60, maxUnixTimeRequested = 120,
+                                                     minUnixTimeAvailable = 60, maxUnixTimeAvailable = 120,
+                                                     startOfRun = 0, filesToMerge = [], optionsHash = "hash")
+    assert timeSlice.unprocessedHists(["hist1", "hist2"]) == ["hist1", "hist2"]
+
+    timeSlice.processedHists.update(["hist1"])
+    assert timeSlice.unprocessedHists(["hist1", "hist2"]) == ["hist2"]
+
+    # Time slices stored before the processed hists were recorded have all hists processed.
+    del timeSlice.processedHists
+    assert timeSlice.unprocessedHists(["hist1", "hist2"]) == []
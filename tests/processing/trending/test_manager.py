@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+
+""" Tests for the trending manager.
+
+"""
+
+import pytest
+
+from overwatch.processing.trending.constants import DIR_PREFIX, INDEX, RECREATE, SUBSYSTEMS, TRENDING
+from overwatch.processing.trending.info import TrendingInfo
+from overwatch.processing.trending.manager import TrendingManager
+
+
+@pytest.fixture
+def manager(tmpdir, tf_trendingArgs, tf_infoArgs):
+    parameters = tf_trendingArgs[4]
+    parameters[DIR_PREFIX] = tmpdir.strpath
+    parameters[SUBSYSTEMS] = ["TST", "OTH"]
+    parameters[RECREATE] = False
+    dbRoot = {}
+    trendingManager = TrendingManager(dbRoot, parameters)
+    trendingManager._createTrendingObjectFromInfo("TST", [TrendingInfo(*tf_infoArgs)])
+    yield trendingManager, dbRoot
+
+
+def testFindTrendingObject(manager, tf_infoArgs):
+    trendingManager, dbRoot = manager
+    name = tf_infoArgs[0]
+
+    assert dbRoot[INDEX][name] == "TST"
+    assert trendingManager.findTrendingObject(name) is dbRoot[TRENDING]["TST"][name]
+    assert trendingManager.findTrendingObject(name, "TST") is dbRoot[TRENDING]["TST"][name]
+    assert trendingManager.findTrendingObject(name, "OTH") is None
+    assert trendingManager.findTrendingObject("missing") is None
+
+
+def testIndexIsRebuiltForExistingDatabase(manager, tf_infoArgs):
+    trendingManager, dbRoot = manager
+    del dbRoot[INDEX]
+
+    newManager = TrendingManager(dbRoot, trendingManager.parameters)
+    assert newManager.findTrendingObject(tf_infoArgs[0]) is dbRoot[TRENDING]["TST"][tf_infoArgs[0]]
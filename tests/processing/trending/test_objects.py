@@ -22,3 +22,62 @@ def testExampleTrendingObjects(tf_trendingArgs, tf_histogram, trendingClass):
         t.extractTrendValue(tf_histogram)
     h = t.retrieveHist()
     assert isinstance(h, ROOT.TObject)
+
+
+@pytest.mark.parametrize(
+    "trendingClass",
+    [to.MeanTrending, to.MaximumTrending, to.StdDevTrending],
+    ids=['mean', 'maximum', 'stdDev']
+)
+def testTimeStampsFollowTrendedValues(tf_trendingArgs, tf_histogram, trendingClass):
+    t = trendingClass(*tf_trendingArgs)
+    for i in range(50):
+        t.extractTrendValue(tf_histogram)
+        t.recordTimeStamp(i)
+    assert len(t.timeStamps) == len(t.trendedValues)
+    assert t.timeStamps[-1] == 49
+    assert t.hasValueBetween(45, 60)
+    assert not t.hasValueBetween(0, 10)
+
+
+@pytest.mark.parametrize(
+    "trendingClass",
+    [to.MeanTrending, to.MaximumTrending, to.StdDevTrending],
+    ids=['mean', 'maximum', 'stdDev']
+)
+def testMergeTrendValues(tf_trendingArgs, tf_histogram, trendingClass):
+    t = trendingClass(*tf_trendingArgs)
+    for i in [10, 30]:
+        t.extractTrendValue(tf_histogram)
+        t.recordTimeStamp(i)
+    backfilled = trendingClass(*tf_trendingArgs)
+    for i in range(3):
+        backfilled.extractTrendValue(tf_histogram)
+
+    # The value at 10 is already stored, so it should be ignored.
+    t.mergeTrendValues([20, 10, 5], backfilled.trendedValues)
+    assert list(t.timeStamps) == [5, 10, 20, 30]
+    assert len(t.trendedValues) == 4
+
+    # Only the most recent entries are kept.
+    many = trendingClass(*tf_trendingArgs)
+    for i in range(t.maxEntries):
+        many.extractTrendValue(tf_histogram)
+    t.mergeTrendValues(range(100, 100 + t.maxEntries), many.trendedValues[:t.maxEntries])
+    assert len(t.trendedValues) == t.maxEntries
+    assert t.timeStamps[0] == 100
+
+
+def testRetrieveTrendedValues(tf_trendingArgs, tf_histogram):
+    t = to.MeanTrending(*tf_trendingArgs)
+    for i in range(1, 6):
+        t.extractTrendValue(tf_histogram)
+        t.recordTimeStamp(i * 10)
+
+    timeStamps, values = t.retrieveTrendedValues()
+    assert list(timeStamps) == [10, 20, 30, 40, 50]
+    assert len(values) == 5
+
+    timeStamps, values = t.retrieveTrendedValues(startTime=20, endTime=40)
+    assert list(timeStamps) == [20, 30, 40]
+    assert values.shape == (3, 2)
@@ -14,6 +14,7 @@ from future.utils import iteritems
 import pytest
 import os
 import io
+import time
 import logging
 logger = logging.getLogger(__name__)
 
@@ -74,6 +75,52 @@ def testGetFileListing(client):
     # This explicitly ignores the other file in the directory, as expected.
     assert rvDict["files"] == ["EMChistos_123456_DQM_1970_01_02_16_07_24.root"]
 
+@pytest.mark.parametrize("queryString, expectedFiles, expectedTotal", [
+    ("runNumber=123456", ["EMChistos_123456_DQM_1970_01_02_16_07_24.root"], 1),
+    ("runNumber=123457", [], 0),
+    ("agent=EMC", ["EMChistos_123456_DQM_1970_01_02_16_07_24.root"], 1),
+    ("agent=TPC", [], 0),
+    ("offset=0&limit=1", ["EMChistos_123456_DQM_1970_01_02_16_07_24.root"], 1),
+    ("offset=1&limit=1", [], 1),
+], ids = ["Run number", "Other run number", "Agent", "Other agent", "First page", "Second page"])
+def testGetFileListingFilters(client, queryString, expectedFiles, expectedTotal):
+    """ Test filtering and paginating the file listing. """
+    client, validToken = client
+
+    rv = client.get("/rest/api/files?{queryString}".format(queryString = queryString), headers = {"token": validToken})
+    rvDict = rv.get_json()
+
+    assert rv.status_code == 200
+    assert rvDict["files"] == expectedFiles
+    assert rvDict["total"] == expectedTotal
+
+def testGetFileListingInvalidParameters(client):
+    """ Test the validation of the file listing parameters. """
+    client, validToken = client
+
+    rv = client.get("/rest/api/files?runNumber=abc", headers = {"token": validToken})
+    rvDict = rv.get_json()
+
+    assert rv.status_code == 400
+    assert rvDict["message"] == "runNumber must be an integer, but received abc"
+
+def testGetFileListingReconcile(client, mocker):
+    """ Test that the file index is only reconciled with the directory periodically. """
+    client, validToken = client
+    # Start from a freshly reconciled index.
+    receiver.fileIndex.reconcile(receiver.receiverParameters["dataFolder"])
+    mReconcile = mocker.spy(receiver.fileIndex, "reconcile")
+
+    rv = client.get("/rest/api/files", headers = {"token": validToken})
+    assert rv.get_json()["files"] == ["EMChistos_123456_DQM_1970_01_02_16_07_24.root"]
+    mReconcile.assert_not_called()
+
+    # Once the interval has passed, the index is reconciled.
+    receiver.fileIndex.lastReconcileTime -= receiver.fileIndex.reconcileInterval + 1
+    rv = client.get("/rest/api/files", headers = {"token": validToken})
+    assert rv.get_json()["files"] == ["EMChistos_123456_DQM_1970_01_02_16_07_24.root"]
+    mReconcile.assert_called_once_with(receiver.receiverParameters["dataFolder"])
+
 def testGetFile(client):
     """ Test retrieving a file. """
     # Setup.
@@ -156,6 +203,33 @@ def testPostFile(sendPostRequest):
     with open(os.path.join(basePath, filename), "rb") as f:
         comparisonText = f.read()
     assert comparisonText == fileText
+    # The upload should have been moved into place, so no temporary files should remain.
+    assert not [f for f in os.listdir(basePath) if f.startswith(receiver.temporaryFilePrefix)]
+
+def testPostPayload(sendPostRequest, mocker):
+    """ Test sending a file directly as the payload, which is streamed to disk in chunks. """
+    # Setup.
+    client, validToken, basePath, filename, fileText, _, headers = sendPostRequest
+    # Ensure that the payload is written in multiple chunks.
+    mocker.patch.dict(receiver.receiverParameters, {"uploadChunkSize": 1024})
+
+    # Make the request.
+    rv = client.post("/rest/api/files",
+                     content_type = "application/octet-stream",
+                     data = fileText,
+                     headers = headers)
+    rvDict = rv.get_json()
+
+    # Check message details.
+    assert rv.status_code == 200
+    assert rvDict["filename"] == filename
+    assert rvDict["received"] == {"test": "Obj name: test, Obj IsA() Name: TH1F"}
+
+    # Check the contents, and that the temporary file was moved into place.
+    with open(os.path.join(basePath, filename), "rb") as f:
+        comparisonText = f.read()
+    assert comparisonText == fileText
+    assert not [f for f in os.listdir(basePath) if f.startswith(receiver.temporaryFilePrefix)]
 
 @pytest.mark.parametrize("data, expectedMessage, addToHeaders", [
     ({}, "No file uploaded and the payload was empty", {}),
@@ -185,3 +259,79 @@ def testPostFileErrors(sendPostRequest, data, expectedMessage, addToHeaders):
     assert rv.status_code == 400
     assert rvDict["message"] == expectedMessage
 
+
+def testDeepValidation(sendPostRequest, mocker):
+    """ Test validating a received file by reading all of the objects in the background. """
+    # Setup.
+    client, validToken, basePath, filename, fileText, data, headers = sendPostRequest
+    mocker.patch.dict(receiver.receiverParameters["deepValidation"], {"enabled": True})
+
+    # Make the request.
+    rv = client.post("/rest/api/files",
+                     content_type = "multipart/form-data",
+                     data = data,
+                     headers = headers)
+    rvDict = rv.get_json()
+    assert rv.status_code == 200
+    assert rvDict["validation"] == "queued"
+
+    # Wait for the validation to finish.
+    for _ in range(50):
+        rv = client.get("/rest/api/files/{filename}/validation".format(filename = filename), headers = {"token": validToken})
+        rvDict = rv.get_json()
+        if rvDict["status"] not in ["queued", "running"]:
+            break
+        time.sleep(0.1)
+
+    assert rv.status_code == 200
+    assert rvDict["filename"] == filename
+    assert rvDict["status"] == "valid"
+    assert rvDict["message"] == "Read 1 objects"
+
+def testDeepValidationUnknownFile(client):
+    """ Test requesting the validation result of a file which wasn't validated. """
+    client, validToken = client
+
+    rv = client.get("/rest/api/files/unknownFile.root/validation", headers = {"token": validToken})
+    rvDict = rv.get_json()
+
+    assert rv.status_code == 404
+    assert rvDict["message"] == "No validation result is available for unknownFile.root"
+
+@pytest.mark.parametrize("limiterValues, expectedMessage", [
+    ({"maxInFlightRequests": 2, "inFlightRequests": 2}, "Too many files are being received concurrently. Please try again later."),
+    ({"maxInFlightBytes": 10, "inFlightRequests": 1, "inFlightBytes": 5}, "Too much data is being received concurrently. Please try again later."),
+    ({"maxBacklogFiles": 1}, "Too many received files are waiting to be processed. Please try again later."),
+], ids = ["In-flight requests", "In-flight bytes", "Backlog"])
+def testUploadBackpressure(sendPostRequest, mocker, limiterValues, expectedMessage):
+    """ Test rejecting uploads when the receiver is too busy. """
+    # Setup.
+    client, validToken, basePath, filename, fileText, data, headers = sendPostRequest
+    mocker.patch.object(receiver.limiter, "minFreeDiskSpace", 0)
+    for k, v in iteritems(limiterValues):
+        mocker.patch.object(receiver.limiter, k, v)
+
+    rv = client.post("/rest/api/files",
+                     content_type = "multipart/form-data",
+                     data = data,
+                     headers = headers)
+    rvDict = rv.get_json()
+
+    assert rv.status_code == 503
+    assert rv.headers["Retry-After"] == str(receiver.receiverParameters["backpressure"]["retryAfter"])
+    assert rvDict["status"] == 503
+    assert rvDict["message"] == expectedMessage
+    assert rvDict["received"] is None
+    # The in-flight values shouldn't be modified by a rejected upload.
+    assert receiver.limiter.inFlightRequests == limiterValues.get("inFlightRequests", 0)
+
+def testUploadBackpressureRequiresToken(client, mocker):
+    """ Test that the token is checked before the backpressure. """
+    client, validToken = client
+    mocker.patch.object(receiver.limiter, "inFlightRequests", 2)
+    mocker.patch.object(receiver.limiter, "maxInFlightRequests", 2)
+
+    rv = client.post("/rest/api/files", headers = {"token": "123456"})
+
+    assert rv.status_code == 400
+    assert rv.get_json()["message"] == "Received token, but it is invalid!"
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+
+""" Tests for the web app trending module.
+
+"""
+
+import pytest
+
+import logging
+logger = logging.getLogger(__name__)
+
+import overwatch.processing.trending.constants as CON
+from overwatch.webApp import trending
+
+@pytest.fixture
+def trendingDB(mocker):
+    """ Provide a mock database for retrieving the trending page model, with the model cache reset. """
+    db = {CON.TRENDING: {}}
+    mocker.patch("overwatch.webApp.trending.db", db)
+    mocker.patch.dict(trending._trendingPageModel, {"model": None})
+    mockModel = mocker.patch("overwatch.webApp.trending.TrendingPageModel",
+                             side_effect = lambda trendingDB, version: mocker.MagicMock(version = version))
+    return db, mockModel
+
+def testTrendingPageModelWithoutVersion(loggingMixin, trendingDB):
+    """ Test that the trending page model is created with version 0 if the database has no version. """
+    db, mockModel = trendingDB
+
+    model = trending.retrieveTrendingPageModel()
+
+    assert model.version == 0
+    mockModel.assert_called_once_with(db[CON.TRENDING], 0)
+
+def testTrendingPageModelReusedForSameVersion(loggingMixin, trendingDB):
+    """ Test that the trending page model is reused as long as the trending version doesn't change. """
+    db, mockModel = trendingDB
+    db[CON.VERSION] = 3
+
+    model = trending.retrieveTrendingPageModel()
+    assert trending.retrieveTrendingPageModel() is model
+
+    assert model.version == 3
+    assert mockModel.call_count == 1
+
+def testTrendingPageModelRebuiltForNewVersion(loggingMixin, trendingDB):
+    """ Test that the trending page model is rebuilt when the trending version changes. """
+    db, mockModel = trendingDB
+    db[CON.VERSION] = 3
+    firstModel = trending.retrieveTrendingPageModel()
+
+    db[CON.VERSION] = 4
+    secondModel = trending.retrieveTrendingPageModel()
+
+    assert secondModel is not firstModel
+    assert secondModel.version == 4
+    assert mockModel.call_count == 2
+    assert trending.retrieveTrendingPageModel() is secondModel
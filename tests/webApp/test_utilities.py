@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+
+""" Tests for the web app utilities module.
+
+"""
+
+import pytest
+
+import io
+import os
+import logging
+import zipfile
+logger = logging.getLogger(__name__)
+
+from overwatch.webApp import utilities
+
+@pytest.mark.parametrize("chunkSize", [
+    1 << 16,
+    16,
+], ids = ["Single chunk", "Multiple chunks"])
+def testStreamZipArchive(loggingMixin, tmpdir, chunkSize):
+    """ Test that a streamed zip archive contains the given files.
+
+    For python 3.6 and later, the archive is written sequentially (with data descriptors).
+    """
+    files = {"Run123/EMC/hists.1.root": b"EMC histograms" * 10,
+             "Run123/TPC/hists.2.root": b"TPC histograms" * 10}
+    filesToArchive = []
+    for i, (arcname, content) in enumerate(sorted(files.items())):
+        path = tmpdir.join("file{i}.root".format(i = i))
+        path.write_binary(content)
+        filesToArchive.append((str(path), arcname))
+
+    archive = b"".join(utilities.streamZipArchive(filesToArchive, chunkSize = chunkSize))
+
+    with zipfile.ZipFile(io.BytesIO(archive)) as zipFile:
+        assert zipFile.testzip() is None
+        assert sorted(zipFile.namelist()) == sorted(files)
+        for arcname, content in files.items():
+            assert zipFile.read(arcname) == content
+            # ROOT files are already compressed, so they should be stored.
+            assert zipFile.getinfo(arcname).compress_type == zipfile.ZIP_STORED
+
+def testFileContentETagReplacedFile(loggingMixin, tmpdir):
+    """ Test that the ETag changes when a file is replaced with the same size and modification time. """
+    path = tmpdir.join("hists.root")
+    path.write_binary(b"first")
+    fileStat = os.stat(str(path))
+    firstETag = utilities.fileContentETag(str(path))
+    assert utilities.fileContentETag(str(path)) == firstETag
+
+    # Replace the file (as a new inode) while keeping the size and modification time.
+    replacement = tmpdir.join("hists.root.tmp")
+    replacement.write_binary(b"other")
+    os.utime(str(replacement), (fileStat.st_atime, fileStat.st_mtime))
+    os.rename(str(replacement), str(path))
+
+    assert utilities.fileContentETag(str(path)) != firstETag
+
+def testFileContentETagMissingFile(loggingMixin, tmpdir):
+    """ Test that there is no ETag for a file which doesn't exist. """
+    assert utilities.fileContentETag(str(tmpdir.join("missing.root"))) is None
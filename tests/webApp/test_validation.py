@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+
+""" Tests for the web app validation module.
+
+"""
+
+import pytest
+
+import logging
+logger = logging.getLogger(__name__)
+
+from werkzeug.datastructures import MultiDict
+
+from overwatch.webApp import validation
+
+@pytest.mark.parametrize("args, expected", [
+    ({}, ([], ["EMC", "TPC"], 5, 1)),
+    ({"runs": "123, 456", "nFiles": "2"}, ([123, 456], ["EMC", "TPC"], 5, 2)),
+    ({"subsystems": "TPC", "nRuns": "3"}, ([], ["TPC"], 3, 1)),
+], ids = ["Defaults", "Runs", "Subsystems"])
+def testValidateTestingDataArchive(loggingMixin, mocker, args, expected):
+    """ Test validation of valid testing data archive requests. """
+    mocker.patch.dict(validation.serverParameters, {"subsystemList": ["EMC", "TPC"], "testingDataArchiveMaxRuns": 10})
+    request = mocker.MagicMock(args = MultiDict(args))
+
+    (error, runNumbers, subsystems, nRuns, nFiles) = validation.validateTestingDataArchive(request)
+
+    assert error == {}
+    assert (runNumbers, subsystems, nRuns, nFiles) == expected
+
+@pytest.mark.parametrize("args, expectedError", [
+    ({"runs": "123,abc"}, {"Runs": ["abc is not a valid run number!"]}),
+    ({"subsystems": "EMC, ABC"}, {"Subsystem": ["ABC is not a valid subsystem!"]}),
+    ({"nRuns": "11"}, {"Runs": ["At most 10 runs can be requested!"]}),
+    ({"runs": ",".join(str(i) for i in range(11))}, {"Runs": ["At most 10 runs can be requested!"]}),
+], ids = ["Bad run number", "Bad subsystem", "Too many recent runs", "Too many runs"])
+def testValidateTestingDataArchiveErrors(loggingMixin, mocker, args, expectedError):
+    """ Test validation of invalid testing data archive requests. """
+    mocker.patch.dict(validation.serverParameters, {"subsystemList": ["EMC", "TPC"], "testingDataArchiveMaxRuns": 10})
+    request = mocker.MagicMock(args = MultiDict(args))
+
+    (error, runNumbers, subsystems, nRuns, nFiles) = validation.validateTestingDataArchive(request)
+
+    assert error == expectedError
+    assert (runNumbers, subsystems, nRuns, nFiles) == (None, None, None, None)